@@ -1,11 +1,24 @@
 # app.py
 
+from datetime import date
+
 import streamlit as st
 from components.input_form import get_user_inputs
-from components.result_summary import show_summary
+from components.result_summary import show_summary, show_uncertainty
+from components.scenario_sweep import show_scenario_sweep
+from utils.schema import normalize_inputs
 from utils.tax_calculator import calculate_tax
 from eligibility_logic import check_eligibility
 
+
+@st.cache_data(max_entries=1024, ttl=3600, show_spinner=False)
+def evaluate(normalized_inputs: dict, as_of: date):
+    """Eligibility and tax for one set of normalized inputs, shared by every session on this server."""
+    eligibility = check_eligibility(normalized_inputs)
+    result = calculate_tax(normalized_inputs, as_of=as_of) if eligibility["is_taxable"] else None
+    return eligibility, result
+
+
 # ---------------------- Page Setup ---------------------- #
 st.set_page_config("UAE Corporate Tax Calculator", layout="centered")
 st.title("UAE Corporate Tax Calculator")
@@ -13,14 +26,21 @@ st.title("UAE Corporate Tax Calculator")
 # ---------------------- Input Form ---------------------- #
 submitted, user_inputs = get_user_inputs()
 
-# ---------------------- Eligibility Logic ---------------------- #
+# The last submission is kept for the session, so reruns triggered outside the form
+# keep showing its results instead of clearing them
 if submitted:
+    st.session_state["submitted_inputs"] = user_inputs
+user_inputs = st.session_state.get("submitted_inputs")
+
+# ---------------------- Eligibility Logic ---------------------- #
+if user_inputs is not None:
     st.markdown("### 🧾 Eligibility Result")
-    eligibility = check_eligibility(user_inputs)
+    eligibility, result = evaluate(normalize_inputs(user_inputs), date.today())
     st.info(eligibility["message"])
 
     if eligibility["is_taxable"]:
         st.success("✅ You are a Taxable Person. Proceeding with tax calculation...")
-        result = calculate_tax(user_inputs)
         st.markdown("### 💼 Tax Summary")
         show_summary(user_inputs, result)
+        show_uncertainty(user_inputs)
+        show_scenario_sweep(user_inputs)
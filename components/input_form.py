@@ -5,8 +5,8 @@ from components.precheck_taxable_person import taxable_person_precheck
 from components.business_info_section import get_business_info
 from components.financial_info_section import get_financial_info
 from datetime import date
+from utils.rules import DEFAULT_PERIOD, RULE_SETS
 
-st.info("🧠 Modular input_form.py loaded!")
 
 def get_user_inputs():
     """
@@ -25,6 +25,14 @@ def get_user_inputs():
 
         st.divider()
 
+        # Tax Period (selects the thresholds and rates that apply)
+        tax_period = st.selectbox(
+            "Tax Period (Financial Year)",
+            list(RULE_SETS),
+            index=list(RULE_SETS).index(DEFAULT_PERIOD),
+            help="The rules of this financial year are applied, e.g. the DMTT applies from FY2025."
+        )
+
         # License Issue Date (for registration deadline)
         license_issue_date = st.date_input(
             "Business License Issue Date",
@@ -118,6 +126,7 @@ def get_user_inputs():
         "covered_taxes": covered_taxes,
         "gaar_warning": gaar_warning,
         "license_issue_date": license_issue_date,
+        "tax_period": tax_period,
         "revenue": revenue,
         "deductions": deductions,
         "exempt_income": exempt_income,
@@ -2,9 +2,19 @@
 
 import streamlit as st
 
-st.info("📌 Taxable Person Pre-Check Loaded!")
-
 def taxable_person_precheck():
+    """
+    Render the pre-check and return its answers.
+    Returns:
+        tuple: (entity_type, is_taxable), as last answered in this session.
+    """
+    _precheck_fragment()
+    return st.session_state["precheck"]
+
+
+@st.fragment
+def _precheck_fragment():
+    # A fragment: answering the pre-check reruns only this section, not the whole page
     st.subheader("⚖️ Taxable Person Pre-Check")
 
     entity_type = st.selectbox("Select your business type", ["Legal Entity", "Natural Person"])
@@ -17,4 +27,4 @@ def taxable_person_precheck():
         (entity_type == "Natural Person" and conducting_business == "Yes")
     )
 
-    return entity_type, is_taxable
+    st.session_state["precheck"] = (entity_type, is_taxable)
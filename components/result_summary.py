@@ -3,8 +3,19 @@
 Summary display component for UAE Corporate Tax Calculator.
 """
 
+import pandas as pd
 import streamlit as st
 
+from utils.monte_carlo import DEFAULT_SAMPLES, UNCERTAIN_FIELDS, simulate
+
+FIELD_LABELS = {
+    "revenue": "Total Revenue",
+    "deductions": "Deductible Expenses",
+    "non_qualifying_income": "Non-Qualifying Income",
+    "foreign_tax_paid": "Foreign Tax Paid",
+}
+DISTRIBUTIONS = ("Fixed", "Uniform", "Triangular")
+
 def show_summary(inputs: dict, result: dict):
     """
     Display a summary of the financial inputs and tax calculation results.
@@ -35,3 +46,58 @@ def show_summary(inputs: dict, result: dict):
             if note:
                 st.markdown(f"- {note}")
     st.markdown("🔍 *This summary is based on UAE Corporate Tax law and is for informational purposes only. For details, see [FTA Corporate Tax Portal](https://tax.gov.ae/en/corporate.tax.aspx) and [MoF Corporate Tax](https://mof.gov.ae/tax-legislation/corporate-tax/).*\n")
+
+
+@st.fragment
+def show_uncertainty(inputs: dict):
+    """
+    Simulate tax payable when some inputs are ranges rather than point figures.
+    Runs as a fragment, so changing the ranges only reruns this section.
+    Args:
+        inputs (dict): User input data.
+    """
+    st.subheader("🎲 Uncertainty Simulation")
+    with st.form("uncertainty_form"):
+        ranges = {}
+        for field in UNCERTAIN_FIELDS:
+            current = float(inputs.get(field) or 0.0)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                shape = st.selectbox(FIELD_LABELS[field], DISTRIBUTIONS, key=f"mc_shape_{field}")
+            with col2:
+                low = st.number_input("Low (AED)", min_value=0.0, value=0.8 * current, step=10_000.0,
+                                      key=f"mc_low_{field}")
+            with col3:
+                high = st.number_input("High (AED)", min_value=0.0, value=1.2 * current, step=10_000.0,
+                                       key=f"mc_high_{field}")
+            if shape != "Fixed" and high > low:
+                # A triangular range peaks at the entered figure (kept within the range)
+                ranges[field] = ("uniform", low, high) if shape == "Uniform" else (
+                    "triangular", low, min(max(current, low), high), high)
+        samples = st.number_input("Samples", min_value=1_000, max_value=DEFAULT_SAMPLES, value=DEFAULT_SAMPLES,
+                                  step=100_000, key="mc_samples")
+        run = st.form_submit_button("Run simulation")
+    if not run:
+        st.caption("Choose a Uniform or Triangular range (High above Low) for any uncertain figure, then run.")
+        return
+    if not ranges:
+        st.warning("Every figure is fixed: give at least one a range with High above Low.")
+        return
+
+    result = simulate(inputs, ranges, samples=int(samples))
+    bands = result["tax_payable"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("P5 Tax", f"AED {bands[5]:,.2f}")
+    col2.metric("Median Tax", f"AED {bands[50]:,.2f}")
+    col3.metric("P95 Tax", f"AED {bands[95]:,.2f}")
+    st.dataframe(pd.DataFrame({
+        "Percentile": [f"P{p}" for p in bands],
+        "Tax Payable (AED)": [f"{value:,.2f}" for value in bands.values()],
+    }), hide_index=True)
+    st.markdown(f"• **Mean tax payable**: AED {result['tax_payable_mean']:,.2f}")
+    if result["sbr_cliff_probability"] is not None:
+        st.markdown(f"• **Chance of losing Small Business Relief** (revenue above the threshold): "
+                    f"{result['sbr_cliff_probability']:.1%}")
+    if result["deminimis_cliff_probability"] is not None:
+        st.markdown(f"• **Chance of breaching the QFZP de-minimis limit**: {result['deminimis_cliff_probability']:.1%}")
+    st.caption(f"{result['samples']:,} simulated outcomes; other inputs as entered.")
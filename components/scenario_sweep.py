@@ -0,0 +1,73 @@
+# components/scenario_sweep.py
+"""
+What-if scenario chart for the UAE Corporate Tax Calculator.
+"""
+
+import pandas as pd
+import streamlit as st
+
+from utils.sweep import sweep, SWEEP_FIELDS
+
+FIELD_LABELS = {
+    "revenue": "Total Revenue",
+    "deductions": "Deductible Expenses",
+    "non_qualifying_income": "Non-Qualifying Income",
+    "prior_year_tax_losses": "Prior Year Tax Losses",
+}
+
+
+@st.fragment
+def show_scenario_sweep(inputs: dict):
+    """
+    Chart tax payable over a range of one input, keeping every other input as entered.
+    Runs as a fragment, so changing the sweep settings only reruns this section.
+    Args:
+        inputs (dict): User input data.
+    """
+    st.subheader("📈 What-if Scenarios")
+    field = st.selectbox("Vary", SWEEP_FIELDS, format_func=FIELD_LABELS.get, key="sweep_field")
+    current = float(inputs.get(field) or 0.0)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        start = st.number_input("From (AED)", min_value=0.0, value=0.0, step=100_000.0, key="sweep_start")
+    with col2:
+        stop = st.number_input("To (AED)", min_value=0.0, value=max(2 * current, 10_000_000.0),
+                               step=100_000.0, key=f"sweep_stop_{field}")
+    with col3:
+        points = st.number_input("Points", min_value=2, max_value=10_000, value=2_000, step=500, key="sweep_points")
+    if stop <= start:
+        st.warning("'To' must be greater than 'From'.")
+        return
+
+    result = sweep(inputs, field, start, stop, points=int(points))
+    axis = f"{FIELD_LABELS[field]} (AED)"
+    chart = pd.DataFrame({
+        axis: result["values"],
+        "Tax Payable (AED)": result["tax_payable"],
+        "Taxable Income (AED)": result["taxable_income"],
+    })
+    # A folded Vega-Lite spec serializes the wide frame as-is; st.line_chart melts it in
+    # pandas first, which is ~40x slower at a few thousand points
+    st.vega_lite_chart(chart, {
+        "layer": [
+            {
+                "transform": [{"fold": ["Tax Payable (AED)", "Taxable Income (AED)"], "as": ["Series", "AED"]}],
+                "mark": "line",
+                "encoding": {
+                    "x": {"field": axis, "type": "quantitative"},
+                    "y": {"field": "AED", "type": "quantitative"},
+                    "color": {"field": "Series", "type": "nominal"},
+                },
+            },
+            {
+                "data": {"values": [{axis: m["value"], "Rule change": m["label"]} for m in result["markers"]]},
+                "mark": {"type": "rule", "strokeDash": [4, 4]},
+                "encoding": {"x": {"field": axis, "type": "quantitative"}, "tooltip": [{"field": "Rule change"}]},
+            },
+        ],
+    }, width="stretch")
+    if result["markers"]:
+        st.markdown("**Where the rules change**")
+        for marker in result["markers"]:
+            st.markdown(f"- AED {marker['value']:,.2f}: {marker['label']}")
+    st.caption(f"Your current {FIELD_LABELS[field].lower()}: AED {current:,.2f}")
@@ -2,12 +2,13 @@
 """
 Eligibility logic for UAE Corporate Tax Calculator.
 """
+from utils.rules import RULES_BY_PERIOD
 
 def check_eligibility(inputs: dict) -> dict:
     """
     Determine eligibility for UAE Corporate Tax based on user inputs.
     Args:
-        inputs (dict): User input data.
+        inputs (dict): User input data; "tax_period" selects the rule set (blank for the default period).
     Returns:
         dict: Eligibility status and message.
     """
@@ -64,7 +65,7 @@ def check_eligibility(inputs: dict) -> dict:
             }
 
     # Small Business Relief (Article 21)
-    if inputs["revenue"] <= 3_000_000:
+    if inputs["revenue"] <= RULES_BY_PERIOD[inputs.get("tax_period")].small_business_revenue:
         return {
             "is_taxable": False,
             "message": "✅ Small Business Relief: Revenue ≤ AED 3M. You are not subject to corporate tax."
@@ -97,7 +98,7 @@ def check_eligibility(inputs: dict) -> dict:
             "message": f"❌ Advanced/edge-case exemption claimed: {advanced_exemptions} [Check FTA law/circulars]."
         }
     # --- BEPS Pillar 2 (informative only for eligibility) ---
-    if is_mne_group == "Yes" and global_revenue >= 750_000_000:
+    if is_mne_group == "Yes" and global_revenue >= RULES_BY_PERIOD[inputs.get("tax_period")].pillar2_revenue:
         globe_etr = 0.0
         if globe_income > 0:
             globe_etr = (covered_taxes / globe_income) * 100
@@ -0,0 +1,438 @@
+# utils/benchmarks.py
+"""
+Throughput benchmark suite for the UAE Corporate Tax Calculator core.
+Each benchmark times one function (calculate_tax per rule branch, check_eligibility,
+registration_deadline_notes) over a seeded batch of scenario records and reports
+calls per second. Results can be saved as a JSON baseline and later runs compared
+against it; the run fails when any benchmark is slower than the baseline by more
+than the allowed percentage.
+
+The run also measures what disabled instrumentation costs: calculate_tax_record() with no probe
+active is timed against a copy with every `if probe:` block stripped out (the code as it was
+before utils.instrumentation), in the same run, and the run fails when the difference exceeds
+PROBE_OVERHEAD_TOLERANCE. Being a ratio on one machine, this check holds on any runner.
+
+Usage:
+    python -m utils.benchmarks --save                       # record .benchmarks/baseline.json
+    python -m utils.benchmarks --max-regression 10          # compare against it, exit 1 on regression
+    python -m utils.benchmarks --reference                  # report against the committed reference (CI)
+
+The committed reference (utils/benchmarks_baseline.json) was recorded on a developer machine, and
+absolute timings do not carry over to other machines or Python versions, so --reference only
+reports the changes against it and never fails the run. A regression check needs a local baseline
+saved on the same machine.
+"""
+import argparse
+import ast
+import gc
+import inspect
+import json
+import platform
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from eligibility_logic import check_eligibility
+from utils import instrumentation, tax_calculator
+from utils.records import TaxInput
+from utils.schema import INPUT_DEFAULTS
+from utils.tax_calculator import calculate_tax, calculate_tax_record, registration_deadline_notes
+
+DEFAULT_BASELINE = Path(".benchmarks/baseline.json")
+REFERENCE_BASELINE = Path(__file__).with_name("benchmarks_baseline.json")
+DEFAULT_RECORDS = 2_000
+DEFAULT_REPEAT = 7
+# Each timed pass loops over the records until at least this long has elapsed
+MIN_PASS_SECONDS = 0.1
+DEFAULT_MAX_REGRESSION = 10.0
+# Benchmarks that regress are measured again this many times before the run fails
+CONFIRM_RUNS = 2
+# Allowed slowdown, in percent, of calculate_tax_record() with instrumentation off against its probe-free copy.
+# The `if probe:` tests cost about 1-2%; back-to-back runs of the pair differ by up to 5% on a busy machine.
+PROBE_OVERHEAD_TOLERANCE = 10.0
+# Fixed evaluation date, so the registration notes do not drift with the calendar
+AS_OF = date(2025, 1, 31)
+
+
+def _base(rng):
+    """Inputs shared by every scenario: a realistic spread of the secondary fields."""
+    record = {**INPUT_DEFAULTS, "exempt_type": []}
+    record.update(
+        entity_type="Legal Entity",
+        deductions=0.0,
+        exempt_income=rng.choice((0.0, 0.0, rng.uniform(0, 500_000))),
+        prior_year_tax_losses=rng.choice((0.0, 0.0, rng.uniform(0, 2_000_000))),
+        entertainment_expenses=rng.choice((0.0, rng.uniform(0, 200_000))),
+        related_party_loan_interest=rng.choice((0.0, 0.0, rng.uniform(0, 1_000_000))),
+        fines=rng.choice((0.0, 0.0, 0.0, rng.uniform(0, 20_000))),
+        foreign_tax_paid=rng.choice((0.0, 0.0, 0.0, rng.uniform(0, 100_000))),
+        has_related_party_tx=rng.choice(("Yes", "No")),
+        has_audited_accounts=rng.choice(("Yes", "No")),
+        eligible_for_group_relief=rng.choice(("Yes", "No", "No")),
+        docs_uploaded=rng.random() < 0.7,
+        license_issue_date=date(2023, 6, 1) + timedelta(days=rng.randrange(600)),
+    )
+    return record
+
+
+def _revenue(rng, low, high, record):
+    record["revenue"] = round(rng.uniform(low, high), 2)
+    record["deductions"] = round(record["revenue"] * rng.uniform(0.1, 0.5), 2)
+    return record
+
+
+def _small_business(rng):
+    return _revenue(rng, 0, 3_000_000, _base(rng))
+
+
+def _standard(rng):
+    return _revenue(rng, 3_000_001, 200_000_000, _base(rng))
+
+
+def _free_zone(rng, low=3_000_001, high=500_000_000):
+    record = _revenue(rng, low, high, _base(rng))
+    record.update(free_zone="Yes", qualifying_fz="Yes")
+    return record
+
+
+def _qfzp_below_deminimis(rng):
+    record = _free_zone(rng)
+    record["non_qualifying_income"] = round(min(0.05 * record["revenue"], 5_000_000) * rng.uniform(0, 0.99), 2)
+    return record
+
+
+def _qfzp_above_deminimis(rng):
+    record = _free_zone(rng)
+    record["non_qualifying_income"] = round(min(0.05 * record["revenue"], 5_000_000) * rng.uniform(1, 3), 2)
+    return record
+
+
+def _dmtt(rng):
+    # The DMTT top-up is applied on the free zone path (revenue >= AED 3bn)
+    record = _free_zone(rng, 3_000_000_000, 20_000_000_000)
+    record["non_qualifying_income"] = round(rng.uniform(0, 20_000_000), 2)
+    return record
+
+
+def _non_resident_pe(rng):
+    record = _revenue(rng, 3_000_001, 100_000_000, _base(rng))
+    record.update(entity_type="Non-Resident", residency_status="No", pe_status="Yes")
+    return record
+
+
+def _extractive(rng):
+    record = _revenue(rng, 0, 1_000_000_000, _base(rng))
+    record["sector"] = rng.choice(("Extractive Business", "Non-Extractive Natural Resource Business"))
+    return record
+
+
+# Scenario name -> (record generator, share of the realistic mix)
+SCENARIOS = {
+    "sbr": (_small_business, 0.55),
+    "standard": (_standard, 0.25),
+    "qfzp_below_deminimis": (_qfzp_below_deminimis, 0.08),
+    "qfzp_above_deminimis": (_qfzp_above_deminimis, 0.04),
+    "non_resident_pe": (_non_resident_pe, 0.04),
+    "extractive": (_extractive, 0.02),
+    "dmtt": (_dmtt, 0.02),
+}
+
+
+def scenario_records(scenario: str, n: int = DEFAULT_RECORDS, seed: int = 0) -> list:
+    """
+    Seeded input records for one scenario, or for "mix" (all scenarios in their SCENARIOS shares).
+    """
+    rng = random.Random(f"{scenario}:{seed}")
+    if scenario == "mix":
+        generators = [generator for generator, _ in SCENARIOS.values()]
+        weights = [share for _, share in SCENARIOS.values()]
+        return [generator(rng) for generator in rng.choices(generators, weights, k=n)]
+    generator, _ = SCENARIOS[scenario]
+    return [generator(rng) for _ in range(n)]
+
+
+def _tax(record):
+    calculate_tax(record, as_of=AS_OF)
+
+
+def _deadline(record):
+    registration_deadline_notes(record["license_issue_date"], record["entity_type"], as_of=AS_OF)
+
+
+def without_probe(function):
+    """
+    Copy of a function with its instrumentation removed: the `probe = ...` assignment and every
+    `if probe:` block are stripped from its source, which is recompiled in the same module globals.
+    """
+    tree = ast.parse(inspect.getsource(function))
+    tree = ast.fix_missing_locations(_StripProbe().visit(tree))
+    namespace = dict(inspect.getmodule(function).__dict__)
+    exec(compile(tree, inspect.getsourcefile(function), "exec"), namespace)
+    return namespace[function.__name__]
+
+
+class _StripProbe(ast.NodeTransformer):
+    def visit_If(self, node):
+        if isinstance(node.test, ast.Name) and node.test.id == "probe":
+            return None
+        return self._keep_body(self.generic_visit(node))
+
+    def visit_Assign(self, node):
+        if any(isinstance(target, ast.Name) and target.id == "probe" for target in node.targets):
+            return None
+        return node
+
+    def generic_visit(self, node):
+        return self._keep_body(super().generic_visit(node))
+
+    @staticmethod
+    def _keep_body(node):
+        # A block left holding only `if probe:` statements still needs a body
+        if isinstance(getattr(node, "body", None), list) and not node.body:
+            node.body = [ast.Pass()]
+        return node
+
+
+_calculate_tax_record_without_probe = without_probe(calculate_tax_record)
+
+
+def _tax_record(record):
+    calculate_tax_record(record, as_of=AS_OF)
+
+
+def _tax_record_without_probe(record):
+    _calculate_tax_record_without_probe(record, as_of=AS_OF)
+
+
+# Benchmark name -> (function called once per record, scenario, run with utils.instrumentation on,
+# records passed as TaxInput instead of dicts)
+BENCHMARKS = {
+    **{f"calculate_tax[{scenario}]": (_tax, scenario, False, False) for scenario in SCENARIOS},
+    "calculate_tax[mix]": (_tax, "mix", False, False),
+    "calculate_tax[mix,instrumented]": (_tax, "mix", True, False),
+    "calculate_tax_record[mix]": (_tax_record, "mix", False, True),
+    "calculate_tax_record[mix,without_probe]": (_tax_record_without_probe, "mix", False, True),
+    "check_eligibility[mix]": (check_eligibility, "mix", False, False),
+    "registration_deadline_notes[mix]": (_deadline, "mix", False, False),
+}
+# Disabled instrumentation must cost nothing: (probe off, probe code removed), compared within one run
+PROBE_OVERHEAD_PAIR = ("calculate_tax_record[mix]", "calculate_tax_record[mix,without_probe]")
+
+
+def run_benchmarks(names=None, records: int = DEFAULT_RECORDS, repeat: int = DEFAULT_REPEAT, seed: int = 0) -> dict:
+    """
+    Time each benchmark over `records` scenario records, best of `repeat` passes.
+    As in timeit, the garbage collector is off while timing and the fastest pass is kept:
+    slower passes measure interference from the rest of the machine, not the code. Passes
+    are taken round-robin across benchmarks, so a slow spell hits all of them alike.
+    Args:
+        names (iterable): Benchmarks to run (default: all of BENCHMARKS).
+    Returns:
+        dict: Benchmark name -> calls per second.
+    """
+    names = list(names or BENCHMARKS)
+    inputs = {}
+    for name in names:
+        _, scenario, _, typed = BENCHMARKS[name]
+        inputs[name] = scenario_records(scenario, records, seed)
+        if typed:
+            inputs[name] = [TaxInput.from_dict(record) for record in inputs[name]]
+    results = dict.fromkeys(names, 0.0)
+    for _ in range(repeat):
+        for name in names:
+            function, _, instrumented, _ = BENCHMARKS[name]
+            if instrumented:
+                with instrumentation.enabled():
+                    ops = _timed_pass(function, inputs[name])
+            else:
+                ops = _timed_pass(function, inputs[name])
+            results[name] = max(results[name], ops)
+    return results
+
+
+def _timed_pass(function, inputs):
+    """Calls per second over whole loops of `inputs`, for at least MIN_PASS_SECONDS."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            for record in inputs:
+                function(record)
+            calls += len(inputs)
+            elapsed = time.perf_counter() - start
+            if elapsed >= MIN_PASS_SECONDS:
+                return calls / elapsed
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def save_baseline(results: dict, path=DEFAULT_BASELINE, records: int = DEFAULT_RECORDS):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    baseline = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "records": records,
+        "ops_per_sec": results,
+    }
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def load_baseline(path=DEFAULT_BASELINE) -> dict:
+    """Benchmark name -> calls per second from a saved baseline."""
+    return json.loads(Path(path).read_text())["ops_per_sec"]
+
+
+def compare(results: dict, baseline: dict, max_regression: float = DEFAULT_MAX_REGRESSION) -> list:
+    """
+    Compare a run against a baseline.
+    Args:
+        max_regression (float): Allowed throughput drop, in percent of the baseline.
+    Returns:
+        list: One {"name", "baseline", "current", "change_pct", "regressed"} dict per benchmark
+            present in both; "regressed" is True when the drop exceeds max_regression.
+    """
+    rows = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        change = (current / baseline[name] - 1) * 100
+        rows.append({"name": name, "baseline": baseline[name], "current": current,
+                     "change_pct": change, "regressed": change < -max_regression})
+    return rows
+
+
+def probe_overhead(results: dict):
+    """Percent by which disabled instrumentation slows calculate_tax_record(), or None if not measured."""
+    disabled, removed = PROBE_OVERHEAD_PAIR
+    if disabled not in results or removed not in results:
+        return None
+    return (1 - results[disabled] / results[removed]) * 100
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput benchmarks for the tax calculator core.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Fail when throughput drops more than this percentage (default: 10)")
+    parser.add_argument("--reference", action="store_true",
+                        help=f"Report against the committed reference baseline ({REFERENCE_BASELINE.name}); "
+                             "regressions are shown but do not fail the run")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--records", type=int, default=DEFAULT_RECORDS)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    args = parser.parse_args(argv)
+    if args.reference:
+        args.baseline = REFERENCE_BASELINE
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run_benchmarks(names, records=args.records, repeat=args.repeat)
+    if args.save:
+        save_baseline(results, args.baseline, args.records)
+    baseline = load_baseline(args.baseline) if args.baseline.exists() and not args.save else {}
+    rows = {row["name"]: row for row in compare(results, baseline, args.max_regression)}
+    for _ in range(0 if args.reference else CONFIRM_RUNS):
+        regressed = [name for name, row in rows.items() if row["regressed"]]
+        if not regressed:
+            break
+        again = run_benchmarks(regressed, records=args.records, repeat=args.repeat)
+        results.update((name, max(results[name], ops)) for name, ops in again.items())
+        rows = {row["name"]: row for row in compare(results, baseline, args.max_regression)}
+    for _ in range(CONFIRM_RUNS):
+        overhead = probe_overhead(results)
+        if overhead is None or overhead <= PROBE_OVERHEAD_TOLERANCE:
+            break
+        again = run_benchmarks(PROBE_OVERHEAD_PAIR, records=args.records, repeat=args.repeat)
+        results.update((name, max(results[name], ops)) for name, ops in again.items())
+
+    width = max(map(len, results))
+    for name, ops in results.items():
+        line = f"{name:<{width}} {ops:>12,.0f} calls/s"
+        if name in rows:
+            row = rows[name]
+            line += f"  {row['change_pct']:+6.1f}% vs {row['baseline']:,.0f}"
+            if row["regressed"]:
+                line += "  REGRESSION"
+        print(line)
+    if args.save:
+        print(f"Baseline saved to {args.baseline}")
+    overhead = probe_overhead(results)
+    if overhead is not None:
+        print(f"Disabled instrumentation overhead: {overhead:+.1f}% (limit {PROBE_OVERHEAD_TOLERANCE:g}%)")
+        if overhead > PROBE_OVERHEAD_TOLERANCE:
+            return 1
+    regressed = [name for name, row in rows.items() if row["regressed"]]
+    if regressed:
+        print(f"{len(regressed)} benchmark(s) regressed by more than {args.max_regression:g}%: {', '.join(regressed)}")
+        if args.reference:
+            print(f"Not failing: {args.baseline.name} was recorded on another machine")
+        else:
+            return 1
+    return 0
+
+
+# Automated test cases for pytest
+
+def test_scenarios_hit_their_branch():
+    """
+    Every record of a per-branch scenario takes the calculate_tax() branch it is named after.
+    """
+    from utils import notes as note
+
+    branch_notes = {
+        "sbr": note.SMALL_BUSINESS_RELIEF,
+        "standard": note.STANDARD_RATE,
+        "qfzp_below_deminimis": note.QFZP,
+        "qfzp_above_deminimis": note.QFZP_STATUS_LOST,
+        "dmtt": note.DMTT,
+        "non_resident_pe": note.NON_RESIDENT_PE,
+        "extractive": note.EXEMPT_SECTOR,
+    }
+    assert set(branch_notes) == set(SCENARIOS)
+    for scenario, code in branch_notes.items():
+        for record in scenario_records(scenario, 200):
+            assert code in calculate_tax(record, as_of=AS_OF)["notes"].codes, scenario
+    assert scenario_records("mix", 50, seed=3) == scenario_records("mix", 50, seed=3)
+
+
+def test_probe_free_copy_matches_and_records_nothing():
+    """
+    The stripped calculate_tax_record() gives the same results and never touches an active probe.
+    """
+    records = [TaxInput.from_dict(record) for record in scenario_records("mix", 300)]
+    with instrumentation.enabled() as probe:
+        for record in records:
+            assert _calculate_tax_record_without_probe(record, AS_OF) == calculate_tax_record(record, AS_OF)
+    assert probe.snapshot()["calls"] == len(records)
+    assert "probe" not in _calculate_tax_record_without_probe.__code__.co_varnames
+    assert abs(probe_overhead({PROBE_OVERHEAD_PAIR[0]: 95.0, PROBE_OVERHEAD_PAIR[1]: 100.0}) - 5.0) < 1e-9
+
+
+def test_baseline_round_trip_and_regression_threshold(tmp_path):
+    """
+    A saved run compares clean against itself; a drop beyond the threshold fails the run.
+    """
+    path = tmp_path / "baseline.json"
+    status = main(["--baseline", str(path), "--save", "--records", "20", "--repeat", "1", "--filter", "[mix]"])
+    saved = load_baseline(path)
+    assert status == 0 and set(saved) == {"calculate_tax[mix]", "calculate_tax_record[mix]", "check_eligibility[mix]",
+                                          "registration_deadline_notes[mix]"}
+    rows = compare({"a": 95.0, "b": 80.0, "c": 1.0}, {"a": 100.0, "b": 100.0}, max_regression=10)
+    assert [(row["name"], row["regressed"]) for row in rows] == [("a", False), ("b", True)]
+
+    path.write_text(json.dumps({"ops_per_sec": {name: ops * 100 for name, ops in saved.items()}}))
+    assert main(["--baseline", str(path), "--records", "20", "--repeat", "1", "--filter", "[mix]"]) == 1
+    # The committed reference covers every benchmark and only reports
+    assert set(load_baseline(REFERENCE_BASELINE)) == set(BENCHMARKS)
+    assert main(["--reference", "--records", "20", "--repeat", "1", "--filter", "check_eligibility",
+                 "--max-regression", "-1000"]) == 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# utils/cli.py
+"""
+NDJSON command-line interface for the UAE Corporate Tax Calculator.
+Reads one JSON object per line from stdin (get_user_inputs() field names; dates as
+"YYYY-MM-DD"), runs the eligibility check and, for taxable persons, the tax
+calculation, and writes one JSON result per line to stdout in input order.
+Only the Streamlit-free core is imported, so the command starts in tens of milliseconds.
+
+Usage:
+    cat entities.ndjson | python -m utils.cli --as-of 2025-01-31 > results.ndjson
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+from eligibility_logic import check_eligibility
+from utils.schema import INPUT_DEFAULTS
+from utils.tax_calculator import calculate_tax
+
+# Fields copied from each input line to its result line, when present
+PASSTHROUGH_FIELDS = ("id", "entity_id")
+# Modules the core must not pull in at import time
+HEAVY_MODULES = ("streamlit", "numpy", "pandas", "pyarrow")
+IMPORT_BUDGET_SECONDS = 0.1
+
+
+def evaluate_line(line: str, as_of: date = None, notes: bool = True) -> dict:
+    """
+    Evaluate one NDJSON input line (see evaluate_json_record).
+    """
+    return evaluate_json_record(json.loads(line), as_of=as_of, notes=notes)
+
+
+def evaluate_json_record(record: dict, as_of: date = None, notes: bool = True) -> dict:
+    """
+    Evaluate one decoded JSON input record.
+    Args:
+        record (dict): User input data; license_issue_date may be a "YYYY-MM-DD" string.
+        as_of (date): Date for the registration deadline notes (defaults to today).
+        notes (bool): Include the rendered compliance notes.
+    Returns:
+        dict: is_taxable and message, plus taxable_income, tax_payable (and notes) when taxable.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("each record must be a JSON object")
+    inputs = {**INPUT_DEFAULTS, "exempt_type": [], **record}
+    if isinstance(inputs["license_issue_date"], str):
+        inputs["license_issue_date"] = date.fromisoformat(inputs["license_issue_date"]) if inputs["license_issue_date"] else None
+
+    result = {name: record[name] for name in PASSTHROUGH_FIELDS if name in record}
+    eligibility = check_eligibility(inputs)
+    result["is_taxable"] = eligibility["is_taxable"]
+    result["message"] = eligibility["message"]
+    if eligibility["is_taxable"]:
+        tax = calculate_tax(inputs, as_of=as_of)
+        result["taxable_income"] = tax["taxable_income"]
+        result["tax_payable"] = tax["tax_payable"]
+        if notes:
+            result["notes"] = list(tax["notes"])
+    return result
+
+
+def run(stdin, stdout, as_of=None, notes=True, line_buffered=False) -> int:
+    """
+    Stream results for every non-blank line of stdin to stdout.
+    Lines that cannot be evaluated produce {"line": n, "error": ...} instead of a result.
+    Returns:
+        int: Number of failed lines.
+    """
+    errors = 0
+    dumps = json.dumps
+    for number, line in enumerate(stdin, start=1):
+        if not line.strip():
+            continue
+        try:
+            result = evaluate_line(line, as_of=as_of, notes=notes)
+        except Exception as exc:
+            result = {"line": number, "error": f"{type(exc).__name__}: {exc}"}
+            errors += 1
+        stdout.write(dumps(result, ensure_ascii=False) + "\n")
+        if line_buffered:
+            stdout.flush()
+    stdout.flush()
+    return errors
+
+
+def main(argv=None, stdin=None, stdout=None):
+    parser = argparse.ArgumentParser(description="UAE Corporate Tax calculation over NDJSON records (stdin -> stdout).")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None,
+                        help="Evaluation date for registration deadlines, YYYY-MM-DD (default: today)")
+    parser.add_argument("--no-notes", action="store_true", help="Leave compliance notes out of the results")
+    parser.add_argument("--line-buffered", action="store_true", help="Flush after every result line")
+    args = parser.parse_args(argv)
+    errors = run(stdin or sys.stdin, stdout or sys.stdout, as_of=args.as_of, notes=not args.no_notes,
+                 line_buffered=args.line_buffered)
+    return 1 if errors else 0
+
+
+# Automated test cases for pytest
+
+def test_cli_streams_results_in_order():
+    """
+    Each input line yields one result line; bad lines are reported in place.
+    """
+    import io
+
+    lines = [
+        json.dumps({"id": 1, "entity_type": "Legal Entity", "revenue": 10_000_000, "deductions": 1_000_000,
+                    "license_issue_date": "2024-01-10"}),
+        "",
+        "not json",
+        json.dumps({"id": 3, "entity_type": "Legal Entity", "exempt_type": ["Government Entity"]}),
+    ]
+    stdout = io.StringIO()
+    status = main(["--as-of", "2024-12-01"], stdin=io.StringIO("\n".join(lines) + "\n"), stdout=stdout)
+    results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert status == 1 and len(results) == 3
+    expected = calculate_tax({**json.loads(lines[0]), "license_issue_date": date(2024, 1, 10)}, as_of=date(2024, 12, 1))
+    assert results[0]["id"] == 1 and results[0]["tax_payable"] == expected["tax_payable"]
+    assert results[0]["notes"] == list(expected["notes"])
+    assert results[1]["line"] == 3 and results[1]["error"].startswith("JSONDecodeError")
+    assert results[2] == {"id": 3, "is_taxable": False,
+                          "message": "❌ You are exempt under Article 4: Government Entity."}
+
+
+def test_core_import_is_streamlit_free_and_fast():
+    """
+    Importing the CLI (and with it the calculator core) stays within the import-time budget.
+    """
+    import os
+    import subprocess
+
+    code = (
+        "import sys, time; start = time.perf_counter(); import utils.cli; "
+        "elapsed = time.perf_counter() - start; "
+        f"print(elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    for _ in range(3):
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        elapsed, loaded = output.stdout.split(" ", 1)
+        assert loaded.strip() == "[]"
+        timings.append(float(elapsed))
+    assert min(timings) < IMPORT_BUDGET_SECONDS, timings
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# utils/deadlines.py
+"""
+Table-driven Corporate Tax registration deadline calendar.
+Every entity type offered in components.business_info_section has a rule in
+DEADLINE_RULES; all rules end on the last day of a month, so a deadline is stored as a
+month index and the same table serves the scalar lookup used by the calculator and the
+vectorized (NumPy datetime64) portfolio scan.
+(This is a simplified calendar; for full compliance, use the FTA's full tables.)
+NumPy is imported by the vectorized functions only, so the scalar calculator does not
+pay for it at import time.
+"""
+from datetime import date
+from functools import lru_cache
+
+# Rule kinds
+CALENDAR = "calendar"              # month-end in the as_of year, picked by license issue month
+FOLLOWING_YEAR = "following_year"  # month-end in the year after the license was issued
+MONTHS_AFTER = "months_after"      # month-end a fixed number of months after the issue month
+
+# Deadline month (1-12) by license issue month, for juridical persons:
+# Jan-Feb -> 31 May, Mar-Apr -> 30 Jun, May -> 31 Jul, Jun -> 31 Aug, Jul -> 30 Sep,
+# Aug-Sep -> 31 Oct, Oct-Nov -> 30 Nov, Dec -> 31 Dec
+JURIDICAL_DEADLINE_MONTHS = (5, 5, 6, 6, 7, 8, 9, 10, 10, 11, 11, 12)
+
+DEADLINE_RULES = {
+    "Legal Entity": (CALENDAR, JURIDICAL_DEADLINE_MONTHS),
+    "Partnership": (CALENDAR, JURIDICAL_DEADLINE_MONTHS),
+    "Trust": (CALENDAR, JURIDICAL_DEADLINE_MONTHS),
+    "Natural Person": (FOLLOWING_YEAR, 3),
+    "Sole Proprietor": (FOLLOWING_YEAR, 3),
+    "Non-Resident": (MONTHS_AFTER, 9),
+}
+ENTITY_TYPES = tuple(DEADLINE_RULES)
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def registration_deadline(license_issue_date, entity_type, as_of=None):
+    """
+    Registration deadline for one license.
+    Args:
+        license_issue_date (date): License issue date (None if not known).
+        entity_type (str): Entity type as chosen in the input form.
+        as_of (date): Evaluation date (defaults to today); anchors the calendar rule.
+    Returns:
+        date: The deadline, or None when there is no date or no rule for the entity type.
+    """
+    rule = DEADLINE_RULES.get(entity_type)
+    if not license_issue_date or rule is None:
+        return None
+    kind, param = rule
+    if kind == CALENDAR:
+        year = (as_of or date.today()).year
+        month = param[license_issue_date.month - 1]
+    elif kind == FOLLOWING_YEAR:
+        year, month = license_issue_date.year + 1, param
+    else:
+        year, month = divmod(license_issue_date.year * 12 + license_issue_date.month - 1 + param, 12)
+        month += 1
+    return _month_end(year, month)
+
+
+def registration_deadlines(issue_dates, entity_types, as_of=None) -> dict:
+    """
+    Vectorized registration deadlines and overdue flags for many licenses.
+    Args:
+        issue_dates (array-like): License issue dates (datetime64 array, ISO strings, or
+            date objects with None for missing).
+        entity_types (str or array-like): One entity type for all licenses, or one per license.
+        as_of (date): Evaluation date (defaults to today).
+    Returns:
+        dict: "deadline" (datetime64[D], NaT where no rule applies) and "overdue" (bool).
+    """
+    import numpy as np
+
+    as_of = np.datetime64(as_of or date.today(), "D")
+    days = _to_days(issue_dates)
+    month_index = days.astype("datetime64[M]").astype(np.int64)   # months since 1970-01
+    issue_month = month_index % 12
+    valid = ~np.isnat(days)
+
+    kinds = _rule_index(entity_types, len(days))
+    deadline_month = np.zeros(len(days), dtype=np.int64)
+    for code, (kind, param) in enumerate(DEADLINE_RULES.values()):
+        rows = np.flatnonzero((kinds == code) & valid)
+        if not len(rows):
+            continue
+        if kind == CALENDAR:
+            anchor = as_of.astype("datetime64[Y]").astype(np.int64) * 12
+            deadline_month[rows] = anchor + np.asarray(param, dtype=np.int64)[issue_month[rows]] - 1
+        elif kind == FOLLOWING_YEAR:
+            deadline_month[rows] = (month_index[rows] - issue_month[rows]) + 12 + param - 1
+        else:
+            deadline_month[rows] = month_index[rows] + param
+    has_rule = valid & (kinds >= 0)
+    deadline = np.where(has_rule, (deadline_month + 1).astype("datetime64[M]").astype("datetime64[D]") - 1,
+                        np.datetime64("NaT", "D"))
+    return {"deadline": deadline, "overdue": has_rule & (deadline < as_of)}
+
+
+@lru_cache(maxsize=None)
+def _month_end(year, month):
+    if month == 12:
+        return date(year, 12, 31)
+    return date.fromordinal(date(year, month + 1, 1).toordinal() - 1)
+
+
+def _to_days(values):
+    """Convert issue dates to datetime64[D] without going through per-element NumPy parsing of date objects."""
+    import numpy as np
+
+    if isinstance(values, np.ndarray) and values.dtype.kind in "MUS":
+        return values.astype("datetime64[D]")
+    values = list(values) if not isinstance(values, np.ndarray) else values.tolist()
+    nat = np.datetime64("NaT", "D").astype(np.int64)
+    ordinals = np.fromiter(
+        (value.toordinal() - _EPOCH_ORDINAL if value else nat for value in values), dtype=np.int64, count=len(values)
+    )
+    return ordinals.view("datetime64[D]")
+
+
+def _rule_index(entity_types, n):
+    """Index of each license's rule in DEADLINE_RULES (-1 where there is none)."""
+    import numpy as np
+
+    if isinstance(entity_types, str):
+        return np.full(n, ENTITY_TYPES.index(entity_types) if entity_types in DEADLINE_RULES else -1, dtype=np.int64)
+    entity_types = np.asarray(entity_types)
+    codes = np.full(n, -1, dtype=np.int64)
+    for code, name in enumerate(ENTITY_TYPES):
+        codes[entity_types == name] = code
+    return codes
+
+
+# Automated test cases for pytest
+
+def test_registration_deadlines_match_scalar_rules():
+    """
+    The vectorized calendar agrees with registration_deadline() for every entity type.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(8)
+    n = 20_000
+    issue = np.datetime64("2019-01-01") + rng.integers(0, 2_500, n)
+    issue_dates = [None if i % 17 == 0 else d.item() for i, d in enumerate(issue)]
+    types = rng.choice(list(ENTITY_TYPES) + [""], n)
+    as_of = date(2024, 7, 15)
+    result = registration_deadlines(issue_dates, types, as_of=as_of)
+    for i in range(n):
+        expected = registration_deadline(issue_dates[i], types[i], as_of=as_of)
+        if expected is None:
+            assert np.isnat(result["deadline"][i]) and not result["overdue"][i]
+        else:
+            assert result["deadline"][i].item() == expected
+            assert result["overdue"][i] == (as_of > expected)
+    single = registration_deadlines(issue.astype("datetime64[D]"), "Non-Resident", as_of=as_of)
+    assert single["deadline"][0].item() == registration_deadline(issue[0].item(), "Non-Resident")
+    assert registration_deadline(date(2023, 1, 15), "Legal Entity", as_of=as_of) == date(2024, 5, 31)
+    assert registration_deadline(date(2023, 12, 1), "Natural Person") == date(2024, 3, 31)
+    assert registration_deadline(date(2023, 6, 30), "Non-Resident") == date(2024, 3, 31)
+
+
+def _benchmark(n=500_000):
+    import time
+    import numpy as np
+
+    rng = np.random.default_rng(1)
+    issue = np.datetime64("2019-01-01") + rng.integers(0, 2_500, n)
+    types = rng.choice(list(ENTITY_TYPES), n)
+    as_of = date(2024, 7, 15)
+    for label, dates in (("datetime64", issue), ("date objects", issue.astype(object))):
+        start = time.perf_counter()
+        result = registration_deadlines(dates, types, as_of=as_of)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12} {n:,} licenses in {elapsed * 1e3:6.1f} ms ({int(result['overdue'].sum()):,} overdue)")
+    dates = issue.astype(object).tolist()
+    start = time.perf_counter()
+    for d, t in zip(dates, types.tolist()):
+        registration_deadline(d, t, as_of)
+    print(f"scalar loop  {n:,} licenses in {(time.perf_counter() - start) * 1e3:6.1f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark()
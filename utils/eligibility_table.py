@@ -0,0 +1,370 @@
+# utils/eligibility_table.py
+"""
+Compiled decision-table form of eligibility_logic.check_eligibility().
+Every categorical input is reduced to the few classes the rules distinguish, and the
+rule chain is evaluated once at import over every class combination and both sides of
+the revenue (AED 3M) and Pillar 2 (EUR 750M) thresholds. Each record of a batch then
+resolves by signature lookup plus two comparisons against its tax period's thresholds
+(see utils.rules), all in one NumPy gather.
+
+Run `python -m utils.eligibility_table` for a benchmark against check_eligibility().
+"""
+import numpy as np
+
+from utils.batch_calculator import _length, _numeric, _choice, _non_blank, _is_scalar, _rule_columns
+from utils.schema import INPUT_DEFAULTS
+
+# --- Categorical classes (value -> class index; unknown values fall in class 0) ---
+SECTOR_CLASSES = {
+    "Extractive Business": 1,
+    "Non-Extractive Natural Resource Business": 1,
+    "Banking": 2,
+    "Insurance": 2,
+}
+ENTITY_CLASSES = {
+    "Non-Resident": 1,
+    "Legal Entity": 2,
+    "Natural Person": 2,
+    "Partnership": 2,
+    "Trust": 2,
+    "Sole Proprietor": 2,
+}
+QFZ_CLASSES = {"Yes": 1, "No": 2}
+YES = {"Yes": 1}
+
+# Signature dimensions, in the order used for the flat table index
+DIMENSIONS = (
+    ("exempt_type", 2),
+    ("transitional_period", 2),
+    ("sector", 3),
+    ("entity_type", 3),
+    ("pe_status", 2),
+    ("free_zone", 2),
+    ("qualifying_fz", 3),
+    ("residency_status", 2),
+    ("advanced_exemptions", 2),
+    ("is_mne_group", 2),
+    ("sector_details", 2),
+    ("gaar_warning", 2),
+    ("small_revenue", 2),
+    ("pillar2_revenue", 2),
+)
+SHAPE = tuple(size for _, size in DIMENSIONS)
+
+# --- Outcomes: (is_taxable, message or message template) ---
+OUTCOMES = (
+    (False, "❌ You are exempt under Article 4: {exempt_types}."),
+    (True, "⚠️ Transitional period: Special rules may apply for the first tax period. Please consult the FTA guidance."),
+    (False, "❌ You are exempt as an {sector} (subject to FTA approval and registration)."),
+    (True, "✅ {sector} sector: Subject to special UAE Corporate Tax rules."),
+    (True, "✅ Non-resident with UAE Permanent Establishment: Subject to UAE Corporate Tax on UAE-sourced income."),
+    (False, "❌ Non-resident without UAE PE: Not subject to UAE Corporate Tax (except on certain UAE-sourced income)."),
+    (True, "✅ Qualifying Free Zone Person: 0% on qualifying income, 9% on non-qualifying income (Article 18)."),
+    (True, "ℹ️ Free Zone Person (not qualifying). Standard tax rates apply (0%/9%)."),
+    (False, "✅ Small Business Relief: Revenue ≤ AED 3M. You are not subject to corporate tax."),
+    (True, "✅ You are subject to UAE Corporate Tax based on business activity and income."),
+    (False, "❌ Not a UAE resident for tax purposes. Check PE and source rules."),
+    (False, "❌ Advanced/edge-case exemption claimed: {advanced_exemptions} [Check FTA law/circulars]."),
+    (True, "🌍 BEPS Pillar 2: MNE group with global revenue EUR {global_revenue:,.0f}, GloBE ETR: {globe_etr:.2f}%. Top-up tax may apply if ETR < 15%."),
+    (True, "ℹ️ Sector details provided: {sector_details}. Please ensure all sector-specific rules are met."),
+    (True, "⚠️ You have not confirmed compliance with GAAR/anti-avoidance rules. Artificial arrangements may be challenged by the FTA. [Article 50]"),
+    (False, "❌ Based on your inputs, UAE Corporate Tax does not apply."),
+)
+(EXEMPT_PERSON, TRANSITIONAL, EXEMPT_SECTOR, SPECIAL_SECTOR, NON_RESIDENT_PE, NON_RESIDENT_NO_PE,
+ QUALIFYING_FREE_ZONE, FREE_ZONE_NON_QUALIFYING, SMALL_BUSINESS_RELIEF, RESIDENT, NOT_RESIDENT,
+ ADVANCED_EXEMPTION, PILLAR2, SECTOR_DETAILS, GAAR, NOT_APPLICABLE) = range(len(OUTCOMES))
+
+IS_TAXABLE = np.array([taxable for taxable, _ in OUTCOMES], dtype=bool)
+
+
+def _compile():
+    """
+    Evaluate the check_eligibility() rule chain over every signature. The conditions are
+    listed in the same order as the if-chain, and np.select keeps the first match.
+    """
+    (exempt, transitional, sector, entity, pe, free_zone, qfz, resident, advanced, mne,
+     sector_details, gaar, small_revenue, pillar2_revenue) = (a.ravel() for a in np.indices(SHAPE))
+    rules = [
+        (exempt == 1, EXEMPT_PERSON),
+        (transitional == 1, TRANSITIONAL),
+        (sector == 1, EXEMPT_SECTOR),
+        (sector == 2, SPECIAL_SECTOR),
+        ((entity == 1) & (pe == 1), NON_RESIDENT_PE),
+        (entity == 1, NON_RESIDENT_NO_PE),
+        ((free_zone == 1) & (qfz == 1), QUALIFYING_FREE_ZONE),
+        ((free_zone == 1) & (qfz == 2), FREE_ZONE_NON_QUALIFYING),
+        (small_revenue == 1, SMALL_BUSINESS_RELIEF),
+        ((entity == 2) & (resident == 1), RESIDENT),
+        (entity == 2, NOT_RESIDENT),
+        (advanced == 1, ADVANCED_EXEMPTION),
+        ((mne == 1) & (pillar2_revenue == 1), PILLAR2),
+        (sector_details == 1, SECTOR_DETAILS),
+        (gaar == 0, GAAR),
+    ]
+    table = np.select([c for c, _ in rules], [o for _, o in rules], default=NOT_APPLICABLE)
+    return table.astype(np.uint8)
+
+
+TABLE = _compile()
+
+
+def check_eligibility_batch(data):
+    """
+    Resolve eligibility for many records at once.
+    Args:
+        data (pandas.DataFrame | dict): One column per input field (see calculate_tax_batch).
+    Returns:
+        dict: "is_taxable" (bool array) and "outcome" (index into OUTCOMES) per record.
+            Messages are rendered on demand with eligibility_messages().
+    """
+    n = _length(data)
+    rules = _rule_columns(data, n)
+    signature = (
+        _truthy(data, "exempt_type", n),
+        _classes(data, "transitional_period", YES, n),
+        _classes(data, "sector", SECTOR_CLASSES, n),
+        _classes(data, "entity_type", ENTITY_CLASSES, n),
+        _classes(data, "pe_status", YES, n),
+        _classes(data, "free_zone", YES, n),
+        _classes(data, "qualifying_fz", QFZ_CLASSES, n),
+        _classes(data, "residency_status", YES, n),
+        _blank_or(data, "advanced_exemptions", n),
+        _classes(data, "is_mne_group", YES, n),
+        _truthy(data, "sector_details", n),
+        _truthy(data, "gaar_warning", n),
+        _numeric(data, "revenue", n) <= rules.small_business_revenue,
+        _numeric(data, "global_revenue", n) >= rules.pillar2_revenue,
+    )
+    outcome = TABLE[np.ravel_multi_index(tuple(np.asarray(s, dtype=np.intp) for s in signature), SHAPE)]
+    return {"is_taxable": IS_TAXABLE[outcome], "outcome": outcome}
+
+
+def eligibility_messages(data, outcome):
+    """
+    Render the check_eligibility() message for each record of a batch.
+    Static messages are shared string objects, and templated ones are formatted once per
+    distinct input value.
+    """
+    n = len(outcome)
+    messages = _MESSAGES[outcome]
+    for code, field in _TEMPLATE_FIELDS.items():
+        rows = np.flatnonzero(outcome == code).tolist()
+        if not rows:
+            continue
+        column = _raw(data, field, n)
+        rendered = {}
+        for i in rows:
+            value = column[i]
+            key = tuple(value) if code == EXEMPT_PERSON else value
+            if key not in rendered:
+                rendered[key] = render_message(code, {field: value})
+            messages[i] = rendered[key]
+    rows = np.flatnonzero(outcome == PILLAR2).tolist()
+    if rows:
+        columns = {name: _numeric(data, name, n) for name in ("global_revenue", "globe_income", "covered_taxes")}
+        for i in rows:
+            messages[i] = render_message(PILLAR2, {name: column[i] for name, column in columns.items()})
+    return messages.tolist()
+
+
+def render_message(outcome, inputs):
+    """Fill in the message template of an outcome from the record's inputs."""
+    message = OUTCOMES[outcome][1]
+    if outcome == EXEMPT_PERSON:
+        return message.format(exempt_types=", ".join(inputs["exempt_type"]))
+    if outcome in (EXEMPT_SECTOR, SPECIAL_SECTOR):
+        return message.format(sector=inputs["sector"])
+    if outcome == ADVANCED_EXEMPTION:
+        return message.format(advanced_exemptions=inputs["advanced_exemptions"])
+    if outcome == SECTOR_DETAILS:
+        return message.format(sector_details=inputs["sector_details"])
+    if outcome == PILLAR2:
+        globe_income = inputs.get("globe_income", 0.0)
+        globe_etr = (inputs.get("covered_taxes", 0.0) / globe_income) * 100 if globe_income > 0 else 0.0
+        return message.format(global_revenue=inputs.get("global_revenue", 0.0), globe_etr=globe_etr)
+    return message
+
+
+_MESSAGES = np.array([message for _, message in OUTCOMES], dtype=object)
+_TEMPLATE_FIELDS = {
+    EXEMPT_PERSON: "exempt_type",
+    EXEMPT_SECTOR: "sector",
+    SPECIAL_SECTOR: "sector",
+    ADVANCED_EXEMPTION: "advanced_exemptions",
+    SECTOR_DETAILS: "sector_details",
+}
+
+
+def _raw(data, name, n):
+    """A column as an indexable sequence, without NumPy coercion (exempt_type holds lists)."""
+    if name not in data:
+        return [INPUT_DEFAULTS[name]] * n
+    value = data[name]
+    if _is_scalar(value):
+        return [value] * n
+    return value.to_numpy() if hasattr(value, "to_numpy") else value
+
+
+def _blank_or(data, name, n):
+    """Vectorized `value and value.strip()` (see _non_blank)."""
+    flags = _categorical(data, name, lambda value: bool(value and value.strip()))
+    return flags if flags is not None else _non_blank(_choice(data, name, n))
+
+
+def _truthy(data, name, n):
+    flags = _categorical(data, name, bool)
+    if flags is not None:
+        return flags
+    values = _raw(data, name, n)
+    if isinstance(values, np.ndarray) and values.dtype.kind in "bU":
+        return values != "" if values.dtype.kind == "U" else values
+    return np.fromiter(map(bool, values), dtype=bool, count=len(values))
+
+
+def _categorical(data, name, classify):
+    """
+    For a pandas categorical column, classify each category once and gather by code.
+    Returns None for any other kind of column.
+    """
+    column = data[name] if name in data else None
+    if not hasattr(column, "cat"):
+        return None
+    lookup = np.array([classify(c) for c in column.cat.categories] + [classify(None)], dtype=np.intp)
+    return lookup[column.cat.codes.to_numpy()]  # code -1 (missing) picks the trailing entry
+
+
+def _classes(data, name, classes, n):
+    """Class index per row for a categorical input."""
+    codes = _categorical(data, name, lambda value: classes.get(value, 0))
+    if codes is not None:
+        return codes
+    values = _choice(data, name, n)
+    codes = np.zeros(n, dtype=np.intp)
+    for value, code in classes.items():
+        codes[values == value] = code
+    return codes
+
+
+# Automated test cases for pytest
+
+def test_check_eligibility_batch_exhaustive():
+    """
+    The compiled table must agree with check_eligibility() on every combination of the
+    categorical values the form can produce, on both sides of each numeric threshold.
+    """
+    from itertools import product
+    from eligibility_logic import check_eligibility
+
+    domains = {
+        "exempt_type": ([], ["Government Entity", "Qualifying Mutual Fund"]),
+        "transitional_period": ("No", "Yes"),
+        "sector": ("General Business", "Banking", "Insurance", "Extractive Business",
+                   "Non-Extractive Natural Resource Business", "Other"),
+        "entity_type": ("Legal Entity", "Natural Person", "Partnership", "Trust", "Sole Proprietor",
+                        "Non-Resident", ""),
+        "pe_status": ("No", "Yes", "Not Applicable"),
+        "free_zone": ("Yes", "No"),
+        "qualifying_fz": ("Yes", "No", "Not Applicable"),
+        "residency_status": ("Yes", "No"),
+        "advanced_exemptions": ("", "  ", "FTA Circular 2024-01"),
+        "is_mne_group": ("No", "Yes"),
+        "sector_details": ("", "Licensed Islamic Bank"),
+        "gaar_warning": (True, False),
+        "revenue": (3_000_000.0, 3_000_000.01),
+        "global_revenue": (749_999_999.0, 750_000_000.0),
+    }
+    names = list(domains)
+    records = [dict(zip(names, values), globe_income=100_000_000.0, covered_taxes=12_000_000.0)
+               for values in product(*domains.values())]
+    columns = {name: [r[name] for r in records] for name in records[0]}
+    batch = check_eligibility_batch(columns)
+    messages = eligibility_messages(columns, batch["outcome"])
+    for i, record in enumerate(records):
+        expected = check_eligibility(record)
+        assert batch["is_taxable"][i] == expected["is_taxable"], record
+        assert messages[i] == expected["message"], record
+
+    import pandas as pd
+    frame = pd.DataFrame(columns)
+    text = [name for name in names if name not in ("exempt_type", "revenue", "global_revenue")]
+    frame[text] = frame[text].astype("category")
+    assert (check_eligibility_batch(frame)["outcome"] == batch["outcome"]).all()
+
+
+def test_check_eligibility_batch_numpy_columns():
+    """
+    Fixed-width string and bool columns (the fast paths) resolve like Python lists.
+    """
+    from eligibility_logic import check_eligibility
+
+    records = [
+        {"exempt_type": [], "entity_type": "Other", "free_zone": "No", "qualifying_fz": "No",
+         "revenue": 5_000_000.0, "is_mne_group": "Yes", "global_revenue": 900_000_000.0,
+         "globe_income": 0.0, "covered_taxes": 0.0, "sector_details": " ", "gaar_warning": True},
+        {"exempt_type": [], "entity_type": "Other", "free_zone": "No", "qualifying_fz": "No",
+         "revenue": 5_000_000.0, "is_mne_group": "No", "global_revenue": 0.0,
+         "globe_income": 0.0, "covered_taxes": 0.0, "sector_details": "", "gaar_warning": False},
+    ]
+    columns = {name: np.array([r[name] for r in records]) for name in records[0] if name != "exempt_type"}
+    columns["exempt_type"] = [r["exempt_type"] for r in records]
+    batch = check_eligibility_batch(columns)
+    messages = eligibility_messages(columns, batch["outcome"])
+    for i, record in enumerate(records):
+        expected = check_eligibility(record)
+        assert (bool(batch["is_taxable"][i]), messages[i]) == (expected["is_taxable"], expected["message"])
+
+
+def _benchmark(n=500_000, seed=7):
+    import time
+    from eligibility_logic import check_eligibility
+
+    rng = np.random.default_rng(seed)
+    columns = {
+        "exempt_type": [[] if x > 0.05 else ["Government Entity"] for x in rng.random(n)],
+        "transitional_period": rng.choice(["No", "Yes"], n, p=[0.95, 0.05]),
+        "sector": rng.choice(["General Business", "Banking", "Insurance", "Extractive Business",
+                              "Non-Extractive Natural Resource Business", "Other"], n,
+                             p=[0.8, 0.04, 0.03, 0.01, 0.01, 0.11]),
+        "entity_type": rng.choice(["Legal Entity", "Natural Person", "Partnership", "Trust",
+                                   "Sole Proprietor", "Non-Resident"], n, p=[0.6, 0.1, 0.1, 0.02, 0.13, 0.05]),
+        "pe_status": rng.choice(["No", "Yes", "Not Applicable"], n, p=[0.6, 0.1, 0.3]),
+        "free_zone": rng.choice(["Yes", "No"], n, p=[0.25, 0.75]),
+        "qualifying_fz": rng.choice(["Yes", "No", "Not Applicable"], n, p=[0.15, 0.15, 0.7]),
+        "revenue": rng.lognormal(14.5, 1.5, n),
+        "residency_status": rng.choice(["Yes", "No"], n, p=[0.9, 0.1]),
+        "advanced_exemptions": rng.choice(["", "FTA Circular 2024-01"], n, p=[0.99, 0.01]),
+        "is_mne_group": rng.choice(["No", "Yes"], n, p=[0.95, 0.05]),
+        "global_revenue": rng.uniform(0, 2_000_000_000, n),
+        "globe_income": rng.uniform(0, 200_000_000, n),
+        "covered_taxes": rng.uniform(0, 30_000_000, n),
+        "sector_details": rng.choice(["", "Licensed Islamic Bank"], n, p=[0.95, 0.05]),
+        "gaar_warning": rng.random(n) < 0.97,
+    }
+    lists = {name: list(column) if isinstance(column, list) else column.tolist() for name, column in columns.items()}
+    records = [{name: lists[name][i] for name in lists} for i in range(n)]
+
+    timings = {}
+    start = time.perf_counter()
+    for record in records:
+        check_eligibility(record)
+    timings["check_eligibility (loop)"] = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = check_eligibility_batch(columns)
+    timings["check_eligibility_batch (status)"] = time.perf_counter() - start
+    eligibility_messages(columns, batch["outcome"])
+    timings["check_eligibility_batch (+ messages)"] = time.perf_counter() - start
+    import pandas as pd
+    frame = pd.DataFrame({name: pd.Categorical(column) if isinstance(column, np.ndarray) and column.dtype.kind == "U"
+                          else column for name, column in columns.items()})
+    start = time.perf_counter()
+    check_eligibility_batch(frame)
+    timings["check_eligibility_batch (categorical)"] = time.perf_counter() - start
+
+    baseline = timings["check_eligibility (loop)"]
+    print(f"Mixed population of {n:,} records")
+    for label, seconds in timings.items():
+        print(f"  {label:<38} {seconds * 1000:9.1f} ms  {n / seconds:>12,.0f} rec/s  x{baseline / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,413 @@
+# utils/goal_seek.py
+"""
+Goal-seek and inverse queries on the tax calculation.
+For a fixed entity profile, calculate_tax()'s tax payable (or taxable income) as a function of
+one numeric input is piecewise linear: every rule is a threshold, a cap, a floor or a rate. The
+compiler re-evaluates the calculation over PiecewiseLinear values instead of floats, so each
+comparison splits the input's domain where it flips. The result lists its breakpoints (the SBR
+and de-minimis cliffs, the 375k band, the EBITDA caps, the loss offset limit, the DMTT) and
+answers queries such as "the most revenue that keeps tax at or under X" or "the least
+deductions that keep taxable income within the band" by walking a few linear pieces.
+
+Values are exact up to float arithmetic; calculate_tax() additionally rounds its results to cents.
+
+Usage:
+    f = compile_tax_function(profile, "revenue")
+    f.max_input(1_000_000)      # most revenue with tax payable <= 1M
+    f.breakpoints()             # where the slope or the value jumps
+"""
+from bisect import bisect_left, bisect_right
+
+from utils.records import EntityType, EXEMPT_SECTORS, TaxInput
+from utils.rules import RULES_BY_PERIOD
+from utils.schema import NUMERIC_FIELDS
+
+DEFAULT_DOMAIN = (0.0, 1e12)
+OUTPUTS = ("tax_payable", "taxable_income")
+
+
+class PiecewiseLinear:
+    """
+    A function on [knots[0], knots[-1]]: values[i] is f(knots[i]), and on the open interval
+    between knots[i] and knots[i + 1] f(x) = slopes[i] * x + intercepts[i]. Keeping the knot
+    values separate represents jumps exactly, including which side owns the threshold itself.
+    """
+    __slots__ = ("knots", "values", "slopes", "intercepts")
+
+    def __init__(self, knots, values, slopes, intercepts):
+        self.knots = knots
+        self.values = values
+        self.slopes = slopes
+        self.intercepts = intercepts
+
+    @classmethod
+    def constant(cls, value, lo, hi):
+        return cls([lo, hi], [value, value], [0.0], [value])
+
+    @classmethod
+    def identity(cls, lo, hi):
+        return cls([lo, hi], [lo, hi], [1.0], [0.0])
+
+    def __call__(self, x: float) -> float:
+        knots = self.knots
+        i = bisect_left(knots, x)
+        if i < len(knots) and knots[i] == x:
+            return self.values[i]
+        if i == 0 or i == len(knots):
+            raise ValueError(f"{x} is outside the domain [{knots[0]}, {knots[-1]}]")
+        return self.slopes[i - 1] * x + self.intercepts[i - 1]
+
+    def breakpoints(self) -> list:
+        """Inner knots: where the slope changes or the value jumps."""
+        return self.knots[1:-1]
+
+    # --- Arithmetic (other operand a PiecewiseLinear on the same domain, or a number) ---
+    def __add__(self, other):
+        if not isinstance(other, PiecewiseLinear):
+            return PiecewiseLinear(self.knots, [v + other for v in self.values], self.slopes,
+                                   [c + other for c in self.intercepts])
+        return _combine(self, other, lambda a, b: a + b)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __neg__(self):
+        return self * -1.0
+
+    def __mul__(self, factor: float):
+        return PiecewiseLinear(self.knots, [v * factor for v in self.values], [s * factor for s in self.slopes],
+                               [c * factor for c in self.intercepts])
+
+    __rmul__ = __mul__
+
+    # --- Queries ---
+    def max_input(self, target: float):
+        """
+        Largest input with f(input) <= target (the supremum, when f jumps above target there), or
+        None when no input in the domain qualifies.
+        """
+        knots, values = self.knots, self.values
+        for i in range(len(knots) - 1, -1, -1):
+            if values[i] <= target:
+                return knots[i]
+            if i == 0:
+                break
+            a, b, s, c = knots[i - 1], knots[i], self.slopes[i - 1], self.intercepts[i - 1]
+            if s == 0:
+                if c <= target:
+                    return b
+            elif s > 0:
+                x = (target - c) / s
+                if x > a:
+                    return min(x, b)
+            elif (target - c) / s < b:
+                return b
+        return None
+
+    def min_input(self, target: float):
+        """Smallest input with f(input) <= target (the infimum across a jump), or None."""
+        knots, values = self.knots, self.values
+        for i in range(len(knots)):
+            if values[i] <= target:
+                return knots[i]
+            if i == len(knots) - 1:
+                break
+            a, b, s, c = knots[i], knots[i + 1], self.slopes[i], self.intercepts[i]
+            if s == 0:
+                if c <= target:
+                    return a
+            elif s < 0:
+                x = (target - c) / s
+                if x < b:
+                    return max(x, a)
+            elif (target - c) / s > a:
+                return a
+        return None
+
+    def solve(self, target: float):
+        """Smallest input with f(input) == target, or None (f may jump over target)."""
+        knots, values = self.knots, self.values
+        for i in range(len(knots)):
+            if values[i] == target:
+                return knots[i]
+            if i < len(knots) - 1 and self.slopes[i] != 0:
+                x = (target - self.intercepts[i]) / self.slopes[i]
+                if knots[i] < x < knots[i + 1]:
+                    return x
+        return None
+
+
+def compile_tax_function(inputs: dict, variable: str, domain: tuple = DEFAULT_DOMAIN,
+                         output: str = "tax_payable") -> PiecewiseLinear:
+    """
+    calculate_tax()'s result as an explicit piecewise linear function of one input.
+    Args:
+        inputs (dict): Entity profile, as for calculate_tax(); the variable's own value is ignored.
+        variable (str): Numeric input to vary (a schema.NUMERIC_FIELDS name, e.g. "revenue").
+        domain (tuple): (low, high) range of the variable.
+        output (str): "tax_payable" or "taxable_income".
+    Returns:
+        PiecewiseLinear: Unrounded result for every value of the variable in the domain.
+    Raises:
+        ValueError: For an unknown variable or output, or an empty domain.
+    """
+    if variable not in NUMERIC_FIELDS:
+        raise ValueError(f"Unknown numeric input {variable!r}")
+    if output not in OUTPUTS:
+        raise ValueError(f"output must be one of {OUTPUTS}")
+    lo, hi = domain
+    if not lo < hi:
+        raise ValueError("domain must be (low, high) with low < high")
+    record = TaxInput.from_dict(inputs)
+    rules = RULES_BY_PERIOD[record.tax_period]
+    zero = PiecewiseLinear.constant(0.0, lo, hi)
+    x = PiecewiseLinear.identity(lo, hi)
+
+    def value(name):
+        return x if name == variable else PiecewiseLinear.constant(float(getattr(record, name)), lo, hi)
+
+    non_resident = record.entity_type is EntityType.NON_RESIDENT
+    if ((record.advanced_exemptions and record.advanced_exemptions.strip()) or record.sector in EXEMPT_SECTORS
+            or (non_resident and not record.pe_status)):
+        return zero
+    revenue = value("revenue")
+    exempt_income = value("exempt_income")
+
+    # --- Deductions: interest, entertainment and related party caps, non-deductibles ---
+    ebitda = revenue - exempt_income
+    interest_cap = ebitda * rules.interest_ebitda_share
+    deductions = value("deductions")
+    deductions = where(deductions, ">", interest_cap, interest_cap, deductions)
+    entertainment_expenses = value("entertainment_expenses")
+    deductions = deductions - (entertainment_expenses - entertainment_expenses * 0.5)
+    related_party_loan_interest = value("related_party_loan_interest")
+    related_party_cap = ebitda * rules.interest_ebitda_share
+    deductions = where(related_party_loan_interest, ">", related_party_cap,
+                       deductions - (related_party_loan_interest - related_party_cap), deductions)
+    deductions = deductions - (value("fines") + value("bribes") + value("non_approved_donations")
+                               + value("other_non_deductibles"))
+    deductions = where(deductions, "<", 0.0, zero, deductions)
+    exempt_income = exempt_income + value("participation_exempt_income")
+    base_income = maximum(revenue - deductions - exempt_income, zero)
+
+    # --- Free Zone de-minimis ---
+    taxable_income = base_income
+    if record.free_zone and record.qualifying_fz:
+        non_qualifying_income = value("non_qualifying_income")
+        deminimis_limit = minimum(revenue * rules.qfzp_deminimis_share,
+                                  PiecewiseLinear.constant(rules.qfzp_deminimis_cap, lo, hi))
+        taxable_income = where(non_qualifying_income, ">=", deminimis_limit,
+                               base_income, maximum(non_qualifying_income, zero))
+
+    # --- Loss offset, band, DMTT, credits ---
+    prior_year_tax_losses = value("prior_year_tax_losses")
+    taxable_income = taxable_income - minimum(prior_year_tax_losses, taxable_income * rules.loss_offset_share)
+    tax_payable = where(taxable_income, "<=", rules.zero_rate_band, zero,
+                        (taxable_income - rules.zero_rate_band) * rules.standard_rate)
+    dmtt = maximum(taxable_income * rules.dmtt_rate - tax_payable, zero)
+    tax_payable = where(revenue, ">=", rules.dmtt_revenue, tax_payable + dmtt, tax_payable)
+    for name in ("foreign_tax_paid", "zakat_paid"):
+        credit = value(name)
+        tax_payable = where(credit, ">", 0.0, maximum(tax_payable - credit, zero), tax_payable)
+
+    result = tax_payable if output == "tax_payable" else taxable_income
+    # --- Small Business Relief (checked before the rest in calculate_tax; same result) ---
+    if not non_resident:
+        result = where(revenue, "<=", rules.small_business_revenue, zero, result)
+    return _simplify(result)
+
+
+def compile_batch(profiles, variable: str, domain: tuple = DEFAULT_DOMAIN, output: str = "tax_payable") -> list:
+    """compile_tax_function() for every profile in a list."""
+    return [compile_tax_function(inputs, variable, domain, output) for inputs in profiles]
+
+
+def goal_seek(profiles, variable: str, target: float, query: str = "max_input",
+              domain: tuple = DEFAULT_DOMAIN, output: str = "tax_payable") -> list:
+    """
+    Answer one query for many profiles.
+    Args:
+        profiles (list): Entity profiles (calculate_tax() input dicts).
+        variable (str): Input to solve for.
+        target (float): Target value of the output.
+        query (str): "max_input", "min_input" or "solve" (see PiecewiseLinear).
+    Returns:
+        list: One answer (float or None) per profile.
+    """
+    if query not in ("max_input", "min_input", "solve"):
+        raise ValueError(f"Unknown query {query!r}")
+    return [getattr(function, query)(target) for function in compile_batch(profiles, variable, domain, output)]
+
+
+# --- Operations on PiecewiseLinear values ---
+
+def maximum(f, g):
+    """Pointwise max (Python's max keeps the first argument on ties; the value is the same)."""
+    return where(g, ">", f, g, f)
+
+
+def minimum(f, g):
+    return where(g, "<", f, g, f)
+
+
+_COMPARISONS = {
+    "<": lambda d: d < 0, "<=": lambda d: d <= 0, ">": lambda d: d > 0, ">=": lambda d: d >= 0,
+}
+
+
+def where(u, op: str, v, then, otherwise):
+    """`then if u <op> v else otherwise`, pointwise; u, v, then and otherwise may be numbers."""
+    lo, hi = _domain(u, v, then, otherwise)
+    test = _COMPARISONS[op]
+    difference = _split_at_roots(_as_function(u, lo, hi) - _as_function(v, lo, hi))
+    then = _as_function(then, lo, hi)
+    otherwise = _as_function(otherwise, lo, hi)
+    knots = sorted(set(difference.knots) | set(then.knots) | set(otherwise.knots))
+    values, slopes, intercepts = [], [], []
+    for i, knot in enumerate(knots):
+        values.append((then if test(difference(knot)) else otherwise)(knot))
+        if i + 1 < len(knots):
+            middle = (knot + knots[i + 1]) / 2
+            chosen = then if test(difference(middle)) else otherwise
+            j = bisect_right(chosen.knots, middle) - 1
+            slopes.append(chosen.slopes[j])
+            intercepts.append(chosen.intercepts[j])
+    return _simplify(PiecewiseLinear(knots, values, slopes, intercepts))
+
+
+def _combine(f, g, op):
+    knots = sorted(set(f.knots) | set(g.knots))
+    values = [op(f(knot), g(knot)) for knot in knots]
+    slopes, intercepts = [], []
+    for a, b in zip(knots, knots[1:]):
+        middle = (a + b) / 2
+        i = bisect_right(f.knots, middle) - 1
+        j = bisect_right(g.knots, middle) - 1
+        slopes.append(op(f.slopes[i], g.slopes[j]))
+        intercepts.append(op(f.intercepts[i], g.intercepts[j]))
+    return _simplify(PiecewiseLinear(knots, values, slopes, intercepts))
+
+
+def _split_at_roots(f):
+    """Add a knot (with value exactly 0) wherever a linear piece crosses zero inside its interval."""
+    knots, values, slopes, intercepts = [f.knots[0]], [f.values[0]], [], []
+    for i, (a, b) in enumerate(zip(f.knots, f.knots[1:])):
+        s, c = f.slopes[i], f.intercepts[i]
+        if s != 0:
+            root = -c / s
+            if a < root < b:
+                slopes.append(s)
+                intercepts.append(c)
+                knots.append(root)
+                values.append(0.0)
+        slopes.append(s)
+        intercepts.append(c)
+        knots.append(b)
+        values.append(f.values[i + 1])
+    return PiecewiseLinear(knots, values, slopes, intercepts)
+
+
+def _simplify(f):
+    """Drop knots where the same line continues through the knot's own value."""
+    knots, values, slopes, intercepts = [f.knots[0]], [f.values[0]], [], []
+    for i in range(len(f.slopes)):
+        s, c = f.slopes[i], f.intercepts[i]
+        if slopes and slopes[-1] == s and intercepts[-1] == c and _close(values[-1], s * knots[-1] + c):
+            knots[-1], values[-1] = f.knots[i + 1], f.values[i + 1]
+            continue
+        slopes.append(s)
+        intercepts.append(c)
+        knots.append(f.knots[i + 1])
+        values.append(f.values[i + 1])
+    return PiecewiseLinear(knots, values, slopes, intercepts)
+
+
+def _close(a, b):
+    return abs(a - b) <= 1e-9 * max(1.0, abs(a), abs(b))
+
+
+def _as_function(value, lo, hi):
+    return value if isinstance(value, PiecewiseLinear) else PiecewiseLinear.constant(float(value), lo, hi)
+
+
+def _domain(*operands):
+    for operand in operands:
+        if isinstance(operand, PiecewiseLinear):
+            return operand.knots[0], operand.knots[-1]
+    raise ValueError("at least one operand must be a PiecewiseLinear")
+
+
+# Automated test cases for pytest
+
+def test_compiled_function_matches_calculate_tax():
+    """
+    Compiled functions agree with calculate_tax() on and around every breakpoint, and the goal-seek
+    answers sit right at the target.
+    """
+    import random
+
+    from utils.batch_calculator import _random_corpus
+    from utils.tax_calculator import calculate_tax
+
+    rng = random.Random(3)
+    corpus = _random_corpus(300, seed=17)
+    variables = ["revenue", "deductions", "exempt_income", "non_qualifying_income", "prior_year_tax_losses",
+                 "foreign_tax_paid", "zakat_paid", "entertainment_expenses", "related_party_loan_interest"]
+    domain = (0.0, 5e9)
+    for i in range(300):
+        profile = {name: corpus[name][i].item() for name in corpus}
+        variable = variables[i % len(variables)]
+        for output in OUTPUTS:
+            function = compile_tax_function(profile, variable, domain, output)
+            points = [rng.uniform(*domain) for _ in range(5)] + [rng.uniform(0, 2e7) for _ in range(5)]
+            for knot in function.breakpoints():
+                points += [knot, knot - 0.01, knot + 0.01]
+            for point in points:
+                point = round(min(max(point, 0.0), domain[1]), 2)
+                expected = calculate_tax({**profile, variable: point})[output]
+                assert abs(function(point) - expected) <= 0.011 + 1e-9 * abs(expected), (profile, variable, point)
+
+    # Most revenue keeping tax payable at or under AED 500,000, for a standard rate entity
+    profile = {"entity_type": "Legal Entity", "deductions": 1_000_000}
+    function = compile_tax_function(profile, "revenue", domain)
+    revenue = function.max_input(500_000)
+    assert abs(revenue - (500_000 / 0.09 + 1_375_000)) < 1e-6
+    assert abs(calculate_tax({**profile, "revenue": revenue})["tax_payable"] - 500_000) < 0.01
+    # Tax is zero up to the SBR threshold and then jumps past AED 100,000
+    assert 3_000_000 in function.breakpoints() and function(3_000_000) == 0
+    assert function.max_input(100_000) == 3_000_000 and function.solve(100_000) is None
+    # Least deductions for tax payable of at most AED 480,000; deductions are capped at 30% of EBITDA
+    # (2.4M here), so taxable income can never be brought within the 375k band
+    profile = {"entity_type": "Legal Entity", "revenue": 8_000_000}
+    assert goal_seek([profile], "deductions", 480_000, "min_input", domain) == [
+        compile_tax_function(profile, "deductions", domain).min_input(480_000)]
+    deductions = goal_seek([profile], "deductions", 480_000, "min_input", domain)[0]
+    assert abs(deductions - (8_000_000 - 480_000 / 0.09 - 375_000)) < 1e-6
+    assert goal_seek([profile], "deductions", 375_000, "min_input", domain, "taxable_income") == [None]
+
+
+def _benchmark(n=2_000):
+    import time
+
+    from utils.batch_calculator import _random_corpus
+
+    corpus = _random_corpus(n, seed=0)
+    profiles = [{name: corpus[name][i].item() for name in corpus} for i in range(n)]
+    start = time.perf_counter()
+    functions = compile_batch(profiles, "revenue")
+    compiled = time.perf_counter() - start
+    start = time.perf_counter()
+    answers = [function.max_input(250_000) for function in functions]
+    queried = time.perf_counter() - start
+    pieces = sum(len(function.slopes) for function in functions) / n
+    print(f"{n:,} profiles: compile {compiled * 1e6 / n:.0f} us/profile ({pieces:.1f} pieces on average), "
+          f"max_input query {queried * 1e6 / n:.2f} us; {sum(a is not None for a in answers):,} answered")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,188 @@
+# utils/instrumentation.py
+"""
+Optional instrumentation for calculate_tax(): per-stage timings and branch hit counters,
+exported as Prometheus/OpenMetrics text or JSON.
+Off by default. calculate_tax_record() reads `active` once per call and only touches the
+probe when it is set, so the disabled cost is one attribute read and a few local truth
+tests per calculation.
+
+Usage:
+    with instrumentation.enabled() as probe:
+        for inputs in population:
+            calculate_tax(inputs)
+    print(probe.to_openmetrics())
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Stages timed inside calculate_tax_record(), in evaluation order
+STAGES = (
+    "interest_cap", "entertainment_cap", "non_deductibles", "exempt_sector", "sbr", "non_resident",
+    "free_zone", "loss_offset", "dmtt", "deadline_notes", "offsets",
+)
+# Paths out of calculate_tax_record(); same order as utils.batch_calculator.BRANCH_NAMES
+BRANCHES = (
+    "advanced_exemption", "exempt_sector", "small_business_relief", "non_resident_no_pe",
+    "qfzp", "qfzp_status_lost", "standard_rate",
+)
+# Conditions counted alongside the branch
+EVENTS = ("interest_capped", "dmtt", "non_resident_pe", "registration_overdue")
+
+# The probe calculate_tax_record() reports to, or None when instrumentation is off
+active = None
+
+
+class Probe:
+    """
+    Accumulates stage timings and branch/event counts. Safe to share between threads.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.seconds = 0.0
+            self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+            self.stage_counts = dict.fromkeys(STAGES, 0)
+            self.branches = dict.fromkeys(BRANCHES, 0)
+            self.events = dict.fromkeys(EVENTS, 0)
+
+    def lap(self, stage: str, since: float) -> float:
+        """Add the time since `since` to a stage; returns the clock reading to time the next stage from."""
+        now = self.clock()
+        with self._lock:
+            self.stage_seconds[stage] += now - since
+            self.stage_counts[stage] += 1
+        return now
+
+    def event(self, name: str):
+        with self._lock:
+            self.events[name] += 1
+
+    def finish(self, branch: str, started: float):
+        """Count one finished calculation that took `branch` and started at `started`."""
+        now = self.clock()
+        with self._lock:
+            self.calls += 1
+            self.seconds += now - started
+            self.branches[branch] += 1
+
+    def snapshot(self) -> dict:
+        """
+        JSON-ready copy of the counters.
+        Returns:
+            dict: calls, seconds, stages ({stage: {"count", "seconds"}}), branches and events.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "seconds": self.seconds,
+                "stages": {stage: {"count": self.stage_counts[stage], "seconds": self.stage_seconds[stage]}
+                           for stage in STAGES},
+                "branches": dict(self.branches),
+                "events": dict(self.events),
+            }
+
+    def to_openmetrics(self, openmetrics: bool = True) -> str:
+        """
+        Prometheus text exposition of the counters.
+        Args:
+            openmetrics (bool): OpenMetrics 1.0 (ends with "# EOF"); False gives the classic
+                Prometheus 0.0.4 text format.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP tax_calculator_calculation_seconds Time spent in calculate_tax.",
+            "# TYPE tax_calculator_calculation_seconds summary",
+            f"tax_calculator_calculation_seconds_sum {snapshot['seconds']!r}",
+            f"tax_calculator_calculation_seconds_count {snapshot['calls']}",
+            "# HELP tax_calculator_stage_seconds Time spent in each calculate_tax stage.",
+            "# TYPE tax_calculator_stage_seconds summary",
+        ]
+        for stage, values in snapshot["stages"].items():
+            lines.append(f'tax_calculator_stage_seconds_sum{{stage="{stage}"}} {values["seconds"]!r}')
+            lines.append(f'tax_calculator_stage_seconds_count{{stage="{stage}"}} {values["count"]}')
+        for family, label, counts, help_text in (
+            ("tax_calculator_branch", "branch", snapshot["branches"], "Calculations by rule branch taken."),
+            ("tax_calculator_event", "event", snapshot["events"], "Calculations where a condition applied."),
+        ):
+            # OpenMetrics names the counter family without its _total sample suffix; the classic
+            # format expects HELP and TYPE on the sample name itself
+            metric = family if openmetrics else f"{family}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{family}_total{{{label}="{name}"}} {count}' for name, count in counts.items())
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def enable(probe: Probe = None) -> Probe:
+    """Start reporting calculate_tax() stages to probe (a new Probe by default) and return it."""
+    global active
+    active = probe or Probe()
+    return active
+
+
+def disable():
+    global active
+    active = None
+
+
+@contextmanager
+def enabled(probe: Probe = None):
+    """Instrument calculate_tax() inside a with block; restores the previous probe on exit."""
+    global active
+    previous = active
+    probe = enable(probe)
+    try:
+        yield probe
+    finally:
+        active = previous
+
+
+# Automated test cases for pytest
+
+def test_probe_counts_branches_and_exports():
+    """
+    Branch counters agree with the note codes, every path is timed, and both exports carry the counts.
+    """
+    import json
+
+    from utils import notes as note
+    from utils.benchmarks import AS_OF, SCENARIOS, scenario_records
+    from utils.tax_calculator import calculate_tax
+
+    branch_codes = {
+        "exempt_sector": note.EXEMPT_SECTOR, "small_business_relief": note.SMALL_BUSINESS_RELIEF,
+        "non_resident_no_pe": note.NON_RESIDENT_NO_PE, "qfzp": note.QFZP,
+        "qfzp_status_lost": note.QFZP_STATUS_LOST, "standard_rate": note.STANDARD_RATE,
+        "advanced_exemption": note.ADVANCED_EXEMPTION,
+    }
+    records = [record for scenario in SCENARIOS for record in scenario_records(scenario, 30)]
+    records += [{"entity_type": "Non-Resident", "revenue": 5e6}, {"advanced_exemptions": "Ruling"}]
+    expected = dict.fromkeys(BRANCHES, 0)
+    with enabled() as probe:
+        for record in records:
+            codes = calculate_tax(record, as_of=AS_OF)["notes"].codes
+            expected[next(name for name, code in branch_codes.items() if code in codes)] += 1
+    assert active is None
+    snapshot = probe.snapshot()
+    assert snapshot["branches"] == expected and snapshot["calls"] == len(records)
+    assert snapshot["events"]["dmtt"] == 30 and snapshot["events"]["non_resident_pe"] == 30
+    assert all(values["count"] > 0 and values["seconds"] > 0 for values in snapshot["stages"].values())
+    assert snapshot["seconds"] > sum(values["seconds"] for values in snapshot["stages"].values())
+
+    text = probe.to_openmetrics()
+    assert f'tax_calculator_branch_total{{branch="qfzp"}} {expected["qfzp"]}' in text and text.endswith("# EOF\n")
+    assert f"tax_calculator_calculation_seconds_count {len(records)}" in text
+    classic = probe.to_openmetrics(openmetrics=False)
+    assert not classic.endswith("# EOF\n")
+    assert "# TYPE tax_calculator_branch_total counter" in classic
+    assert "# TYPE tax_calculator_event_total counter" in classic
+    assert json.loads(json.dumps(snapshot)) == snapshot
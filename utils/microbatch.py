@@ -0,0 +1,274 @@
+# utils/microbatch.py
+"""
+Asyncio micro-batching front end for the tax calculator.
+Concurrent single-record requests are queued and coalesced into batches (up to
+max_batch records, or whatever arrived within max_wait seconds of the first one),
+each batch is evaluated in one call of the vectorized engine, and every caller's
+future is resolved with its own result. A bounded queue gives back-pressure.
+"""
+import asyncio
+import time
+
+from utils.batch_calculator import calculate_tax_batch
+from utils.schema import INPUT_DEFAULTS
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT = 0.0
+DEFAULT_MAX_QUEUE = 10_000
+
+_BATCH_FIELDS = tuple(name for name, default in INPUT_DEFAULTS.items() if not isinstance(default, list))
+
+
+def calculate_tax_records(records: list) -> list:
+    """
+    Taxable income and tax payable for a list of input dicts, via calculate_tax_batch().
+    Returns:
+        list: One {"taxable_income", "tax_payable"} dict per record, equal to calculate_tax()'s figures.
+    """
+    columns = {name: [record.get(name, default) for record in records]
+               for name, default in INPUT_DEFAULTS.items() if name in _BATCH_FIELDS}
+    result = calculate_tax_batch(columns)
+    return [{"taxable_income": income, "tax_payable": tax}
+            for income, tax in zip(result["taxable_income"].tolist(), result["tax_payable"].tolist())]
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent requests into batches.
+    Args:
+        evaluate_batch (callable): list of inputs -> list of results, in order.
+        max_batch (int): Most requests evaluated together.
+        max_wait (float): Seconds a batch stays open for more requests after its first one.
+        max_queue (int): Requests that may wait; submit() waits and submit_nowait() raises
+            asyncio.QueueFull beyond it.
+    Use as `async with MicroBatcher() as batcher: result = await batcher.submit(inputs)`.
+    """
+
+    def __init__(self, evaluate_batch=calculate_tax_records, max_batch=DEFAULT_MAX_BATCH,
+                 max_wait=DEFAULT_MAX_WAIT, max_queue=DEFAULT_MAX_QUEUE):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.evaluate_batch = evaluate_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.batches = 0
+        self.requests = 0
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.max_queue)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Finish every queued request, then stop the worker."""
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def submit(self, inputs):
+        """Queue one request (waiting while the queue is full) and return its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((inputs, future))
+        return await future
+
+    def submit_nowait(self, inputs) -> asyncio.Future:
+        """Queue one request without waiting; raises asyncio.QueueFull when the queue is full."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((inputs, future))
+        return future
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def _run(self):
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+            self._resolve(batch)
+            for _ in batch:
+                queue.task_done()
+
+    def _resolve(self, batch):
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            results = self._evaluate([inputs for inputs, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                _set_exception(batch[0][1], exc)
+                return
+            # One bad record must not fail the rest: re-evaluate each on its own
+            for item in batch:
+                self._resolve_one(item)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _resolve_one(self, item):
+        inputs, future = item
+        try:
+            result = self._evaluate([inputs])[0]
+        except Exception as exc:
+            _set_exception(future, exc)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def _evaluate(self, inputs):
+        results = list(self.evaluate_batch(inputs))
+        if len(results) != len(inputs):
+            raise RuntimeError(f"evaluate_batch returned {len(results)} results for {len(inputs)} requests")
+        return results
+
+
+def _set_exception(future, exc):
+    if not future.done():
+        future.set_exception(exc)
+
+
+async def measure(max_wait, max_batch=DEFAULT_MAX_BATCH, clients=64, requests=20_000, records=None) -> dict:
+    """
+    Closed-loop load: `clients` concurrent callers each submit requests back to back.
+    Returns:
+        dict: max_wait_ms, max_batch, requests_per_sec, mean_batch, p50_ms and p99_ms latency.
+    """
+    records = records or _scenario_records(1_000)
+    latencies = []
+    per_client = requests // clients
+
+    async with MicroBatcher(max_batch=max_batch, max_wait=max_wait) as batcher:
+        async def client(offset):
+            for i in range(per_client):
+                start = time.perf_counter()
+                await batcher.submit(records[(offset + i) % len(records)])
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(c * 17) for c in range(clients)))
+        seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "max_wait_ms": max_wait * 1e3,
+        "max_batch": max_batch,
+        "requests_per_sec": len(latencies) / seconds,
+        "mean_batch": batcher.requests / batcher.batches,
+        "p50_ms": latencies[len(latencies) // 2] * 1e3,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1e3,
+    }
+
+
+def _scenario_records(n):
+    from utils.batch_calculator import _random_corpus
+
+    corpus = _random_corpus(n, seed=13)
+    return [{name: corpus[name][i].item() for name in corpus} for i in range(n)]
+
+
+# Automated test cases for pytest
+
+def test_micro_batcher_results_batching_and_back_pressure():
+    """
+    Concurrent requests are coalesced, each caller gets its own scalar-identical result,
+    and a full queue pushes back.
+    """
+    from utils.tax_calculator import calculate_tax
+
+    records = _scenario_records(500)
+    sizes = []
+
+    def evaluate(batch):
+        sizes.append(len(batch))
+        return calculate_tax_records(batch)
+
+    async def scenario():
+        async with MicroBatcher(evaluate, max_batch=64, max_wait=0.05) as batcher:
+            results = await asyncio.gather(*(batcher.submit(record) for record in records))
+        full = MicroBatcher(evaluate, max_queue=2)
+        await full.start()
+        first, second = full.submit_nowait(records[0]), full.submit_nowait(records[1])
+        try:
+            full.submit_nowait(records[2])
+        except asyncio.QueueFull:
+            rejected = True
+        else:
+            rejected = False
+        await asyncio.gather(first, second)
+        await full.stop()
+
+        def failing(batch):
+            raise RuntimeError("engine down")
+        async with MicroBatcher(failing) as broken:
+            try:
+                await broken.submit(records[0])
+            except RuntimeError as exc:
+                error = str(exc)
+
+        # Bad records fail alone; a batch function returning too few results fails its callers, never hangs
+        async with MicroBatcher(max_wait=0.05) as batcher:
+            mixed = await asyncio.gather(
+                batcher.submit(records[0]), batcher.submit({**records[1], "revenue": "abc"}),
+                batcher.submit({**records[2], "tax_period": "FY1999"}), batcher.submit(records[3]),
+                return_exceptions=True)
+        async with MicroBatcher(lambda batch: [], max_wait=0.05) as short:
+            lost = await asyncio.wait_for(asyncio.gather(
+                short.submit(records[0]), short.submit(records[1]), return_exceptions=True), 5)
+        return results, rejected, error, mixed, lost
+
+    results, rejected, error, mixed, lost = asyncio.run(scenario())
+    for record, result in zip(records, results):
+        expected = calculate_tax(record)
+        assert result == {"taxable_income": expected["taxable_income"], "tax_payable": expected["tax_payable"]}
+    assert max(sizes) == 64 and sum(sizes) == len(records) + 2 and len(sizes) < 20
+    assert rejected and error == "engine down"
+    assert mixed[0] == calculate_tax_records([records[0]])[0] and mixed[3] == calculate_tax_records([records[3]])[0]
+    assert isinstance(mixed[1], ValueError) and isinstance(mixed[2], ValueError)
+    assert all(isinstance(outcome, RuntimeError) for outcome in lost)
+
+
+def _benchmark():
+    from utils.tax_calculator import calculate_tax
+
+    records = _scenario_records(1_000)
+    start = time.perf_counter()
+    for i in range(20_000):
+        calculate_tax(records[i % len(records)])
+    print(f"unbatched calculate_tax: {20_000 / (time.perf_counter() - start):,.0f} req/s (single caller)")
+    print(f"{'clients':>7} {'max_wait':>9} {'max_batch':>9} {'req/s':>9} {'batch':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for clients in (16, 256):
+        for max_wait in (0.0, 0.0005, 0.002, 0.01):
+            for max_batch in (1, 64, 256):
+                stats = asyncio.run(measure(max_wait, max_batch, clients=clients, records=records))
+                print(f"{clients:>7} {stats['max_wait_ms']:>7.1f}ms {stats['max_batch']:>9} "
+                      f"{stats['requests_per_sec']:>9,.0f} {stats['mean_batch']:>7.1f} "
+                      f"{stats['p50_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
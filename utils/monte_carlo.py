@@ -0,0 +1,178 @@
+# utils/monte_carlo.py
+"""
+Monte Carlo view of tax payable when some inputs are only known as ranges.
+Revenue, deductions, non-qualifying income and foreign tax paid can each be given a distribution;
+all samples are drawn as arrays and evaluated in one vectorized pass of the batch engine (which
+applies the calculate_tax() rules), so a million draws take well under a second.
+
+The result has percentile bands of tax payable and the probability that the drawn figures land
+past the two cliffs in the rules: revenue above the Small Business Relief threshold, and
+non-qualifying income reaching the QFZP de-minimis limit.
+
+Distributions are tuples, e.g. {"revenue": ("triangular", 2_500_000, 3_200_000, 4_000_000)}:
+    ("uniform", low, high)
+    ("triangular", low, mode, high)
+    ("normal", mean, std)         negative draws are clipped to 0
+    ("lognormal", median, sigma)
+A plain number keeps the field fixed.
+"""
+import numpy as np
+
+from utils.batch_calculator import (
+    QFZP, QFZP_STATUS_LOST, SMALL_BUSINESS_RELIEF, STANDARD_RATE, calculate_tax_batch, _is_scalar,
+)
+
+UNCERTAIN_FIELDS = ("revenue", "deductions", "non_qualifying_income", "foreign_tax_paid")
+DISTRIBUTION_PARAMETERS = {"uniform": 2, "triangular": 3, "normal": 2, "lognormal": 2}
+DEFAULT_SAMPLES = 1_000_000
+MAX_SAMPLES = 10_000_000
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+def simulate(inputs: dict, ranges: dict, samples: int = DEFAULT_SAMPLES, seed: int = 0) -> dict:
+    """
+    Draw the uncertain inputs and evaluate calculate_tax() for every draw.
+    Args:
+        inputs (dict): Base user input data (as returned by get_user_inputs()).
+        ranges (dict): Distribution per field in UNCERTAIN_FIELDS (see module docstring); other
+            inputs keep their entered values.
+        samples (int): Number of draws.
+        seed (int): Seed; equal seeds and ranges give identical results.
+    Returns:
+        dict: "samples", "tax_payable" ({percentile: value} for PERCENTILES), "tax_payable_mean",
+            "sbr_cliff_probability" (share of draws, among those where Small Business Relief depends
+            on revenue, with revenue above the threshold) and "deminimis_cliff_probability" (share
+            of draws, for a qualifying free zone person, whose non-qualifying income reaches the
+            de-minimis limit). A cliff probability is None when the cliff does not apply to the
+            profile (e.g. SBR for a non-resident, de-minimis outside a free zone).
+    Raises:
+        ValueError: For an unsupported field or distribution, or a bad sample count.
+    """
+    unknown = set(ranges) - set(UNCERTAIN_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot simulate {', '.join(sorted(unknown))}; choose from {', '.join(UNCERTAIN_FIELDS)}")
+    if not 1 <= samples <= MAX_SAMPLES:
+        raise ValueError(f"samples must be between 1 and {MAX_SAMPLES:,}")
+    rng = np.random.default_rng(seed)
+    # Drawn columns go first so they set the batch length
+    data = {field: draw(rng, spec, samples) for field, spec in ranges.items() if not _is_fixed(spec)}
+    data.update((field, float(spec)) for field, spec in ranges.items() if _is_fixed(spec))
+    data.update((name, value) for name, value in inputs.items() if name not in data and _is_scalar(value))
+    if not any(isinstance(value, np.ndarray) for value in data.values()):
+        data["revenue"] = np.full(samples, float(data.get("revenue") or 0.0))
+    result = calculate_tax_batch(data, branches=True)
+
+    tax_payable = result["tax_payable"]
+    branch = result["branch"]
+    # SBR turns on revenue alone once the profile reaches it; non-residents never get it
+    sbr_decided = np.isin(branch, (SMALL_BUSINESS_RELIEF, QFZP, QFZP_STATUS_LOST, STANDARD_RATE))
+    if inputs.get("entity_type") == "Non-Resident":
+        sbr_decided[:] = False
+    deminimis_decided = np.isin(branch, (QFZP, QFZP_STATUS_LOST))
+    return {
+        "samples": samples,
+        "tax_payable": dict(zip(PERCENTILES, np.percentile(tax_payable, PERCENTILES).round(2).tolist())),
+        "tax_payable_mean": round(float(tax_payable.mean()), 2),
+        "sbr_cliff_probability": _share(sbr_decided, branch != SMALL_BUSINESS_RELIEF),
+        "deminimis_cliff_probability": _share(deminimis_decided, branch == QFZP_STATUS_LOST),
+    }
+
+
+def draw(rng, spec, samples: int):
+    """Draw non-negative amounts from one distribution tuple; raises ValueError for bad parameters."""
+    if _is_fixed(spec):
+        return np.full(samples, float(spec))
+    name, *parameters = spec if isinstance(spec, (tuple, list)) and spec else (None,)
+    if DISTRIBUTION_PARAMETERS.get(name) != len(parameters):
+        raise ValueError(f"Unknown distribution {spec!r}; expected one of "
+                         + ", ".join(f"{key} ({count} parameters)" for key, count in DISTRIBUTION_PARAMETERS.items()))
+    if name == "uniform":
+        low, high = parameters
+        if not 0 <= low < high:
+            raise ValueError("uniform needs 0 <= low < high")
+        return rng.uniform(low, high, samples)
+    if name == "triangular":
+        low, mode, high = parameters
+        if not low <= mode <= high or low == high:
+            raise ValueError("triangular needs low <= mode <= high with low < high")
+        return rng.triangular(low, mode, high, samples)
+    if name == "normal":
+        mean, std = parameters
+        if not std >= 0:
+            raise ValueError("normal needs std >= 0")
+        return np.maximum(rng.normal(mean, std, samples), 0.0)
+    median, sigma = parameters
+    if not (median > 0 and sigma >= 0):
+        raise ValueError("lognormal needs median > 0 and sigma >= 0")
+    return rng.lognormal(np.log(median), sigma, samples)
+
+
+def _is_fixed(spec):
+    return isinstance(spec, (int, float)) and not isinstance(spec, bool)
+
+
+def _share(decided, past):
+    count = np.count_nonzero(decided)
+    return float(np.count_nonzero(decided & past) / count) if count else None
+
+
+# Automated test cases for pytest
+
+def test_simulation_bands_and_cliff_probabilities():
+    """
+    Percentiles and cliff probabilities match calculate_tax() on the same draws and the analytic
+    probabilities of uniform draws.
+    """
+    from utils.tax_calculator import calculate_tax
+
+    base = {"entity_type": "Legal Entity", "revenue": 3_000_000.0, "deductions": 500_000.0,
+            "free_zone": "Yes", "qualifying_fz": "Yes", "non_qualifying_income": 150_000.0,
+            "exempt_type": [], "license_issue_date": None}
+    ranges = {"revenue": ("uniform", 2_000_000, 4_000_000), "non_qualifying_income": ("uniform", 100_000, 200_000),
+              "deductions": ("triangular", 300_000, 500_000, 900_000), "foreign_tax_paid": 10_000}
+    result = simulate(base, ranges, samples=200_000, seed=4)
+    assert abs(result["sbr_cliff_probability"] - 0.5) < 0.01
+    # Above AED 3M of revenue the de-minimis limit is 5% of it: P(nqi >= 0.05 * revenue | revenue > 3M)
+    revenue = np.linspace(3_000_000, 4_000_000, 100_001)
+    lost = np.mean(np.clip((200_000 - 0.05 * revenue) / 100_000, 0, 1))
+    assert abs(result["deminimis_cliff_probability"] - lost) < 0.01
+
+    small = simulate(base, ranges, samples=2_000, seed=4)
+    rng = np.random.default_rng(4)
+    draws = {field: draw(rng, spec, 2_000) for field, spec in ranges.items() if not _is_fixed(spec)}
+    expected = [calculate_tax({**base, "foreign_tax_paid": 10_000, **{f: v[i].item() for f, v in draws.items()}})
+                ["tax_payable"] for i in range(2_000)]
+    assert small["tax_payable"][50] == round(float(np.percentile(expected, 50)), 2)
+    assert small["tax_payable"][95] == round(float(np.percentile(expected, 95)), 2)
+    assert simulate({**base, "entity_type": "Non-Resident", "pe_status": "Yes"}, ranges, 1_000)[
+        "sbr_cliff_probability"] is None
+    assert simulate({**base, "free_zone": "No"}, ranges, 1_000)["deminimis_cliff_probability"] is None
+    for bad in ({"sector": ("uniform", 0, 1)}, {"revenue": ("beta", 1, 2)}, {"revenue": ("uniform", 1)},
+                {"revenue": ("uniform", 5, 5)}, {"revenue": ("uniform", -1, 5)}, {"revenue": ("normal", 1, -1)},
+                {"revenue": ("lognormal", 0, 0.5)}, {"revenue": ("lognormal", 1, -0.5)}, {"revenue": True}):
+        try:
+            simulate(base, bad, 10)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad} must be rejected")
+
+
+def _benchmark():
+    import time
+
+    base = {"entity_type": "Legal Entity", "free_zone": "Yes", "qualifying_fz": "Yes", "exempt_type": [],
+            "license_issue_date": None}
+    ranges = {"revenue": ("lognormal", 4_000_000, 0.4), "deductions": ("uniform", 500_000, 2_000_000),
+              "non_qualifying_income": ("triangular", 0, 150_000, 400_000), "foreign_tax_paid": ("normal", 20_000, 10_000)}
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        result = simulate(base, ranges)
+        best = min(best, time.perf_counter() - start)
+    print(f"{DEFAULT_SAMPLES:,} samples: {best * 1000:.0f} ms; median tax AED {result['tax_payable'][50]:,.2f}, "
+          f"P(SBR lost) {result['sbr_cliff_probability']:.3f}, P(de-minimis lost) {result['deminimis_cliff_probability']:.3f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
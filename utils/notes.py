@@ -0,0 +1,259 @@
+# utils/notes.py
+"""
+Dictionary-encoded compliance notes for the UAE Corporate Tax Calculator.
+The calculator records each note as a small integer code (plus the numbers or dates it
+quotes) instead of a formatted sentence; the English text is rendered only when the
+notes are displayed or exported. Texts are compiled once per RuleSet from NOTE_TEMPLATES
+(see note_texts()), so static notes render to the same shared string object for every result.
+"""
+import re
+from collections.abc import Sequence
+from functools import lru_cache
+from sys import intern
+
+from utils.rules import RULE_SETS, rules_for
+
+# Note codes. Values are stable: they are what gets stored and exported.
+ADVANCED_EXEMPTION = 1
+TRANSITIONAL_PERIOD = 2
+GAAR_NOT_CONFIRMED = 3
+INTEREST_CAP = 4
+ENTERTAINMENT_CAP = 5
+RELATED_PARTY_INTEREST_CAP = 6
+NON_DEDUCTIBLES = 7
+PARTICIPATION_EXEMPTION = 8
+FOREIGN_TAX_CREDIT = 9
+ZAKAT_OFFSET = 10
+EXEMPT_SECTOR = 11
+SMALL_BUSINESS_RELIEF = 12
+NON_RESIDENT_PE = 13
+NON_RESIDENT_NO_PE = 14
+QFZP_STATUS_LOST = 15
+QFZP = 16
+LOSS_CARRY_FORWARD = 17
+DMTT = 18
+GROUP_RELIEF = 19
+DOCS_NOT_UPLOADED = 20
+QFZP_AUDIT = 21
+TRANSFER_PRICING = 22
+STANDARD_RATE = 23
+TAX_GROUP = 24
+REGISTRATION_OVERDUE = 25
+REGISTRATION_DUE = 26
+
+
+# Templates are str.format()-style patterns: "{0}", "{1}", ... are the note's parameters in order,
+# and "{rules.<field>}" a threshold or rate of the RuleSet the note was made under (see utils.rules)
+NOTE_TEMPLATES = {
+    ADVANCED_EXEMPTION: "Advanced/edge-case exemption claimed: {0} [Check FTA law/circulars]",
+    TRANSITIONAL_PERIOD: "Transitional period: Special rules may apply for the first tax period. See FTA guidance.",
+    GAAR_NOT_CONFIRMED: "Warning: You have not confirmed compliance with GAAR/anti-avoidance rules. Artificial arrangements may be challenged by the FTA. [Article 50]",
+    INTEREST_CAP: "Interest deduction capped at {rules.interest_ebitda_share:.0%} of EBITDA. [Article 30]",
+    ENTERTAINMENT_CAP: "Entertainment expenses: Only 50% deductible. [Article 33]",
+    RELATED_PARTY_INTEREST_CAP: "Interest on related party loans capped at {rules.interest_ebitda_share:.0%} of EBITDA. [Article 30, 31]",
+    NON_DEDUCTIBLES: "Non-deductible expenses (fines, bribes, non-approved donations, etc.) have been disallowed. [Article 33]",
+    PARTICIPATION_EXEMPTION: "Participation exemption applied: Dividends/capital gains from qualifying shareholdings are exempt. [Article 23]",
+    FOREIGN_TAX_CREDIT: "Foreign tax credit claimed: AED {0:,.2f} (subject to FTA rules). [Article 47]",
+    ZAKAT_OFFSET: "Zakat offset claimed: AED {0:,.2f} (subject to FTA rules). [Article 46]",
+    EXEMPT_SECTOR: "Exempt sector: {0}. Ensure FTA approval and registration. [Article 4]",
+    SMALL_BUSINESS_RELIEF: "Eligible for Small Business Relief (Revenue ≤ AED {rules.small_business_revenue:,.0f}). No corporate tax due. [Article 21]",
+    NON_RESIDENT_PE: "Non-resident with UAE PE: Taxable on UAE-sourced income. [Article 11]",
+    NON_RESIDENT_NO_PE: "Non-resident without UAE PE: Not subject to UAE Corporate Tax (except on certain UAE-sourced income). [Article 11]",
+    QFZP_STATUS_LOST: "QFZP status lost: Non-qualifying income exceeds de-minimis threshold. [Article 18]",
+    QFZP: "Qualifying Free Zone Person: 0% on qualifying income, {rules.standard_rate:.0%} on non-qualifying income. [Article 18]",
+    LOSS_CARRY_FORWARD: "Tax loss carry-forward applied: AED {0:,.2f} (max {rules.loss_offset_share:.0%} of taxable income). Remaining losses: AED {1:,.2f} [Article 37]",
+    DMTT: "DMTT ({rules.dmtt_rate:.0%}) for large multinational groups: AED {0:,.2f} (if applicable). [Article 54]",
+    GROUP_RELIEF: "Group relief: Offset of group losses/profits may apply (ensure FTA rules are met). [Article 40]",
+    DOCS_NOT_UPLOADED: "Warning: Required compliance documentation not confirmed/uploaded. [Article 55]",
+    QFZP_AUDIT: "QFZPs must have audited accounts to maintain 0% rate. [Article 18]",
+    TRANSFER_PRICING: "Transfer pricing rules apply. Ensure documentation is in place. [Article 34]",
+    STANDARD_RATE: "Standard UAE Corporate Tax: 0% up to AED {rules.zero_rate_band:,.0f}, {rules.standard_rate:.0%} above. [Article 3, 36]",
+    TAX_GROUP: "Tax group relief may apply. Ensure all group rules are met. [Article 42]",
+    REGISTRATION_OVERDUE: "Registration deadline was {0:%d %b %Y}. Penalties may apply for late registration.",
+    REGISTRATION_DUE: "Registration deadline: {0:%d %b %Y}. Register before this date to avoid penalties.",
+}
+
+# Notes quoting a date: few distinct values per run, and date formatting (strftime) is the
+# slowest part of rendering, so their texts are memoized
+DATE_NOTES = frozenset((REGISTRATION_OVERDUE, REGISTRATION_DUE))
+
+
+class _NoteTexts(dict):
+    """
+    Texts of every note under one RuleSet, by code. Looking up a (code, *params) entry renders
+    its template; so the texts of a list of encoded notes are map(texts.__getitem__, entries),
+    with no Python-level call for the static ones.
+    """
+    __slots__ = ("rules", "renderers")
+
+    def __init__(self, rules):
+        super().__init__()
+        self.rules = rules
+        self.renderers = {}
+        for code, template in NOTE_TEMPLATES.items():
+            # Rule figures are filled in once: "{rules.loss_offset_share:.0%}" -> "75%"
+            text = re.sub(r"\{rules\.(\w+):?([^}]*)\}",
+                          lambda field: format(getattr(rules, field[1]), field[2]), template)
+            if "{" in text:
+                self.renderers[code] = _compile_template(text)
+            else:
+                self[code] = intern(text)
+
+    def __missing__(self, entry):
+        if entry.__class__ is int:
+            raise KeyError(entry)
+        if entry[0] in DATE_NOTES:
+            return _render_date_note(entry)
+        return self.renderers[entry[0]](entry)
+
+
+def _compile_template(template):
+    # "{0:,.2f}" -> "{entry[1]:,.2f}": the template as an f-string over the (code, *params) entry,
+    # which formats faster than str.format() parsing the template on every note
+    fields = re.sub(r"\{(\d+)", lambda field: "{entry[%d]" % (int(field[1]) + 1), template)
+    return eval("lambda entry: f" + repr(fields))
+
+
+# Compiled texts by period, for the RULE_SETS rule sets, and by id() for any other RuleSet (e.g. one
+# built in a test); each _NoteTexts holds its RuleSet, so that id stays its own
+_TEXTS_BY_PERIOD = {}
+_TEXTS_BY_ID = {}
+
+
+def note_texts(rules=None) -> dict:
+    """
+    Texts of every note under a RuleSet (the default period's for None), compiled on first use.
+    Args:
+        rules (RuleSet): Rule set the notes were made under (see utils.rules).
+    Returns:
+        dict: Text by code; indexing it with a (code, *params) entry renders that note.
+    """
+    if rules is None:
+        rules = rules_for()
+    texts = _TEXTS_BY_PERIOD.get(rules.period)
+    if texts is None or texts.rules is not rules:
+        texts = _TEXTS_BY_ID.get(id(rules))
+        if texts is None:
+            texts = _NoteTexts(rules)
+            if RULE_SETS.get(rules.period) is rules:
+                _TEXTS_BY_PERIOD[rules.period] = texts
+            else:
+                _TEXTS_BY_ID[id(rules)] = texts
+    return texts
+
+
+def render_note(entry, rules=None) -> str:
+    """
+    Render one encoded note: a bare code, or a (code, *params) tuple.
+    """
+    return note_texts(rules)[entry]
+
+
+@lru_cache(maxsize=1024)
+def _render_date_note(entry):
+    # Date notes quote no rule figures: any RuleSet's renderer gives the same text
+    return note_texts().renderers[entry[0]](entry)
+
+
+class Notes(Sequence):
+    """
+    Lazily rendered list of compliance notes.
+    Holds the encoded entries (codes, or (code, *params) tuples) and the RuleSet they were made
+    under, and renders the text on indexing/iteration, so it can be used wherever the list of
+    note strings was.
+    """
+    __slots__ = ("entries", "rules")
+
+    def __init__(self, entries=None, rules=None):
+        self.entries = [] if entries is None else entries
+        self.rules = rules_for() if rules is None else rules
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(map(note_texts(self.rules).__getitem__, self.entries[index]))
+        return render_note(self.entries[index], self.rules)
+
+    def __iter__(self):
+        return map(note_texts(self.rules).__getitem__, self.entries)
+
+    def __eq__(self, other):
+        if isinstance(other, Notes):
+            return self.entries == other.entries and (self.rules is other.rules or list(self) == list(other))
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    @property
+    def codes(self) -> list:
+        """Note codes in order, without parameters."""
+        return [entry if entry.__class__ is int else entry[0] for entry in self.entries]
+
+    def render(self) -> "NoteList":
+        """Rendered note texts, as a list of strings (a NoteList keeping the encoded entries)."""
+        return render_notes(self.entries, self.rules)
+
+
+def render_notes(entries, rules) -> "NoteList":
+    """Render a list of encoded notes, made under a RuleSet (see note_texts()), into a NoteList."""
+    texts = _TEXTS_BY_PERIOD.get(rules.period)
+    if texts is None or texts.rules is not rules:
+        texts = note_texts(rules)
+    notes = NoteList(map(texts.__getitem__, entries))
+    notes.entries = entries
+    return notes
+
+
+class NoteList(list):
+    """
+    Rendered compliance notes: a plain list of strings (JSON-serializable, concatenable) that also
+    keeps the encoded entries they were rendered from, as calculate_tax() returns them.
+    """
+    __slots__ = ("entries",)
+
+    @property
+    def codes(self) -> list:
+        """Note codes in order, without parameters."""
+        return [entry if entry.__class__ is int else entry[0] for entry in self.entries]
+
+
+# Automated test cases for pytest
+
+def test_notes_render_lazily_and_share_static_texts():
+    """
+    Static notes render to the interned text; parameterized notes format on demand.
+    """
+    import json
+    from datetime import date
+
+    notes = Notes([NON_DEDUCTIBLES, (LOSS_CARRY_FORWARD, 1234.5, 0), (REGISTRATION_DUE, date(2024, 5, 31))])
+    assert len(notes) == 3 and notes.codes == [NON_DEDUCTIBLES, LOSS_CARRY_FORWARD, REGISTRATION_DUE]
+    assert notes[0] is note_texts()[NON_DEDUCTIBLES]
+    assert notes[1] == ("Tax loss carry-forward applied: AED 1,234.50 (max 75% of taxable income). "
+                        "Remaining losses: AED 0.00 [Article 37]")
+    assert notes[-1] == "Registration deadline: 31 May 2024. Register before this date to avoid penalties."
+    assert notes == notes.render() and notes[1:] == notes.render()[1:]
+    assert not Notes()
+
+    # Rendered notes are a real list of strings that still carries its entries
+    rendered = notes.render()
+    assert isinstance(rendered, list) and rendered.entries is notes.entries and rendered.codes == notes.codes
+    assert json.loads(json.dumps(rendered)) == list(notes)
+    assert rendered + ["extra"] == [*notes, "extra"]
+
+    # Thresholds and rates come from the RuleSet the notes were made under
+    from utils.rules import RuleSet
+
+    rules = RuleSet("FY2025", zero_rate_band=500_000, standard_rate=0.1, small_business_revenue=2_000_000)
+    custom = Notes([STANDARD_RATE, SMALL_BUSINESS_RELIEF], rules)
+    assert custom[0] == "Standard UAE Corporate Tax: 0% up to AED 500,000, 10% above. [Article 3, 36]"
+    assert "(Revenue ≤ AED 2,000,000)" in custom[1] and custom.render() == list(custom)
+    assert Notes([STANDARD_RATE])[0] == "Standard UAE Corporate Tax: 0% up to AED 375,000, 9% above. [Article 3, 36]"
+    assert custom != Notes([STANDARD_RATE, SMALL_BUSINESS_RELIEF])
@@ -0,0 +1,194 @@
+# utils/parallel.py
+"""
+Process-pool runner for eligibility + tax calculation over large populations.
+Records are sharded into chunks that are evaluated on worker processes; results come
+back in input order, and a record that raises (or kills its worker process) is
+reported in place instead of aborting the run.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from eligibility_logic import check_eligibility
+from utils.tax_calculator import calculate_tax
+
+DEFAULT_CHUNK_SIZE = 2_000
+
+
+def evaluate_record(inputs: dict) -> dict:
+    """
+    Check eligibility and, for taxable persons, calculate tax (the same flow as app.py).
+    Args:
+        inputs (dict): User input data.
+    Returns:
+        dict: is_taxable and message, plus taxable_income, tax_payable and notes when taxable.
+    """
+    eligibility = check_eligibility(inputs)
+    result = {"is_taxable": eligibility["is_taxable"], "message": eligibility["message"]}
+    if eligibility["is_taxable"]:
+        tax = calculate_tax(inputs)
+        result["taxable_income"] = tax["taxable_income"]
+        result["tax_payable"] = tax["tax_payable"]
+        result["notes"] = list(tax["notes"])
+    return result
+
+
+def run_parallel(records, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, evaluate=evaluate_record):
+    """
+    Evaluate every record on a process pool and return the results in input order.
+    Args:
+        records (iterable): Input dicts.
+        workers (int): Worker processes (defaults to the number of CPUs).
+        chunk_size (int): Records sent to a worker per task.
+        evaluate (callable): Picklable per-record function (defaults to evaluate_record).
+    Returns:
+        list: One result per record. Failed records get {"error": ..., "record": ...}.
+    """
+    return list(iter_parallel(records, workers=workers, chunk_size=chunk_size, evaluate=evaluate))
+
+
+def iter_parallel(records, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, evaluate=evaluate_record):
+    """
+    Streaming form of run_parallel(): yields results in input order while keeping only a
+    bounded number of chunks in flight, so the input can be a generator of any length.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunked(records, chunk_size)
+    pending = deque()  # (chunk, future); future is None when the pool broke before it was submitted
+    pool = ProcessPoolExecutor(workers)
+    try:
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                try:
+                    pending.append((chunk, pool.submit(_evaluate_chunk, evaluate, chunk)))
+                except BrokenProcessPool:
+                    # A worker died while we were refilling; handled below with the lost tasks
+                    pending.append((chunk, None))
+                    break
+            if not pending:
+                return
+            chunk, future = pending[0]
+            try:
+                if future is None:
+                    raise BrokenProcessPool("worker pool broke before the chunk was submitted")
+                results = future.result()
+            except BrokenProcessPool:
+                # A worker died; every in-flight task not finished yet is lost with it. Each lost
+                # chunk is re-run on its own worker, so only the chunk that crashes again is
+                # isolated record by record.
+                pool.shutdown(cancel_futures=True)
+                for lost_chunk, lost_future in pending:
+                    yield from _finished(lost_future) or _recover(evaluate, lost_chunk)
+                pending.clear()
+                pool = ProcessPoolExecutor(workers)
+                continue
+            pending.popleft()
+            yield from results
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _chunked(records, chunk_size):
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _evaluate_chunk(evaluate, chunk):
+    results = []
+    for record in chunk:
+        try:
+            results.append(evaluate(record))
+        except Exception as exc:
+            results.append({"error": f"{type(exc).__name__}: {exc}", "record": record})
+    return results
+
+
+def _finished(future):
+    """Results of a task that completed before its pool broke, or None."""
+    if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+def _recover(evaluate, chunk):
+    """Re-run a chunk lost with a broken pool on its own worker; isolate its records only if it crashes again."""
+    pool = ProcessPoolExecutor(1)
+    try:
+        return pool.submit(_evaluate_chunk, evaluate, chunk).result()
+    except BrokenProcessPool:
+        return _isolate(evaluate, chunk)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _isolate(evaluate, chunk):
+    """Evaluate a chunk record by record on a single worker, restarting it after each crash."""
+    results = []
+    pool = ProcessPoolExecutor(1)
+    try:
+        for record in chunk:
+            try:
+                results.extend(pool.submit(_evaluate_chunk, evaluate, [record]).result())
+            except BrokenProcessPool:
+                results.append({"error": "Worker process crashed", "record": record})
+                pool.shutdown(cancel_futures=True)
+                pool = ProcessPoolExecutor(1)
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return results
+
+
+# Automated test cases for pytest
+
+def _crash_on_marker(record):
+    if record.get("crash"):
+        os._exit(1)
+    if record.get("raise"):
+        raise ValueError("bad record")
+    return evaluate_record(record)
+
+
+def _population(n):
+    return [{
+        "entity_type": "Legal Entity",
+        "residency_status": "Yes",
+        "free_zone": "No",
+        "qualifying_fz": "No",
+        "exempt_type": [],
+        "revenue": 1_000_000.0 * (i % 20),
+        "deductions": 50_000.0 * (i % 7),
+    } for i in range(n)]
+
+
+def test_run_parallel_matches_serial_order():
+    """
+    Results come back in input order and equal the serial evaluation.
+    """
+    records = _population(500)
+    results = run_parallel(records, workers=2, chunk_size=37)
+    assert results == [evaluate_record(record) for record in records]
+
+
+def test_run_parallel_reports_failing_records():
+    """
+    A raising record and a record that kills its worker are reported in place.
+    """
+    records = _population(120)
+    records[10]["raise"] = True
+    records[75]["crash"] = True
+    results = run_parallel(records, workers=2, chunk_size=16, evaluate=_crash_on_marker)
+    assert len(results) == len(records)
+    assert results[10]["error"] == "ValueError: bad record"
+    assert results[75] == {"error": "Worker process crashed", "record": records[75]}
+    for i, result in enumerate(results):
+        if i not in (10, 75):
+            assert result == evaluate_record(records[i])
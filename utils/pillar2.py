@@ -0,0 +1,175 @@
+# utils/pillar2.py
+"""
+BEPS Pillar 2 (GloBE) top-up tax for an MNE group's constituent entities.
+Entity figures are aggregated per jurisdiction with one pandas groupby. Each jurisdiction gets
+an effective tax rate, a substance-based income exclusion, excess profit and top-up tax. The
+top-up is then allocated back to the jurisdiction's entities in proportion to their positive
+GloBE income. The UAE's top-up is collected locally as the Domestic Minimum Top-up Tax
+(DMTT), so for the domestic jurisdiction the allocated amount is reported as each entity's
+DMTT.
+
+check_eligibility() only reports a group-level ETR, and calculate_tax() only applies a
+revenue-based DMTT shortcut; this module is the entity-level calculation behind both.
+
+Simplifications: current year figures only (de-minimis uses this year's revenue and income, not
+a three-year average); no additional or prior-year top-up; amounts in EUR, like global_revenue.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.rules import RULE_SETS, rules_for
+
+DEMINIMIS_REVENUE = 10_000_000
+DEMINIMIS_INCOME = 1_000_000
+DOMESTIC_JURISDICTION = "AE"
+# Substance-based income exclusion (payroll rate, tangible asset rate) by fiscal year, with the
+# GloBE transition rates; later years use the permanent 5% / 5%
+SBIE_RATES = {
+    2023: (0.100, 0.080), 2024: (0.098, 0.078), 2025: (0.096, 0.076), 2026: (0.094, 0.074),
+    2027: (0.092, 0.072), 2028: (0.084, 0.068), 2029: (0.076, 0.064), 2030: (0.068, 0.060),
+    2031: (0.060, 0.056), 2032: (0.052, 0.052),
+}
+SUM_COLUMNS = ["globe_income", "covered_taxes", "payroll_costs", "tangible_assets", "globe_revenue"]
+
+
+def pillar2_top_up(data, year: int = 2025, group_revenue: float = None,
+                   jurisdiction: str = "jurisdiction", domestic: str = DOMESTIC_JURISDICTION,
+                   tax_period: str = None) -> dict:
+    """
+    Calculate jurisdictional ETRs and top-up tax for a group's constituent entities.
+    Args:
+        data (pandas.DataFrame | dict): One row per constituent entity with a `jurisdiction` column and
+            globe_income, covered_taxes, payroll_costs, tangible_assets and (for the de-minimis test)
+            globe_revenue columns; missing amount columns count as zero, a missing globe_revenue
+            column turns the de-minimis test off.
+        year (int): Fiscal year, which sets the SBIE rates.
+        group_revenue (float): Consolidated group revenue in EUR; below 750M the group is out of scope
+            and owes no top-up. None skips the test.
+        jurisdiction (str): Jurisdiction column.
+        domestic (str): Jurisdiction code whose top-up is collected as DMTT.
+        tax_period (str): Rule set for the minimum rate and the scope threshold (see utils.rules);
+            defaults to "FY<year>" when that period is known, otherwise the default period.
+    Returns:
+        dict: "jurisdictions" (a DataFrame indexed by jurisdiction: the summed columns, etr, sbie,
+            excess_profit, top_up_percentage, de_minimis and top_up_tax), "entities" (a DataFrame sharing
+            the input index: jurisdiction, etr, allocation_share, top_up_tax and dmtt), "in_scope",
+            "total_top_up" and "dmtt".
+    """
+    if tax_period is None:
+        tax_period = f"FY{year}" if f"FY{year}" in RULE_SETS else ""
+    rules = rules_for(tax_period)
+    frame = pd.DataFrame(data) if isinstance(data, dict) else data
+    n = len(frame)
+    columns = pd.DataFrame(
+        {name: frame[name].to_numpy(dtype=np.float64) if name in frame else np.zeros(n) for name in SUM_COLUMNS},
+        index=frame.index,
+    )
+    columns[jurisdiction] = frame[jurisdiction].to_numpy()
+    # Each entity's share of its jurisdiction's top-up is based on positive GloBE income only
+    columns["positive_income"] = np.maximum(columns["globe_income"].to_numpy(), 0.0)
+
+    grouped = columns.groupby(jurisdiction, sort=True, observed=True)
+    totals = grouped[SUM_COLUMNS + ["positive_income"]].sum()
+    codes = grouped.ngroup().to_numpy()
+
+    income = totals["globe_income"].to_numpy()
+    taxes = totals["covered_taxes"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        etr = np.where(income > 0, taxes / income, np.nan)
+    payroll_rate, asset_rate = SBIE_RATES.get(year, (0.05, 0.05) if year > 2032 else SBIE_RATES[2023])
+    sbie = payroll_rate * totals["payroll_costs"].to_numpy() + asset_rate * totals["tangible_assets"].to_numpy()
+    excess_profit = np.maximum(income - sbie, 0.0)
+    top_up_percentage = np.where(income > 0, np.maximum(rules.globe_minimum_rate - np.nan_to_num(etr), 0.0), 0.0)
+    de_minimis = np.zeros(len(totals), dtype=bool)
+    if "globe_revenue" in frame:
+        de_minimis = (totals["globe_revenue"].to_numpy() < DEMINIMIS_REVENUE) & (income < DEMINIMIS_INCOME)
+    in_scope = group_revenue is None or group_revenue >= rules.pillar2_revenue
+    top_up = np.where(de_minimis | (not in_scope), 0.0, top_up_percentage * excess_profit)
+
+    jurisdictions = totals[SUM_COLUMNS].assign(
+        etr=etr, sbie=sbie, excess_profit=excess_profit, top_up_percentage=top_up_percentage,
+        de_minimis=de_minimis, top_up_tax=top_up,
+    )
+
+    positive_total = totals["positive_income"].to_numpy()[codes]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(positive_total > 0, columns["positive_income"].to_numpy() / positive_total, 0.0)
+    entity_top_up = share * top_up[codes]
+    is_domestic = columns[jurisdiction].to_numpy() == domestic
+    entities = pd.DataFrame({
+        jurisdiction: columns[jurisdiction].to_numpy(),
+        "etr": etr[codes],
+        "allocation_share": share,
+        "top_up_tax": np.where(is_domestic, 0.0, entity_top_up).round(2),
+        "dmtt": np.where(is_domestic, entity_top_up, 0.0).round(2),
+    }, index=frame.index)
+    return {
+        "jurisdictions": jurisdictions,
+        "entities": entities,
+        "in_scope": in_scope,
+        "total_top_up": round(float(top_up.sum()), 2),
+        "dmtt": round(float(top_up[totals.index == domestic].sum()), 2),
+    }
+
+
+# Automated test cases for pytest
+
+def test_pillar2_top_up_by_jurisdiction():
+    """
+    Hand-checked jurisdictional figures, DMTT on UAE entities, and entity allocations adding up.
+    """
+    data = {
+        "jurisdiction": ["AE", "AE", "AE", "DE", "IE", "IE", "MU"],
+        "globe_income": [60e6, 40e6, -5e6, 50e6, 30e6, -40e6, 0.5e6],
+        "covered_taxes": [6e6, 3e6, 0.0, 15e6, 2e6, 0.0, 0.0],
+        "payroll_costs": [10e6, 0.0, 0.0, 5e6, 1e6, 0.0, 0.0],
+        "tangible_assets": [20e6, 0.0, 0.0, 5e6, 0.0, 0.0, 0.0],
+        "globe_revenue": [500e6, 300e6, 1e6, 400e6, 90e6, 10e6, 2e6],
+    }
+    result = pillar2_top_up(data, year=2025, group_revenue=2e9)
+    table = result["jurisdictions"]
+    # AE: ETR 9/95, SBIE 0.096 * 10M + 0.076 * 20M
+    assert abs(table.loc["AE", "etr"] - 9 / 95) < 1e-12 and abs(table.loc["AE", "sbie"] - 2.48e6) < 1e-6
+    ae_top_up = (0.15 - 9 / 95) * (95e6 - 2.48e6)
+    assert abs(table.loc["AE", "top_up_tax"] - ae_top_up) < 1e-6
+    assert table.loc["DE", "top_up_tax"] == 0  # ETR 30%
+    assert table.loc["IE", "top_up_tax"] == 0  # jurisdiction has a net loss
+    assert table.loc["MU", "de_minimis"] and table.loc["MU", "top_up_tax"] == 0
+    entities = result["entities"]
+    assert list(entities["dmtt"]) == [round(ae_top_up * 0.6, 2), round(ae_top_up * 0.4, 2), 0, 0, 0, 0, 0]
+    assert not entities["top_up_tax"].any()
+    assert result["dmtt"] == result["total_top_up"] == round(ae_top_up, 2)
+    assert pillar2_top_up(data, group_revenue=700e6)["total_top_up"] == 0
+    # From 2028 the payroll rate falls 0.8 and the asset rate 0.4 points a year: 0.068 * 10M + 0.060 * 20M
+    assert abs(pillar2_top_up(data, year=2030)["jurisdictions"].loc["AE", "sbie"] - 1.88e6) < 1e-6
+
+    # A low-tax foreign jurisdiction is allocated as top-up tax, not DMTT
+    data["covered_taxes"][3] = 1e6
+    entities = pillar2_top_up(data, year=2025)["entities"]
+    assert entities["top_up_tax"].iloc[3] > 0 and entities["dmtt"].iloc[3] == 0
+
+
+def _benchmark():
+    import time
+
+    rng = np.random.default_rng(0)
+    for n in (10_000, 100_000, 1_000_000):
+        codes = [f"J{i:03d}" for i in range(150)] + [DOMESTIC_JURISDICTION]
+        income = rng.lognormal(15, 2, n) * np.where(rng.random(n) < 0.15, -1, 1)
+        data = pd.DataFrame({
+            "jurisdiction": pd.Categorical(rng.choice(codes, n)),
+            "globe_income": income,
+            "covered_taxes": np.maximum(income, 0) * rng.uniform(0, 0.25, n),
+            "payroll_costs": rng.lognormal(14, 1.5, n),
+            "tangible_assets": rng.lognormal(15, 1.5, n),
+            "globe_revenue": rng.lognormal(17, 2, n),
+        })
+        start = time.perf_counter()
+        result = pillar2_top_up(data, group_revenue=5e9)
+        seconds = time.perf_counter() - start
+        print(f"{n:>9,} entities: {seconds * 1000:.1f} ms, top-up EUR {result['total_top_up']:,.0f} "
+              f"(DMTT EUR {result['dmtt']:,.0f})")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,331 @@
+# utils/population.py
+"""
+Seeded synthetic entity population for load testing and capacity planning.
+Produces records with exactly the fields returned by get_user_inputs() (plus an
+entity_id), drawn from configurable distributions, and writes them to CSV or Parquet
+in chunks so that tens of millions of rows never sit in memory at once. The files use
+the layout utils.bulk reads (exempt_type ';'-separated), so they can be fed straight
+into a bulk run.
+
+Rows are generated in fixed blocks, each seeded from (seed, block number), so the same
+seed gives the same population whatever the chunk size.
+
+Usage:
+    python -m utils.population entities.parquet --rows 50000000 --seed 7
+    python -m utils.population entities.csv --rows 1000000 --config distributions.json
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from utils.bulk import peak_rss_mb
+from utils.schema import INPUT_DEFAULTS
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+BLOCK_SIZE = 65_536
+COLUMNS = ["entity_id", *INPUT_DEFAULTS]
+YES_NO = ["No", "Yes"]
+
+EXEMPT_TYPES = (
+    "Government Entity", "Government Controlled Entity", "Extractive Business",
+    "Non-Extractive Natural Resource Business", "Qualifying Public Benefit Entity",
+    "Qualifying Mutual Fund", "Public or Private Pension Fund",
+)
+
+# Categorical fields are {option: weight} (weights need not sum to 1); *_share entries are
+# the probability of a "Yes"/True or of a non-zero amount; *_ratio entries are (low, high)
+# bounds of a uniform fraction of revenue. Revenue is log-normal around revenue_median (AED).
+DEFAULT_DISTRIBUTIONS = {
+    "entity_type": {"Legal Entity": 0.62, "Natural Person": 0.08, "Partnership": 0.06, "Trust": 0.02,
+                    "Sole Proprietor": 0.17, "Non-Resident": 0.05},
+    "sector": {"General Business": 0.85, "Banking": 0.02, "Insurance": 0.02, "Extractive Business": 0.01,
+               "Non-Extractive Natural Resource Business": 0.01, "Other": 0.09},
+    "revenue_median": 1_200_000.0,
+    "revenue_sigma": 1.9,
+    "deduction_ratio": (0.2, 0.95),
+    "free_zone_share": 0.2,
+    "qualifying_fz_share": 0.6,
+    "qualifying_income_ratio": (0.5, 1.0),
+    "non_qualifying_income_ratio": (0.0, 0.1),
+    "pe_share": 0.6,
+    "exempt_share": 0.02,
+    "advanced_exemption_share": 0.001,
+    "mne_share": 0.01,
+    "mne_revenue_multiplier": 200.0,
+    "global_revenue_median": 3_000_000_000.0,
+    "globe_income_ratio": (0.02, 0.2),
+    "covered_taxes_ratio": (0.03, 0.3),
+    "exempt_income_share": 0.1,
+    "exempt_income_ratio": (0.0, 0.1),
+    "loss_share": 0.2,
+    "loss_ratio": (0.0, 0.6),
+    "participation_exempt_income_share": 0.05,
+    "participation_exempt_income_ratio": (0.0, 0.1),
+    "non_deductibles_share": 0.1,
+    "non_deductibles_ratio": (0.0, 0.005),
+    "foreign_tax_share": 0.05,
+    "foreign_tax_ratio": (0.0, 0.02),
+    "zakat_share": 0.02,
+    "zakat_ratio": (0.0, 0.01),
+    "entertainment_share": 0.5,
+    "entertainment_ratio": (0.0, 0.01),
+    "related_party_share": 0.3,
+    "related_party_interest_ratio": (0.0, 0.05),
+    "transitional_period_share": 0.05,
+    "tax_group_share": 0.05,
+    "audited_share": 0.4,
+    "group_relief_share": 0.05,
+    "docs_uploaded_share": 0.8,
+    "gaar_confirmed_share": 0.98,
+    "license_issue_date": ("2019-01-01", "2025-12-31"),
+}
+
+
+def distributions(overrides: dict = None) -> dict:
+    """
+    DEFAULT_DISTRIBUTIONS with overrides applied.
+    Raises:
+        ValueError: For an unknown setting.
+    """
+    overrides = overrides or {}
+    unknown = set(overrides) - set(DEFAULT_DISTRIBUTIONS)
+    if unknown:
+        raise ValueError(f"Unknown distribution settings: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_DISTRIBUTIONS, **overrides}
+
+
+def generate_chunks(rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 0, overrides: dict = None):
+    """
+    Yield the population as DataFrames of at most chunk_size rows (COLUMNS, in order).
+    Args:
+        rows (int): Total number of entities.
+        chunk_size (int): Rows per yielded DataFrame.
+        seed (int): Seed; equal seeds and settings give identical rows.
+        overrides (dict): Changes to DEFAULT_DISTRIBUTIONS.
+    """
+    settings = distributions(overrides)
+    pending, pending_rows = [], 0
+    for start in range(0, rows, BLOCK_SIZE):
+        block = generate_block(start // BLOCK_SIZE, min(BLOCK_SIZE, rows - start), seed, settings)
+        pending.append(block)
+        pending_rows += len(block)
+        while pending_rows >= chunk_size:
+            frame = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            yield frame.iloc[:chunk_size].reset_index(drop=True)
+            pending = [frame.iloc[chunk_size:]]
+            pending_rows -= chunk_size
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def generate_block(block: int, n: int, seed: int, settings: dict) -> pd.DataFrame:
+    """
+    Rows block * BLOCK_SIZE .. + n of the population, from their own random stream.
+    """
+    rng = np.random.default_rng([seed, block])
+
+    # String columns are built as categoricals from integer codes: no per-row Python
+    # strings, and Parquet stores them dictionary-encoded
+    def pick(weights):
+        p = np.array(list(weights.values()), dtype=np.float64)
+        return categorical(rng.choice(len(p), n, p=p / p.sum()), list(weights))
+
+    def categorical(codes, categories):
+        return pd.Categorical.from_codes(codes.astype(np.int8), categories)
+
+    def share(name):
+        return rng.random(n) < settings[name]
+
+    def yes_no(mask):
+        return categorical(mask, YES_NO)
+
+    def fraction(name):
+        low, high = settings[name]
+        return rng.uniform(low, high, n)
+
+    def amount(base, ratio, share_name=None):
+        values = base * fraction(ratio)
+        if share_name:
+            values[~share(share_name)] = 0.0
+        return np.round(values, 2)
+
+    entity_type = pick(settings["entity_type"])
+    non_resident = np.asarray(entity_type == "Non-Resident")
+    sector = pick(settings["sector"])
+    free_zone = share("free_zone_share") & ~non_resident
+    qualifying = free_zone & share("qualifying_fz_share")
+    mne = share("mne_share") & np.asarray(entity_type == "Legal Entity")
+    related_party = share("related_party_share")
+
+    revenue = rng.lognormal(np.log(settings["revenue_median"]), settings["revenue_sigma"], n)
+    revenue[mne] *= settings["mne_revenue_multiplier"]
+    revenue = np.round(revenue, 2)
+    global_revenue = np.where(mne, np.round(np.maximum(
+        rng.lognormal(np.log(settings["global_revenue_median"]), 0.8, n), 750_000_000.0), 2), 0.0)
+    globe_income = np.round(global_revenue * fraction("globe_income_ratio"), 2)
+    covered_taxes = np.round(globe_income * fraction("covered_taxes_ratio"), 2)
+
+    exempt_codes = np.where(share("exempt_share"), rng.integers(1, len(EXEMPT_TYPES) + 1, n), 0)
+    exempt_type = categorical(exempt_codes, ["", *EXEMPT_TYPES])
+    advanced = categorical(share("advanced_exemption_share"), ["", "Pending FTA ruling"])
+    pe_status = yes_no(non_resident & share("pe_share"))
+    sector_details = categorical(np.zeros(n), [""])
+    tax_period = categorical(np.zeros(n), [""])
+
+    first, last = (date.fromisoformat(value) for value in settings["license_issue_date"])
+    days = rng.integers(0, (last - first).days + 1, n)
+    license_issue_date = np.datetime64(first, "D") + days
+
+    non_deductibles = {name: amount(revenue, "non_deductibles_ratio", "non_deductibles_share")
+                       for name in ("fines", "bribes", "non_approved_donations", "other_non_deductibles")}
+    columns = {
+        "entity_id": np.arange(block * BLOCK_SIZE, block * BLOCK_SIZE + n, dtype=np.int64),
+        "revenue": revenue,
+        "deductions": amount(revenue, "deduction_ratio"),
+        "exempt_income": amount(revenue, "exempt_income_ratio", "exempt_income_share"),
+        "qualifying_income": np.where(free_zone, amount(revenue, "qualifying_income_ratio"), 0.0),
+        "non_qualifying_income": np.where(free_zone, amount(revenue, "non_qualifying_income_ratio"), 0.0),
+        "prior_year_tax_losses": amount(revenue, "loss_ratio", "loss_share"),
+        "participation_exempt_income": amount(revenue, "participation_exempt_income_ratio",
+                                              "participation_exempt_income_share"),
+        **non_deductibles,
+        "foreign_tax_paid": amount(revenue, "foreign_tax_ratio", "foreign_tax_share"),
+        "zakat_paid": amount(revenue, "zakat_ratio", "zakat_share"),
+        "entertainment_expenses": amount(revenue, "entertainment_ratio", "entertainment_share"),
+        "related_party_loan_interest": np.where(related_party, amount(revenue, "related_party_interest_ratio"), 0.0),
+        "global_revenue": global_revenue,
+        "globe_income": globe_income,
+        "covered_taxes": covered_taxes,
+        "free_zone": yes_no(free_zone),
+        "qualifying_fz": categorical(np.where(free_zone, qualifying, 2), [*YES_NO, "Not Applicable"]),
+        "in_tax_group": yes_no(share("tax_group_share") & ~qualifying),
+        "has_related_party_tx": yes_no(related_party),
+        "has_audited_accounts": yes_no(share("audited_share")),
+        "eligible_for_group_relief": yes_no(share("group_relief_share")),
+        "residency_status": yes_no(~non_resident),
+        "pe_status": pe_status,
+        "transitional_period": yes_no(share("transitional_period_share")),
+        "is_mne_group": yes_no(mne),
+        "entity_type": entity_type,
+        "sector": sector,
+        "sector_details": sector_details,
+        "advanced_exemptions": advanced,
+        "docs_uploaded": share("docs_uploaded_share"),
+        "gaar_warning": share("gaar_confirmed_share"),
+        "exempt_type": exempt_type,
+        "license_issue_date": license_issue_date,
+        "tax_period": tax_period,
+    }
+    return pd.DataFrame({name: columns[name] for name in COLUMNS})
+
+
+def write_population(path, rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 0, overrides: dict = None) -> dict:
+    """
+    Generate the population straight to a CSV or Parquet file (format follows the extension).
+    Returns:
+        dict: Run statistics (rows, seconds, rows_per_sec, peak_rss_mb).
+    """
+    start = time.perf_counter()
+    written = 0
+    writer = _open_writer(path, generate_block(0, 0, seed, distributions(overrides)))
+    try:
+        for chunk in generate_chunks(rows, chunk_size, seed, overrides):
+            writer.write_table(_to_table(chunk))
+            written += len(chunk)
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - start
+    return {
+        "rows": written,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(written / seconds, 1) if seconds else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def _to_table(frame):
+    """Arrow table for a population chunk, with license_issue_date as a calendar date."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    index = table.schema.get_field_index("license_issue_date")
+    return table.set_column(index, "license_issue_date", table.column(index).cast(pa.date32()))
+
+
+def _open_writer(path, empty_frame):
+    """
+    Arrow writer for path (Parquet or CSV by extension); the schema comes from an empty chunk.
+    pandas' to_csv formats ~40k rows/s here against ~400k rows/s for pyarrow's CSV writer.
+    """
+    schema = _to_table(empty_frame).schema
+    if str(path).lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(path, schema)
+    import pyarrow.csv as pc
+    return pc.CSVWriter(path, schema)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic entity population (CSV/Parquet).")
+    parser.add_argument("output", help="Output CSV or Parquet file")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of entities")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows held in memory at a time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--config", help="JSON file with overrides for DEFAULT_DISTRIBUTIONS")
+    args = parser.parse_args(argv)
+    overrides = None
+    if args.config:
+        with open(args.config, encoding="utf-8") as handle:
+            overrides = json.load(handle)
+    stats = write_population(args.output, args.rows, args.chunk_size, args.seed, overrides)
+    print(f"Generated {stats['rows']:,} rows in {stats['seconds']:,.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/sec), peak RSS {stats['peak_rss_mb']:,.1f} MiB")
+    return 0
+
+
+# Automated test cases for pytest
+
+def test_population_is_seeded_chunk_independent_and_bulk_readable(tmp_path):
+    """
+    Same seed, same rows whatever the chunking; the get_user_inputs() field set; readable by utils.bulk.
+    """
+    from utils.bulk import run_bulk, read_chunks
+
+    rows = BLOCK_SIZE + 1_000
+    whole = pd.concat(generate_chunks(rows, chunk_size=rows, seed=5), ignore_index=True)
+    chunked = list(generate_chunks(rows, chunk_size=30_000, seed=5))
+    assert [len(chunk) for chunk in chunked] == [30_000, 30_000, 6_536]
+    assert pd.concat(chunked, ignore_index=True).equals(whole)
+    assert not whole.equals(next(generate_chunks(rows, chunk_size=rows, seed=6)))
+    assert list(whole.columns) == COLUMNS and whole["entity_id"].is_unique
+
+    free_zone = whole["free_zone"] == "Yes"
+    assert set(whole.loc[~free_zone, "qualifying_fz"]) == {"Not Applicable"}
+    assert (whole.loc[whole["is_mne_group"] == "Yes", "global_revenue"] >= 750_000_000).all()
+    assert (whole.loc[whole["entity_type"] == "Non-Resident", "residency_status"] == "No").all()
+    assert 0.17 < free_zone.mean() < 0.21
+
+    only = next(generate_chunks(100, overrides={"entity_type": {"Non-Resident": 1}, "pe_share": 1.0}))
+    assert set(only["entity_type"]) == {"Non-Resident"} and set(only["pe_status"]) == {"Yes"}
+    try:
+        distributions({"revenue_mean": 1})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown settings must be rejected")
+
+    for name in ("entities.csv", "entities.parquet"):
+        stats = write_population(tmp_path / name, 5_000, chunk_size=2_000, seed=1)
+        assert stats["rows"] == 5_000
+        read = pd.concat(read_chunks(tmp_path / name, 2_000), ignore_index=True)
+        assert list(read.columns) == COLUMNS and len(read) == 5_000
+        assert run_bulk(tmp_path / name, tmp_path / f"results-{name}")["rows"] == 5_000
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+# utils/records.py
+"""
+Typed, slotted input/result records for high-volume use of the tax calculator.
+TaxInput stores the "Yes"/"No" answers of the input form as booleans and the entity
+type and sector as enums; TaxInput.from_dict() adapts the dict returned by
+components.input_form.get_user_inputs().
+"""
+import ast
+import copy
+import inspect
+import textwrap
+from dataclasses import dataclass, field, fields
+from datetime import date
+from enum import Enum
+
+from utils.notes import Notes
+
+
+class EntityType(Enum):
+    UNSPECIFIED = ""
+    LEGAL_ENTITY = "Legal Entity"
+    NATURAL_PERSON = "Natural Person"
+    PARTNERSHIP = "Partnership"
+    TRUST = "Trust"
+    SOLE_PROPRIETOR = "Sole Proprietor"
+    NON_RESIDENT = "Non-Resident"
+
+
+class Sector(Enum):
+    GENERAL_BUSINESS = "General Business"
+    BANKING = "Banking"
+    INSURANCE = "Insurance"
+    EXTRACTIVE = "Extractive Business"
+    NON_EXTRACTIVE_NATURAL_RESOURCE = "Non-Extractive Natural Resource Business"
+    OTHER = "Other"
+
+
+EXEMPT_SECTORS = (Sector.EXTRACTIVE, Sector.NON_EXTRACTIVE_NATURAL_RESOURCE)
+
+# Form answers stored as booleans ("Yes" -> True, anything else -> False)
+YES_NO_FIELDS = (
+    "free_zone", "qualifying_fz", "in_tax_group", "has_related_party_tx", "has_audited_accounts",
+    "eligible_for_group_relief", "residency_status", "pe_status", "transitional_period", "is_mne_group",
+)
+
+
+@dataclass(slots=True)
+class TaxInput:
+    """One entity's inputs, with the same field names as the get_user_inputs() dict."""
+    revenue: float = 0.0
+    deductions: float = 0.0
+    exempt_income: float = 0.0
+    qualifying_income: float = 0.0
+    non_qualifying_income: float = 0.0
+    prior_year_tax_losses: float = 0.0
+    participation_exempt_income: float = 0.0
+    fines: float = 0.0
+    bribes: float = 0.0
+    non_approved_donations: float = 0.0
+    other_non_deductibles: float = 0.0
+    foreign_tax_paid: float = 0.0
+    zakat_paid: float = 0.0
+    entertainment_expenses: float = 0.0
+    related_party_loan_interest: float = 0.0
+    global_revenue: float = 0.0
+    globe_income: float = 0.0
+    covered_taxes: float = 0.0
+    free_zone: bool = False
+    qualifying_fz: bool = False
+    in_tax_group: bool = False
+    has_related_party_tx: bool = False
+    has_audited_accounts: bool = False
+    eligible_for_group_relief: bool = False
+    residency_status: bool = True
+    pe_status: bool = False
+    transitional_period: bool = False
+    is_mne_group: bool = False
+    docs_uploaded: bool = False
+    gaar_warning: bool = True
+    entity_type: EntityType = EntityType.UNSPECIFIED
+    sector: Sector = Sector.GENERAL_BUSINESS
+    sector_details: str = ""
+    advanced_exemptions: str = ""
+    exempt_type: tuple = field(default_factory=tuple)
+    license_issue_date: date = None
+    tax_period: str = ""
+
+    @classmethod
+    def from_dict(cls, inputs: dict) -> "TaxInput":
+        """
+        Build a TaxInput from the dict shape produced by get_user_inputs().
+        Missing keys take the calculate_tax() defaults; unknown entity types map to
+        EntityType.UNSPECIFIED and unknown sectors to Sector.OTHER.
+        """
+        get = inputs.get
+        return cls(
+            get("revenue", 0.0),
+            get("deductions", 0.0),
+            get("exempt_income", 0.0),
+            get("qualifying_income", 0.0),
+            get("non_qualifying_income", 0.0),
+            get("prior_year_tax_losses", 0.0),
+            get("participation_exempt_income", 0.0),
+            get("fines", 0.0),
+            get("bribes", 0.0),
+            get("non_approved_donations", 0.0),
+            get("other_non_deductibles", 0.0),
+            get("foreign_tax_paid", 0.0),
+            get("zakat_paid", 0.0),
+            get("entertainment_expenses", 0.0),
+            get("related_party_loan_interest", 0.0),
+            get("global_revenue", 0.0),
+            get("globe_income", 0.0),
+            get("covered_taxes", 0.0),
+            get("free_zone") == "Yes",
+            get("qualifying_fz") == "Yes",
+            get("in_tax_group") == "Yes",
+            get("has_related_party_tx") == "Yes",
+            get("has_audited_accounts") == "Yes",
+            get("eligible_for_group_relief") == "Yes",
+            get("residency_status", "Yes") == "Yes",
+            get("pe_status") == "Yes",
+            get("transitional_period") == "Yes",
+            get("is_mne_group") == "Yes",
+            bool(get("docs_uploaded", False)),
+            bool(get("gaar_warning", True)),
+            _ENTITY_TYPES[get("entity_type", "")],
+            _SECTORS[get("sector", "General Business")],
+            get("sector_details", "") or "",
+            get("advanced_exemptions", "") or "",
+            tuple(get("exempt_type") or ()),
+            get("license_issue_date"),
+            get("tax_period", "") or "",
+        )
+
+    def to_dict(self) -> dict:
+        """Convert back to the get_user_inputs() dict shape ("Yes"/"No" strings, plain text enums)."""
+        inputs = {name: getattr(self, name) for name in self.__slots__}
+        for name in YES_NO_FIELDS:
+            inputs[name] = "Yes" if inputs[name] else "No"
+        inputs["entity_type"] = self.entity_type.value
+        inputs["sector"] = self.sector.value
+        inputs["exempt_type"] = list(self.exempt_type)
+        return inputs
+
+
+@dataclass(slots=True)
+class TaxResult:
+    """
+    Result of calculate_tax_record(); to_dict() gives the calculate_tax() dict shape, with the
+    notes rendered to a NoteList (a list of strings). notes is a lazily rendered Notes sequence
+    (see utils.notes).
+    """
+    taxable_income: float
+    tax_payable: float
+    notes: Notes
+
+    def to_dict(self) -> dict:
+        return {"taxable_income": self.taxable_income, "tax_payable": self.tax_payable, "notes": self.notes.render()}
+
+
+class _Members(dict):
+    """Enum members by value; unknown values give the default member."""
+    __slots__ = ("default",)
+
+    def __init__(self, enum, default):
+        super().__init__((member.value, member) for member in enum)
+        self.default = default
+
+    def __missing__(self, value):
+        return self.default
+
+
+# Subscripted rather than .get(value, Enum.MEMBER): a member lookup on the Enum class goes
+# through EnumType.__getattr__ on Python 3.11, several times the cost of the dict lookup
+_ENTITY_TYPES = _Members(EntityType, EntityType.UNSPECIFIED)
+_SECTORS = _Members(Sector, Sector.OTHER)
+
+
+def reading_dicts(function, **names):
+    """
+    Copy of function(record, ...) that takes the get_user_inputs() dict in place of a TaxInput.
+    Each `record.<field>` read in its source becomes that field's expression in TaxInput.from_dict(),
+    so a call converts only the fields the function reads on its path instead of building a whole
+    TaxInput first. The copy is compiled once, in the function's module globals.
+    Args:
+        function (callable): Function whose first parameter is a TaxInput read only as `record.<field>`.
+        names: Module-level names to rebind in the copy, e.g. TaxResult to return a dict instead.
+    """
+    adapter = ast.parse(textwrap.dedent(inspect.getsource(TaxInput.from_dict))).body[0]
+    # from_dict() ends in `return cls(<one expression per field, in field order>)`
+    expressions = dict(zip((item.name for item in fields(TaxInput)), adapter.body[-1].value.args))
+    definition = ast.parse(textwrap.dedent(inspect.getsource(function))).body[0]
+    record = definition.args.args[0].arg
+    definition.args.args[0].arg = "inputs"
+    definition.body.insert(0, ast.parse("get = inputs.get").body[0])
+    definition = _FieldReads(record, expressions).visit(definition)
+    # Compiled inside a factory, so the names from_dict() uses are closure variables and the copy
+    # keeps the function's live module globals
+    names = {**_ADAPTER_NAMES, **names}
+    factory = ast.parse(f"def factory({', '.join(names)}): pass").body[0]
+    factory.body = [definition, ast.Return(ast.Name(definition.name, ast.Load()))]
+    module = ast.fix_missing_locations(ast.Module([factory], type_ignores=[]))
+    namespace = {}
+    exec(compile(module, inspect.getsourcefile(function), "exec"), function.__globals__, namespace)
+    return namespace["factory"](**names)
+
+
+# Module names the from_dict() expressions refer to
+_ADAPTER_NAMES = {"_ENTITY_TYPES": _ENTITY_TYPES, "_SECTORS": _SECTORS}
+
+
+class _FieldReads(ast.NodeTransformer):
+    def __init__(self, record, expressions):
+        self.record = record
+        self.expressions = expressions
+
+    def visit_Attribute(self, node):
+        if isinstance(node.value, ast.Name) and node.value.id == self.record:
+            return copy.deepcopy(self.expressions[node.attr])
+        return self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id == self.record:
+            raise ValueError(f"{self.record} is used other than as {self.record}.<field>")
+        return node
+
+
+# Automated test cases for pytest
+
+def test_tax_input_round_trip():
+    """
+    from_dict() -> to_dict() keeps every form answer, and defaults match calculate_tax().
+    """
+    inputs = {
+        "entity_type": "Non-Resident", "residency_status": "No", "pe_status": "Yes", "sector": "Banking",
+        "sector_details": "", "free_zone": "Yes", "qualifying_fz": "No", "exempt_type": ["Government Entity"],
+        "advanced_exemptions": "", "is_mne_group": "No", "global_revenue": 0.0, "globe_income": 0.0,
+        "covered_taxes": 0.0, "gaar_warning": True, "license_issue_date": date(2024, 3, 1),
+        "revenue": 5_000_000.0, "deductions": 100.0, "exempt_income": 0.0, "qualifying_income": 0.0,
+        "non_qualifying_income": 0.0, "foreign_tax_paid": 0.0, "zakat_paid": 0.0, "entertainment_expenses": 0.0,
+        "related_party_loan_interest": 0.0, "transitional_period": "No", "in_tax_group": "Yes",
+        "has_related_party_tx": "No", "has_audited_accounts": "Yes", "prior_year_tax_losses": 0.0,
+        "participation_exempt_income": 0.0, "fines": 0.0, "bribes": 0.0, "non_approved_donations": 0.0,
+        "other_non_deductibles": 0.0, "eligible_for_group_relief": "No", "docs_uploaded": True,
+        "tax_period": "FY2026",
+    }
+    record = TaxInput.from_dict(inputs)
+    assert record.entity_type is EntityType.NON_RESIDENT and record.pe_status and not record.residency_status
+    assert record.to_dict() == inputs
+    assert TaxInput.from_dict({}) == TaxInput()
+    assert TaxInput.from_dict({"sector": "Unknown", "entity_type": "Unknown"}).sector is Sector.OTHER
+
+
+def test_calculate_tax_record_matches_dict_api():
+    import json
+    from utils.tax_calculator import calculate_tax, calculate_tax_record
+    from utils.batch_calculator import _random_corpus
+
+    corpus = _random_corpus(2_000, seed=5)
+    for i in range(2_000):
+        inputs = {name: corpus[name][i].item() for name in corpus}
+        result = calculate_tax_record(TaxInput.from_dict(inputs))
+        assert isinstance(result, TaxResult)
+        expected = calculate_tax(inputs)
+        assert result.to_dict() == expected and expected["notes"].entries == result.notes.entries
+    assert json.loads(json.dumps(expected))["notes"] == expected["notes"]
+    assert expected["notes"] + ["extra"] == [*result.notes, "extra"]
+
+
+def _benchmark(n=200_000):
+    import time
+    import tracemalloc
+    from utils.tax_calculator import calculate_tax, calculate_tax_record
+    from utils.batch_calculator import _random_corpus
+
+    corpus = _random_corpus(n, seed=11)
+    dicts = [{name: corpus[name][i].item() for name in corpus} for i in range(n)]
+    records = [TaxInput.from_dict(inputs) for inputs in dicts]
+
+    start = time.perf_counter()
+    for inputs in dicts:
+        calculate_tax(inputs)
+    per_dict = (time.perf_counter() - start) / n
+    start = time.perf_counter()
+    for record in records:
+        calculate_tax_record(record)
+    per_record = (time.perf_counter() - start) / n
+    print(f"calculate_tax(dict)            {per_dict * 1e6:6.2f} us/call")
+    print(f"calculate_tax_record(TaxInput) {per_record * 1e6:6.2f} us/call")
+
+    sample = records[:50_000]
+    for label, run in (("dict results", lambda: [calculate_tax(d) for d in dicts[:50_000]]),
+                       ("TaxResult results", lambda: [calculate_tax_record(r) for r in sample])):
+        tracemalloc.start()
+        results = run()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<18} {size / len(results):7.0f} bytes/result")
+        del results
+    tracemalloc.start()
+    inputs_copy = [dict(d) for d in dicts[:50_000]]
+    dict_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracemalloc.start()
+    record_copy = [TaxInput.from_dict(d) for d in dicts[:50_000]]
+    record_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"input dict         {dict_size / len(inputs_copy):7.0f} bytes/input")
+    print(f"TaxInput           {record_size / len(record_copy):7.0f} bytes/input")
+
+
+if __name__ == "__main__":
+    _benchmark()
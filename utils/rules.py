@@ -0,0 +1,147 @@
+# utils/rules.py
+"""
+Corporate Tax rule parameters, versioned by tax period.
+Each period's thresholds and rates live in one frozen RuleSet, built once at import into the
+read-only RULE_SETS mapping. The scalar calculator and check_eligibility() resolve a record's
+set with one subscript of RULES_BY_PERIOD; the batch calculator turns a period column into per-row rule arrays
+with one comparison per known period (see batch_calculator._rule_columns).
+A blank tax_period uses DEFAULT_PERIOD, whose values are the ones the calculator always used.
+
+Stdlib only: imported by the core calculator, which must stay light to import.
+"""
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+
+
+@dataclass(frozen=True, slots=True)
+class RuleSet:
+    """Thresholds and rates for one tax period (amounts in AED unless noted)."""
+    period: str
+    small_business_revenue: float = 3_000_000  # Small Business Relief: revenue at or below (Article 21)
+    zero_rate_band: float = 375_000  # taxable income taxed at 0%
+    standard_rate: float = 0.09  # rate above the band
+    dmtt_rate: float = 0.15  # Domestic Minimum Top-up Tax floor
+    dmtt_revenue: float = 3_000_000_000  # revenue from which the DMTT applies
+    qfzp_deminimis_share: float = 0.05  # QFZP de-minimis: share of revenue...
+    qfzp_deminimis_cap: float = 5_000_000  # ...capped at this amount
+    loss_offset_share: float = 0.75  # share of taxable income prior year losses can offset
+    interest_ebitda_share: float = 0.3  # interest deduction cap as a share of EBITDA
+    interest_deminimis_allowance: float = 12_000_000  # net interest deductible whatever the EBITDA (Article 30)
+    pillar2_revenue: float = 750_000_000  # EUR, consolidated revenue bringing an MNE group into Pillar 2
+    globe_minimum_rate: float = 0.15  # Pillar 2 minimum effective tax rate per jurisdiction
+
+
+RULE_SETS = MappingProxyType({
+    # The DMTT applies to financial years starting on or after 1 January 2025
+    "FY2024": RuleSet("FY2024", dmtt_revenue=float("inf")),
+    "FY2025": RuleSet("FY2025"),
+    # Small Business Relief is available for tax periods ending on or before 31 December 2026
+    "FY2026": RuleSet("FY2026"),
+})
+DEFAULT_PERIOD = "FY2025"
+
+
+class _PeriodTable(dict):
+    def __missing__(self, period):
+        raise ValueError(f"Unknown tax period {period!r}; expected one of {', '.join(RULE_SETS)}")
+
+
+# Rule set by every accepted tax_period value, blank included; a plain subscript is the whole
+# per-record lookup, and unknown periods raise ValueError
+RULES_BY_PERIOD = MappingProxyType(_PeriodTable(
+    {**RULE_SETS, "": RULE_SETS[DEFAULT_PERIOD], None: RULE_SETS[DEFAULT_PERIOD]}))
+
+
+def rules_for(period: str = "") -> RuleSet:
+    """
+    The rule set of a tax period.
+    Args:
+        period (str): A RULE_SETS key such as "FY2025"; blank or None gives DEFAULT_PERIOD.
+    Raises:
+        ValueError: For an unknown period.
+    """
+    return RULES_BY_PERIOD[period]
+
+
+@lru_cache(maxsize=None)
+def rules_version(rules: RuleSet) -> str:
+    """
+    Version of a rule set, derived from its contents: any change to a threshold or rate gives a new
+    version, so results stored under it (see utils.store) never pass for results of other rules.
+    """
+    return hashlib.blake2b(repr(rules).encode(), digest_size=6).hexdigest()
+
+
+# Automated test cases for pytest
+
+def test_rule_sets_are_immutable_and_versioned():
+    """
+    Blank periods use the default set; FY2024 predates the DMTT; sets and the mapping are read-only.
+    """
+    from dataclasses import FrozenInstanceError
+
+    from utils.tax_calculator import calculate_tax
+
+    assert rules_for("") is rules_for(None) is RULE_SETS[DEFAULT_PERIOD]
+    try:
+        rules_for("FY1999")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown periods must be rejected")
+    try:
+        RULE_SETS["FY2025"].standard_rate = 0.2
+    except FrozenInstanceError:
+        pass
+    else:
+        raise AssertionError("rule sets must be frozen")
+    try:
+        RULE_SETS["FY2027"] = RuleSet("FY2027")
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("RULE_SETS must be read-only")
+    # Versions follow the contents, not the period name
+    assert rules_version(RULE_SETS["FY2025"]) == rules_version(RuleSet("FY2025"))
+    assert rules_version(RULE_SETS["FY2025"]) != rules_version(RuleSet("FY2025", standard_rate=0.1))
+
+    large = {"revenue": 4_000_000_000, "entity_type": "Legal Entity"}
+    dmtt = calculate_tax(large)["tax_payable"]
+    assert calculate_tax({**large, "tax_period": "FY2025"})["tax_payable"] == dmtt == 0.15 * 4_000_000_000
+    assert calculate_tax({**large, "tax_period": "FY2024"})["tax_payable"] == 0.09 * (4_000_000_000 - 375_000)
+
+    # A mixed batch applies each record's own period
+    from utils.batch_calculator import calculate_tax_batch
+
+    batch = calculate_tax_batch({**large, "tax_period": ["FY2024", "", "FY2026", "FY2024"]})
+    assert batch["tax_payable"].tolist() == [0.09 * (4_000_000_000 - 375_000), dmtt, dmtt,
+                                             0.09 * (4_000_000_000 - 375_000)]
+    try:
+        calculate_tax_batch({**large, "tax_period": ["FY2025", "2025"]})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown periods must be rejected in batches too")
+
+
+def _benchmark(n=1_000_000):
+    """Batch cost of a mixed-period column against the same records with no period column."""
+    import time
+
+    from utils.batch_calculator import _random_corpus, calculate_tax_batch
+
+    mixed = _random_corpus(n, seed=0)
+    corpus = {name: column for name, column in mixed.items() if name != "tax_period"}
+    for label, data in (("no tax_period column", corpus), ("blank/FY2024/25/26 mixed", mixed)):
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            calculate_tax_batch(data)
+            best = min(best, time.perf_counter() - start)
+        print(f"calculate_tax_batch, {label:<28} {best * 1e9 / n:6.1f} ns/record")
+
+
+if __name__ == "__main__":
+    _benchmark()
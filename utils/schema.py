@@ -0,0 +1,102 @@
+# utils/schema.py
+"""
+Input field definitions shared by the scalar and batch calculators.
+Defaults mirror the ones applied by calculate_tax() when a field is missing.
+"""
+
+NUMERIC_FIELDS = {
+    "revenue": 0.0,
+    "deductions": 0.0,
+    "exempt_income": 0.0,
+    "qualifying_income": 0.0,
+    "non_qualifying_income": 0.0,
+    "prior_year_tax_losses": 0.0,
+    "participation_exempt_income": 0.0,
+    "fines": 0.0,
+    "bribes": 0.0,
+    "non_approved_donations": 0.0,
+    "other_non_deductibles": 0.0,
+    "foreign_tax_paid": 0.0,
+    "zakat_paid": 0.0,
+    "entertainment_expenses": 0.0,
+    "related_party_loan_interest": 0.0,
+    "global_revenue": 0.0,
+    "globe_income": 0.0,
+    "covered_taxes": 0.0,
+}
+
+CHOICE_FIELDS = {
+    "free_zone": "No",
+    "qualifying_fz": "No",
+    "in_tax_group": "No",
+    "has_related_party_tx": "No",
+    "has_audited_accounts": "No",
+    "eligible_for_group_relief": "No",
+    "residency_status": "Yes",
+    "pe_status": "No",
+    "transitional_period": "No",
+    "is_mne_group": "No",
+}
+
+TEXT_FIELDS = {
+    "entity_type": "",
+    "sector": "General Business",
+    "sector_details": "",
+    "advanced_exemptions": "",
+    "tax_period": "",  # a utils.rules.RULE_SETS key; blank uses the default period
+}
+
+FLAG_FIELDS = {
+    "docs_uploaded": False,
+    "gaar_warning": True,
+}
+
+INPUT_DEFAULTS = {
+    **NUMERIC_FIELDS,
+    **CHOICE_FIELDS,
+    **TEXT_FIELDS,
+    **FLAG_FIELDS,
+    "exempt_type": [],
+    "license_issue_date": None,
+}
+
+_STRINGS = tuple({**CHOICE_FIELDS, **TEXT_FIELDS}.items())
+_FLAGS = tuple(FLAG_FIELDS.items())
+
+
+def normalize_inputs(inputs: dict) -> dict:
+    """
+    Fill defaults and canonicalize values the way the calculator reads them: amounts as floats,
+    Yes/No answers and text as strings, flags as booleans. Keys the calculator does not use are
+    dropped. Amounts are kept exact, so calculate_tax() gives the same result on the normalized
+    inputs as on the original ones.
+    """
+    get = inputs.get
+    normalized = {name: float(get(name) or 0.0) for name in NUMERIC_FIELDS}
+    for name, default in _STRINGS:
+        value = get(name)
+        normalized[name] = default if value is None else str(value)
+    for name, default in _FLAGS:
+        normalized[name] = bool(get(name, default))
+    normalized["exempt_type"] = list(get("exempt_type") or ())
+    normalized["license_issue_date"] = get("license_issue_date")
+    return normalized
+
+
+# Automated test cases for pytest
+
+def test_normalize_inputs_keeps_results_exact():
+    """
+    Defaults are filled and unused keys dropped, but amounts are not rounded: the normalized
+    inputs give calculate_tax() the same result as the original ones.
+    """
+    from datetime import date
+
+    from utils.tax_calculator import calculate_tax
+
+    inputs = {"revenue": 3_000_000.004, "deductions": 1000, "entity_type": "Legal Entity", "unused_field": 1}
+    normalized = normalize_inputs(inputs)
+    assert set(normalized) == set(INPUT_DEFAULTS) and normalized["revenue"] == 3_000_000.004
+    assert normalized["deductions"] == 1000.0 and normalized["free_zone"] == "No"
+    as_of = date(2025, 1, 31)
+    assert calculate_tax(normalized, as_of=as_of) == calculate_tax(inputs, as_of=as_of)
@@ -0,0 +1,484 @@
+# utils/service.py
+"""
+Local HTTP JSON service for the UAE Corporate Tax Calculator.
+Exposes the eligibility check and the tax calculation for single records and in
+batches, over persistent (keep-alive) HTTP/1.1 connections, with request-size limits
+and a latency histogram per endpoint. Standard library only.
+
+Endpoints:
+    POST /v1/eligibility   one record  -> check_eligibility() result
+    POST /v1/tax           one record  -> calculate_tax() result (notes rendered)
+    POST /v1/evaluate      one record  -> eligibility, plus tax for taxable persons
+    POST /v1/batch         {"records": [...], "notes": true} -> {"results": [...]}
+    GET  /v1/health        liveness
+    GET  /v1/metrics       per-endpoint request counts, errors and latency histograms
+                           (plus calculate_tax stage timings and branch counts with --instrument)
+    GET  /metrics          calculate_tax stage timings and branch counts as Prometheus text,
+                           or OpenMetrics when the Accept header asks for it (--instrument only)
+
+Usage:
+    python -m utils.service --port 8000
+    python -m utils.service --port 8000 --instrument
+    python -m utils.service --load-test 20000 --connections 8
+    python -m utils.service --load-test 100 --path /v1/batch --batch-size 5000
+"""
+import argparse
+import bisect
+import json
+import sys
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eligibility_logic import check_eligibility
+from utils import instrumentation
+from utils.cli import evaluate_json_record
+from utils.schema import INPUT_DEFAULTS
+from utils.tax_calculator import calculate_tax
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_MAX_BODY_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_BATCH = 10_000
+# Upper bounds of the latency histogram buckets, in milliseconds (the last bucket is open)
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class HTTPError(Exception):
+    """An error answered with the given HTTP status and a JSON {"error": message} body."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket latency histogram."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, milliseconds, error=False):
+        index = bisect.bisect_left(self.buckets, milliseconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += milliseconds
+            self._errors += error
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: count, errors, mean_ms, p50_ms/p99_ms (bucket upper bounds) and cumulative buckets.
+        """
+        with self._lock:
+            counts, total, errors = list(self._counts), self._sum, self._errors
+        count = sum(counts)
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        return {
+            "count": count,
+            "errors": errors,
+            "mean_ms": total / count if count else 0.0,
+            "p50_ms": self._quantile(counts, count, 0.50),
+            "p99_ms": self._quantile(counts, count, 0.99),
+            "buckets": cumulative,
+        }
+
+    def _quantile(self, counts, count, q):
+        if not count:
+            return 0.0
+        running = 0
+        for index, bucket_count in enumerate(counts):
+            running += bucket_count
+            if running >= q * count:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+def _single(handler):
+    """Wrap a per-record function as an endpoint taking the decoded JSON body."""
+    def endpoint(body, server):
+        return handler(_inputs(body), server)
+    return endpoint
+
+
+def _eligibility(inputs, server):
+    return check_eligibility(inputs)
+
+
+def _tax(inputs, server):
+    result = calculate_tax(inputs, as_of=server.as_of)
+    return {"taxable_income": result["taxable_income"], "tax_payable": result["tax_payable"],
+            "notes": list(result["notes"])}
+
+
+def _evaluate(body, server):
+    return evaluate_json_record(body, as_of=server.as_of)
+
+
+def _batch(body, server):
+    records = body.get("records") if isinstance(body, dict) else None
+    if not isinstance(records, list):
+        raise HTTPError(400, 'Body must be {"records": [...]}')
+    if len(records) > server.max_batch:
+        raise HTTPError(413, f"Batch of {len(records):,} records exceeds the limit of {server.max_batch:,}")
+    notes = bool(body.get("notes", True))
+    results = []
+    for record in records:
+        try:
+            results.append(evaluate_json_record(record, as_of=server.as_of, notes=notes))
+        except Exception as exc:
+            results.append({"error": f"{type(exc).__name__}: {exc}"})
+    return {"results": results}
+
+
+def _inputs(body):
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    inputs = {**INPUT_DEFAULTS, "exempt_type": [], **body}
+    if isinstance(inputs["license_issue_date"], str):
+        try:
+            inputs["license_issue_date"] = date.fromisoformat(inputs["license_issue_date"]) if inputs["license_issue_date"] else None
+        except ValueError as exc:
+            raise HTTPError(400, f"license_issue_date: {exc}")
+    return inputs
+
+
+POST_ENDPOINTS = {
+    "/v1/eligibility": _single(_eligibility),
+    "/v1/tax": _single(_tax),
+    "/v1/evaluate": _evaluate,
+    "/v1/batch": _batch,
+}
+GET_ENDPOINTS = ("/v1/health", "/v1/metrics", "/metrics")
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class CalculatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # persistent connections; every response carries Content-Length
+    server_version = "UAETaxCalculator/1.0"
+    # Headers and body go out in separate writes; without TCP_NODELAY, Nagle's algorithm and
+    # delayed ACKs stall every keep-alive response by tens of milliseconds
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        start = time.perf_counter()
+        endpoint = POST_ENDPOINTS.get(self.path)
+        try:
+            # The body is read first even for unknown paths, so the connection stays usable
+            body = self._read_json()
+            if endpoint is None:
+                raise HTTPError(404 if self.path not in GET_ENDPOINTS else 405, f"No POST endpoint {self.path}")
+            status, payload = 200, endpoint(body, self.server)
+        except HTTPError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+        except (ValueError, TypeError) as exc:
+            # Inputs the calculator rejects (unknown tax_period, non-numeric amounts) are the client's fault
+            status, payload = 400, {"error": f"{type(exc).__name__}: {exc}"}
+        except Exception as exc:
+            status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+        self._send(status, payload)
+        if endpoint is not None:
+            self.server.metrics[self.path].observe((time.perf_counter() - start) * 1e3, error=status >= 400)
+
+    def do_GET(self):
+        if self.path == "/v1/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/v1/metrics":
+            metrics = {path: histogram.snapshot() for path, histogram in self.server.metrics.items()}
+            if self.server.probe:
+                metrics["calculator"] = self.server.probe.snapshot()
+            self._send(200, metrics)
+        elif self.path == "/metrics":
+            if not self.server.probe:
+                self._send(404, {"error": "Instrumentation is off; start the service with --instrument"})
+                return
+            openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+            text = self.server.probe.to_openmetrics(openmetrics=openmetrics)
+            self._send_bytes(200, text.encode("utf-8"), OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+        else:
+            self._send(404 if self.path not in POST_ENDPOINTS else 405, {"error": f"No GET endpoint {self.path}"})
+
+    def _read_json(self):
+        length = self.headers.get("Content-Length")
+        # Whenever the body is not read, the connection cannot be reused
+        if length is None:
+            self.close_connection = True
+            raise HTTPError(411, "Content-Length required")
+        try:
+            length = int(length)
+        except ValueError:
+            self.close_connection = True
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > self.server.max_body_bytes:
+            self.close_connection = True
+            raise HTTPError(413, f"Body of {length:,} bytes exceeds the limit of {self.server.max_body_bytes:,}")
+        data = self.rfile.read(length)
+        try:
+            return json.loads(data)
+        except ValueError as exc:
+            raise HTTPError(400, f"Invalid JSON: {exc}")
+
+    def _send(self, status, payload):
+        self._send_bytes(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                         "application/json; charset=utf-8")
+
+    def _send_bytes(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class CalculatorServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server holding the service limits and metrics.
+    Args:
+        address (tuple): (host, port); port 0 picks a free port.
+        max_body_bytes (int): Largest accepted request body.
+        max_batch (int): Most records accepted by /v1/batch.
+        as_of (date): Fixed evaluation date for deadline notes (defaults to today, per request).
+        verbose (bool): Log every request to stderr.
+        instrument (bool): Enable calculate_tax() instrumentation (utils.instrumentation) for this process.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address=(DEFAULT_HOST, DEFAULT_PORT), max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                 max_batch=DEFAULT_MAX_BATCH, as_of=None, verbose=False, instrument=False):
+        super().__init__(address, CalculatorHandler)
+        self.max_body_bytes = max_body_bytes
+        self.max_batch = max_batch
+        self.as_of = as_of
+        self.verbose = verbose
+        self.metrics = {path: LatencyHistogram() for path in POST_ENDPOINTS}
+        self.probe = instrumentation.enable() if instrument else None
+
+    def server_close(self):
+        super().server_close()
+        if self.probe and instrumentation.active is self.probe:
+            instrumentation.disable()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(**options) -> CalculatorServer:
+    """Start a CalculatorServer on a background thread (port 0 by default) and return it."""
+    options.setdefault("address", (DEFAULT_HOST, 0))
+    server = CalculatorServer(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def load_test(url, path="/v1/evaluate", bodies=None, requests=10_000, connections=4) -> dict:
+    """
+    Drive an endpoint from `connections` threads, each over one keep-alive connection.
+    Args:
+        url (str): Base URL, e.g. "http://127.0.0.1:8000".
+        path (str): Endpoint to POST to.
+        bodies (list): JSON bodies to cycle through (defaults to a small scenario mix).
+        requests (int): Total number of requests.
+        connections (int): Concurrent client connections.
+    Returns:
+        dict: requests, errors, seconds, requests_per_sec and client-side p50_ms/p99_ms.
+    """
+    import http.client
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    payloads = [json.dumps(body).encode("utf-8") for body in (bodies or _scenario_mix())]
+    latencies, errors, lock = [], [0], threading.Lock()
+    per_connection = [requests // connections + (i < requests % connections) for i in range(connections)]
+
+    def client(count, offset):
+        connection = http.client.HTTPConnection(parts.hostname, parts.port)
+        local, failed = [], 0
+        for i in range(count):
+            payload = payloads[(offset + i) % len(payloads)]
+            start = time.perf_counter()
+            connection.request("POST", path, body=payload, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            local.append((time.perf_counter() - start) * 1e3)
+            failed += response.status != 200
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(count, i)) for i, count in enumerate(per_connection)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "seconds": round(seconds, 3),
+        "requests_per_sec": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(latencies[len(latencies) // 2], 3) if latencies else 0.0,
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3) if latencies else 0.0,
+    }
+
+
+def _scenario_mix():
+    return [
+        {"entity_type": "Legal Entity", "revenue": 2_000_000, "deductions": 100_000},
+        {"entity_type": "Legal Entity", "revenue": 10_000_000, "deductions": 1_000_000, "license_issue_date": "2024-02-01"},
+        {"entity_type": "Legal Entity", "revenue": 10_000_000, "free_zone": "Yes", "qualifying_fz": "Yes",
+         "non_qualifying_income": 100_000},
+        {"entity_type": "Non-Resident", "residency_status": "No", "pe_status": "Yes", "revenue": 5_000_000},
+        {"entity_type": "Legal Entity", "revenue": 3_500_000_000, "deductions": 100_000_000},
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP JSON service for the UAE Corporate Tax Calculator.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-body-bytes", type=int, default=DEFAULT_MAX_BODY_BYTES)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Record calculate_tax stage timings and branch counts (served at /metrics)")
+    parser.add_argument("--load-test", type=int, metavar="REQUESTS",
+                        help="Start the service on a free local port, run REQUESTS requests against it and exit")
+    parser.add_argument("--connections", type=int, default=4, help="Client connections for --load-test")
+    parser.add_argument("--path", default="/v1/evaluate", help="Endpoint for --load-test")
+    parser.add_argument("--batch-size", type=int, default=1_000, help="Records per request when --path is /v1/batch")
+    args = parser.parse_args(argv)
+    options = {"max_body_bytes": args.max_body_bytes, "max_batch": args.max_batch, "verbose": args.verbose,
+               "instrument": args.instrument}
+
+    if args.load_test:
+        server = start_in_thread(address=(args.host, 0), **options)
+        try:
+            bodies = None
+            if args.path == "/v1/batch":
+                mix = _scenario_mix()
+                bodies = [{"records": [mix[i % len(mix)] for i in range(args.batch_size)]}]
+            stats = load_test(server.url, args.path, bodies, requests=args.load_test, connections=args.connections)
+        finally:
+            server.shutdown()
+            server.server_close()
+        print(json.dumps(stats))
+        return 0
+
+    server = CalculatorServer((args.host, args.port), **options)
+    print(f"Serving on {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+# Automated test cases for pytest
+
+def test_service_endpoints_keep_alive_and_limits():
+    """
+    Single and batch endpoints answer over one persistent connection; limits and metrics work.
+    """
+    import http.client
+
+    server = start_in_thread(max_body_bytes=4_096, max_batch=3, as_of=date(2024, 12, 1))
+    try:
+        connection = http.client.HTTPConnection(*server.server_address[:2])
+
+        def post(path, body):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode()
+            connection.request("POST", path, body=data, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+
+        record = {"id": 1, "entity_type": "Legal Entity", "revenue": 10_000_000, "license_issue_date": "2024-01-10"}
+        expected = calculate_tax({**record, "license_issue_date": date(2024, 1, 10)}, as_of=date(2024, 12, 1))
+        status, tax = post("/v1/tax", record)
+        assert status == 200 and tax["tax_payable"] == expected["tax_payable"]
+        assert tax["notes"] == list(expected["notes"])
+        status, eligibility = post("/v1/eligibility", record)
+        assert status == 200 and eligibility["is_taxable"] is True
+        status, evaluated = post("/v1/evaluate", record)
+        assert evaluated["id"] == 1 and evaluated["tax_payable"] == expected["tax_payable"]
+
+        status, batch = post("/v1/batch", {"records": [record, {"exempt_type": ["Government Entity"]}, "x"],
+                                           "notes": False})
+        assert status == 200 and len(batch["results"]) == 3
+        assert "notes" not in batch["results"][0] and batch["results"][1]["is_taxable"] is False
+        assert batch["results"][2]["error"].startswith("ValueError")
+        assert post("/v1/batch", {"records": [record] * 4})[0] == 413
+        assert post("/v1/tax", b"{not json")[0] == 400
+        status, invalid = post("/v1/tax", {**record, "tax_period": "FY1999"})
+        assert status == 400 and "FY1999" in invalid["error"]
+        assert post("/v1/tax", {**record, "revenue": "abc"})[0] == 400
+        assert post("/v1/nothing", {})[0] == 404
+        assert post("/v1/tax", {"padding": "x" * 5_000})[0] == 413
+
+        connection = http.client.HTTPConnection(*server.server_address[:2])
+        connection.request("GET", "/v1/metrics")
+        metrics = json.loads(connection.getresponse().read())
+        assert metrics["/v1/tax"]["count"] == 5 and metrics["/v1/tax"]["errors"] == 4
+        assert metrics["/v1/batch"]["buckets"]["+Inf"] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_load_test_on_localhost():
+    server = start_in_thread()
+    try:
+        stats = load_test(server.url, requests=200, connections=2)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert stats["requests"] == 200 and stats["errors"] == 0
+
+
+def test_instrumented_service_serves_prometheus_and_openmetrics():
+    import http.client
+
+    server = start_in_thread(instrument=True)
+    try:
+        stats = load_test(server.url, "/v1/tax", requests=40, connections=1)
+        connection = http.client.HTTPConnection(*server.server_address[:2])
+        connection.request("GET", "/metrics", headers={"Accept": "application/openmetrics-text; version=1.0.0"})
+        response = connection.getresponse()
+        text = response.read().decode()
+        assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+        assert f"tax_calculator_calculation_seconds_count {stats['requests']}" in text and text.endswith("# EOF\n")
+        connection.request("GET", "/metrics")
+        response = connection.getresponse()
+        assert response.headers["Content-Type"].startswith("text/plain") and b"# EOF" not in response.read()
+        connection.request("GET", "/v1/metrics")
+        assert json.loads(connection.getresponse().read())["calculator"]["calls"] == 40
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert instrumentation.active is None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
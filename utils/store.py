@@ -0,0 +1,312 @@
+# utils/store.py
+"""
+Persistent SQLite store of tax results (through peewee).
+Three normalized tables:
+- inputs: each distinct set of normalized inputs once, keyed by its hash (identical inputs
+  from any number of entities or runs share one row);
+- results: one row per saved calculation (entity id, tax period, input hash, as_of date,
+  rules version, taxable income, tax payable), indexed by entity id, tax period and input hash;
+- result_notes: the note codes of each result in order, with their parameters as JSON.
+
+save_many() writes in batched transactions, each table's rows through one prepared INSERT (peewee
+builds the statement once; the driver binds every row), so millions of results load in minutes; results() reads them back by entity and/or period through the indexes.
+
+Usage:
+    store = ResultStore("results.db")
+    store.save("E-1", inputs, calculate_tax(inputs))
+    store.results(entity_id="E-1")
+"""
+import hashlib
+import json
+from datetime import date
+from itertools import islice
+
+from peewee import (
+    AutoField, CharField, CompositeKey, DateField, FloatField, ForeignKeyField, IntegerField, Model, SqliteDatabase,
+    TextField, chunked, fn,
+)
+
+from utils.notes import NoteList, Notes
+from utils.rules import RULES_BY_PERIOD, rules_version
+from utils.schema import normalize_inputs
+
+DEFAULT_BATCH_SIZE = 50_000  # rows per transaction
+# Result ids per notes query, within SQLite's limit of 32,766 bound variables
+_QUERY_IDS = 10_000
+PRAGMAS = {"journal_mode": "wal", "synchronous": "normal", "cache_size": -64_000, "foreign_keys": 1}
+
+
+class StoredInput(Model):
+    input_hash = CharField(max_length=32, primary_key=True)
+    inputs = TextField()  # normalize_inputs() as canonical JSON
+
+    class Meta:
+        table_name = "inputs"
+
+
+class StoredResult(Model):
+    id = AutoField()
+    entity_id = CharField()
+    tax_period = CharField(index=True)
+    input_hash = ForeignKeyField(StoredInput, column_name="input_hash", field="input_hash", index=True)
+    as_of = DateField(null=True)
+    rules_version = CharField()
+    taxable_income = FloatField()
+    tax_payable = FloatField()
+
+    class Meta:
+        table_name = "results"
+        indexes = ((("entity_id", "tax_period"), False),)
+
+
+class StoredNote(Model):
+    result = ForeignKeyField(StoredResult, on_delete="CASCADE")
+    position = IntegerField()
+    code = IntegerField(index=True)
+    params = TextField(null=True)  # JSON list; dates as {"date": "YYYY-MM-DD"}
+
+    class Meta:
+        table_name = "result_notes"
+        primary_key = CompositeKey("result", "position")
+
+
+MODELS = (StoredInput, StoredResult, StoredNote)
+_INPUT_FIELDS = [StoredInput.input_hash, StoredInput.inputs]
+_RESULT_FIELDS = [StoredResult.id, StoredResult.entity_id, StoredResult.tax_period, StoredResult.input_hash,
+                  StoredResult.as_of, StoredResult.rules_version, StoredResult.taxable_income, StoredResult.tax_payable]
+_NOTE_FIELDS = [StoredNote.result, StoredNote.position, StoredNote.code, StoredNote.params]
+
+
+class ResultStore:
+    """
+    SQLite-backed store of calculate_tax() results.
+    Args:
+        path (str): Database file (created with its tables if missing), or ":memory:".
+    """
+
+    def __init__(self, path=":memory:"):
+        self.database = SqliteDatabase(str(path), pragmas=PRAGMAS)
+        with self.database.bind_ctx(MODELS):
+            self.database.create_tables(MODELS)
+
+    def save(self, entity_id, inputs: dict, result: dict, as_of: date = None) -> int:
+        """Save one result; returns its id. See save_many()."""
+        return self.save_many([(entity_id, inputs, result)], as_of=as_of)[0]
+
+    def save_many(self, rows, as_of: date = None, batch_size: int = DEFAULT_BATCH_SIZE) -> list:
+        """
+        Save results in batched transactions.
+        Args:
+            rows (iterable): (entity_id, inputs, result) tuples; result is a calculate_tax() dict. Its
+                "notes" are stored as codes when they keep their encoded entries (a NoteList or Notes);
+                results without notes (e.g. batch engine rows) are stored without.
+            as_of (date): Date the results were evaluated at (defaults to today).
+            batch_size (int): Rows per transaction.
+        Returns:
+            list: Ids of the saved results, in row order. Each batch's ids are consecutive, but another
+                writer may insert between batches.
+        """
+        as_of = as_of or date.today()
+        rows = iter(rows)
+        ids = []
+        with self.database.bind_ctx(MODELS):
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                start = self._save_batch(batch, as_of)
+                ids.extend(range(start, start + len(batch)))
+        return ids
+
+    def _save_batch(self, batch, as_of):
+        inputs_rows, result_rows, note_rows = {}, [], []
+        # Ids are assigned here: the IMMEDIATE transaction holds the write lock from the max(id) read on
+        with self.database.atomic("IMMEDIATE"):
+            start = (StoredResult.select(fn.MAX(StoredResult.id)).scalar() or 0) + 1
+            stored_as_of = StoredResult.as_of.db_value(as_of)
+            for offset, (entity_id, inputs, result) in enumerate(batch):
+                normalized = normalize_inputs(inputs)
+                canonical = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=_encode)
+                input_hash = hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+                inputs_rows[input_hash] = canonical
+                result_id = start + offset
+                rules = RULES_BY_PERIOD[normalized["tax_period"]]
+                result_rows.append((
+                    result_id, str(entity_id), rules.period, input_hash, stored_as_of,
+                    rules_version(rules), float(result["taxable_income"]), float(result["tax_payable"]),
+                ))
+                notes = result.get("notes")
+                if isinstance(notes, (Notes, NoteList)):
+                    for position, entry in enumerate(notes.entries):
+                        if entry.__class__ is int:
+                            note_rows.append((result_id, position, entry, None))
+                        else:
+                            note_rows.append((result_id, position, entry[0], json.dumps(entry[1:], default=_encode)))
+            self._insert(StoredInput, _INPUT_FIELDS, inputs_rows.items(), ignore=True)
+            self._insert(StoredResult, _RESULT_FIELDS, result_rows)
+            self._insert(StoredNote, _NOTE_FIELDS, note_rows)
+        return start
+
+    def _insert(self, model, fields, rows, ignore=False):
+        """
+        Insert rows (tuples of database values, in fields order) with one prepared statement.
+        insert_many() would render every value into the SQL, which costs far more than the write.
+        """
+        query = model.insert_many([[None] * len(fields)], fields=fields)
+        sql, _ = (query.on_conflict_ignore() if ignore else query).sql()
+        self.database.cursor().executemany(sql, rows)
+
+    def results(self, entity_id=None, tax_period: str = None, notes: bool = True) -> list:
+        """
+        Saved results, oldest first, filtered by entity and/or tax period (both indexed).
+        Args:
+            entity_id: Entity to return results for (None for all).
+            tax_period (str): Period to return results for, e.g. "FY2025"; blank stands for the
+                default period, which is what blank-period results are stored under.
+            notes (bool): Also load each result's notes.
+        Returns:
+            list: One dict per result: id, entity_id, tax_period, input_hash, as_of, rules_version,
+                taxable_income, tax_payable and (with notes=True) notes as a Notes sequence.
+        """
+        with self.database.bind_ctx(MODELS):
+            query = StoredResult.select(*_RESULT_FIELDS).order_by(StoredResult.id)
+            if entity_id is not None:
+                query = query.where(StoredResult.entity_id == str(entity_id))
+            if tax_period is not None:
+                query = query.where(StoredResult.tax_period == RULES_BY_PERIOD[tax_period].period)
+            found = list(query.dicts())
+            if notes and found:
+                entries = {row["id"]: [] for row in found}
+                for ids in chunked(list(entries), _QUERY_IDS):
+                    note_query = (StoredNote.select(StoredNote.result, StoredNote.code, StoredNote.params)
+                                  .where(StoredNote.result.in_(ids))
+                                  .order_by(StoredNote.result, StoredNote.position).tuples())
+                    for result_id, code, params in note_query:
+                        entries[result_id].append(code if params is None else (code, *json.loads(params, object_hook=_decode)))
+                for row in found:
+                    row["notes"] = Notes(entries[row["id"]], RULES_BY_PERIOD[row["tax_period"]])
+        return found
+
+    def inputs(self, input_hash: str) -> dict:
+        """
+        The normalized inputs stored under a hash.
+        Raises:
+            KeyError: For an unknown hash.
+        """
+        with self.database.bind_ctx(MODELS):
+            stored = StoredInput.get_or_none(StoredInput.input_hash == input_hash)
+        if stored is None:
+            raise KeyError(input_hash)
+        return json.loads(stored.inputs, object_hook=_decode)
+
+    def counts(self) -> dict:
+        """Row counts of the inputs, results and result_notes tables."""
+        with self.database.bind_ctx(MODELS):
+            return {model._meta.table_name: model.select().count() for model in MODELS}
+
+    def close(self):
+        self.database.close()
+
+
+def _encode(value):
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    raise TypeError(f"Cannot store {value!r}")
+
+
+def _decode(value):
+    if value.keys() == {"date"}:
+        return date.fromisoformat(value["date"])
+    return value
+
+
+# Automated test cases for pytest
+
+def test_store_round_trip_dedupe_and_lookups(tmp_path):
+    """
+    Results and notes read back as saved, identical inputs are stored once, lookups by entity and
+    period use the indexes, and the file persists across connections.
+    """
+    from utils.tax_calculator import calculate_tax
+
+    as_of = date(2025, 6, 1)
+    base = {"entity_type": "Legal Entity", "revenue": 5_000_000.0, "deductions": 1_000_000.0,
+            "prior_year_tax_losses": 200_000.0, "foreign_tax_paid": 1_000.0, "license_issue_date": date(2024, 3, 1)}
+    variants = [base, {**base, "tax_period": "FY2026"}, {**base, "revenue": 2_000_000.0}]
+    rows = [(f"E{i % 4}", variants[i % 3], calculate_tax(variants[i % 3], as_of=as_of)) for i in range(12)]
+    path = tmp_path / "results.db"
+    store = ResultStore(path)
+    ids = store.save_many(rows, as_of=as_of, batch_size=5)
+    assert ids == list(range(1, 13)) and store.save("E9", base, rows[0][2], as_of=as_of) == 13
+    store.close()
+
+    store = ResultStore(path)
+    assert store.counts()["inputs"] == 3 and store.counts()["results"] == 13
+    saved = store.results(entity_id="E1")
+    assert [row["id"] for row in saved] == [2, 6, 10]
+    for row in saved:
+        entity, inputs, result = rows[row["id"] - 1]
+        assert row["tax_payable"] == result["tax_payable"] and row["taxable_income"] == result["taxable_income"]
+        assert row["notes"] == result["notes"] and row["notes"].entries == result["notes"].entries
+        assert row["as_of"] == as_of and store.inputs(row["input_hash"]) == normalize_inputs(inputs)
+    # Blank periods are stored under the default period
+    assert len(store.results(tax_period="FY2026")) == 4 and len(store.results(tax_period="")) == 9
+    assert len(store.results(entity_id="E1", tax_period="FY2026")) == 1
+    plan = store.database.execute_sql(
+        "EXPLAIN QUERY PLAN SELECT id FROM results WHERE entity_id = ? AND tax_period = ?", ("E1", "FY2025"))
+    assert "INDEX storedresult_entity_id_tax_period" in " ".join(str(step) for step in plan)
+    try:
+        store.inputs("0" * 32)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("unknown hashes must raise KeyError")
+
+    # Another connection writing between two batches: the ids returned are the ones actually stored
+    other = ResultStore(path)
+
+    def interleaved():
+        for i, row in enumerate(rows[:4]):
+            if i == 2:
+                other.save("X", base, rows[0][2], as_of=as_of)
+            yield row
+    ids = store.save_many(interleaved(), as_of=as_of, batch_size=2)
+    assert ids == [14, 15, 17, 18]
+    assert [row["entity_id"] for row in store.results(entity_id="X")] == ["X"]
+    assert [row["id"] for row in store.results(entity_id="E2")][-1:] == [17]
+    other.close()
+    store.close()
+
+
+def _benchmark(n=200_000):
+    """Bulk load rate, for calculate_tax() results with notes and with 1 in 4 inputs repeated."""
+    import os
+    import tempfile
+    import time
+
+    from utils.batch_calculator import _random_corpus
+    from utils.tax_calculator import calculate_tax
+
+    corpus = _random_corpus(n * 3 // 4, seed=0)
+    profiles = [{name: corpus[name][i].item() for name in corpus} for i in range(n * 3 // 4)]
+    rows = [(f"E{i}", profile, calculate_tax(profile)) for i, profile in enumerate(profiles + profiles[:n // 4])]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.db")
+        store = ResultStore(path)
+        start = time.perf_counter()
+        store.save_many(rows)
+        seconds = time.perf_counter() - start
+        counts = store.counts()
+        start = time.perf_counter()
+        for i in range(0, n, n // 1_000):
+            store.results(entity_id=f"E{i}")
+        lookup = (time.perf_counter() - start) / 1_000
+        store.close()
+        size = os.path.getsize(path) + os.path.getsize(path + "-wal") if os.path.exists(path + "-wal") else os.path.getsize(path)
+    print(f"{n:,} results in {seconds:.1f}s ({n / seconds:,.0f} rows/s, {1e6 / (n / seconds) / 60:.1f} min per million); "
+          f"{counts['inputs']:,} distinct inputs, {counts['result_notes']:,} notes, {size / 2**20:.0f} MiB; "
+          f"entity lookup {lookup * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,153 @@
+# utils/sweep.py
+"""
+Scenario sweeps ("what if revenue is X?") for the UAE Corporate Tax Calculator.
+One entity profile is evaluated over a grid of values for a single input in one
+vectorized pass of the batch engine, and the result is returned as chart-ready arrays
+together with markers for the points where the tax rules change: the Small Business
+Relief cliff, the end of the 0% band, the QFZP de-minimis cliff and the DMTT threshold.
+"""
+import numpy as np
+
+from utils.batch_calculator import calculate_tax_batch, _is_scalar, BRANCH_NAMES
+from utils.rules import rules_for
+
+SWEEP_FIELDS = ("revenue", "deductions", "non_qualifying_income", "prior_year_tax_losses")
+DEFAULT_POINTS = 1_000
+MAX_POINTS = 1_000_000
+
+
+def sweep(inputs: dict, field: str, start: float = 0.0, stop: float = None, points: int = DEFAULT_POINTS,
+          values=None) -> dict:
+    """
+    Evaluate calculate_tax() for one profile over a grid of values of one input.
+    Args:
+        inputs (dict): Base user input data (as returned by get_user_inputs()).
+        field (str): Input to vary, one of SWEEP_FIELDS.
+        start (float): First grid value.
+        stop (float): Last grid value (defaults to twice the base value, or AED 10M if that is 0).
+        points (int): Number of evenly spaced grid values.
+        values (array-like): Explicit grid, used instead of start/stop/points.
+    Returns:
+        dict: "field", "values", "taxable_income", "tax_payable", "effective_rate" (tax / revenue),
+            "marginal_rate" (slope of tax_payable), "branch" (BRANCH_NAMES codes), "dmtt" (bool),
+            and "markers": a list of {"value", "label"} dicts, one per change of branch, of the 0% band
+            and of DMTT, at the value (to the cent) where the change happens.
+    """
+    if field not in SWEEP_FIELDS:
+        raise ValueError(f"Cannot sweep {field!r}; choose one of {', '.join(SWEEP_FIELDS)}")
+    if values is None:
+        if stop is None:
+            stop = 2 * float(inputs.get(field) or 0.0) or 10_000_000.0
+        if not 2 <= points <= MAX_POINTS:
+            raise ValueError(f"points must be between 2 and {MAX_POINTS:,}")
+        values = np.linspace(start, stop, int(points))
+    else:
+        values = np.asarray(values, dtype=np.float64)
+
+    # Fields the batch engine ignores (lists, dates) stay out; the grid goes first so it sets the length
+    data = {field: values}
+    data.update((name, value) for name, value in inputs.items() if name != field and _is_scalar(value))
+    result = calculate_tax_batch(data, branches=True)
+
+    revenue = values if field == "revenue" else np.full(len(values), float(inputs.get("revenue") or 0.0))
+    tax_payable = result["tax_payable"]
+    effective_rate = np.divide(tax_payable, revenue, out=np.zeros(len(values)), where=revenue > 0)
+    marginal_rate = np.gradient(tax_payable, values) if len(values) > 1 else np.zeros(len(values))
+    return {
+        "field": field,
+        "values": values,
+        "taxable_income": result["taxable_income"],
+        "tax_payable": tax_payable,
+        "effective_rate": effective_rate,
+        "marginal_rate": marginal_rate,
+        "branch": result["branch"],
+        "dmtt": result["dmtt"],
+        "markers": _markers(data, field, result, rules_for(inputs.get("tax_period") or "")),
+    }
+
+
+def _markers(data, field, result, rules):
+    """
+    Markers where the rules change between consecutive grid points (under the profile's tax period).
+    Each change is located by bisecting its grid interval with the batch engine, down to a cent,
+    so a marker sits at the threshold itself rather than at the next grid value.
+    """
+    values = data[field]
+    states = _rule_states(result, rules)
+    kinds, positions = np.nonzero(states[:, 1:] != states[:, :-1])
+    before = states[kinds, positions]
+    after = states[kinds, positions + 1]
+    low, high = values[positions], values[positions + 1]
+    columns = np.arange(len(kinds))
+    for _ in range(_MAX_BISECTIONS):
+        if not (np.abs(high - low) >= _HALF_CENT).any():
+            break
+        middle = (low + high) / 2
+        states = _rule_states(calculate_tax_batch({**data, field: middle}, branches=True), rules)
+        unchanged = states[kinds, columns] == before
+        low = np.where(unchanged, middle, low)
+        high = np.where(unchanged, high, middle)
+
+    markers = []
+    for kind, old, new, value in zip(kinds, before, after, high):
+        if kind == _BRANCH:
+            label = f"{BRANCH_NAMES[old]} → {BRANCH_NAMES[new]}"
+        elif kind == _ABOVE_BAND:
+            label = (f"{rules.standard_rate:.0%} rate starts (taxable income > AED {rules.zero_rate_band:,.0f})"
+                     if new else "Back within the 0% band")
+        else:
+            label = (f"DMTT top-up applies (revenue ≥ AED {rules.dmtt_revenue / 1e9:g}bn)" if new
+                     else "DMTT top-up no longer applies")
+        markers.append({"value": round(float(value), 2), "label": label})
+    return sorted(markers, key=lambda marker: marker["value"])
+
+
+# Rows of _rule_states(); a threshold is found once its interval is under half a cent wide
+_BRANCH, _ABOVE_BAND, _DMTT = range(3)
+_HALF_CENT = 0.005
+_MAX_BISECTIONS = 64
+
+
+def _rule_states(result, rules):
+    return np.stack([result["branch"], result["taxable_income"] > rules.zero_rate_band, result["dmtt"]]).astype(np.int64)
+
+
+# Automated test cases for pytest
+
+def test_sweep_matches_scalar_and_marks_cliffs():
+    """
+    Every sweep point equals calculate_tax(), and the SBR, 375k band, de-minimis and DMTT changes are marked.
+    """
+    from utils.tax_calculator import calculate_tax
+
+    base = {"entity_type": "Legal Entity", "revenue": 5_000_000.0, "deductions": 500_000.0,
+            "free_zone": "Yes", "qualifying_fz": "Yes", "non_qualifying_income": 400_000.0,
+            "exempt_type": [], "license_issue_date": None}
+    result = sweep(base, "revenue", 0, 5_000_000_000, points=2_001)
+    for i in range(0, 2_001, 50):
+        expected = calculate_tax({**base, "revenue": result["values"][i].item()})
+        assert result["tax_payable"][i] == expected["tax_payable"]
+        assert result["taxable_income"][i] == expected["taxable_income"]
+    # Markers sit at the thresholds, none of which is on the 2.5M-wide grid: SBR and the 375k band
+    # at 3M revenue, de-minimis at 8M (400k non-qualifying income is 5% of revenue) and DMTT at 3bn
+    markers = {marker["label"]: marker["value"] for marker in result["markers"]}
+    assert markers == {
+        "Small Business Relief → QFZP status lost": 3_000_000.0,
+        "9% rate starts (taxable income > AED 375,000)": 3_000_000.0,
+        "QFZP status lost → Qualifying Free Zone Person": 8_000_000.0,
+        "DMTT top-up applies (revenue ≥ AED 3bn)": 3_000_000_000.0,
+    }
+
+    # Taxable income is 500k less deductions (capped at 30% of EBITDA): back in the 0% band from 125k,
+    # between the grid values 124,962.48 and 125,062.53 (tax is rounded to cents, so the slope is too)
+    standard = sweep({"entity_type": "Legal Entity", "revenue": 5_000_000.0, "exempt_income": 4_500_000.0},
+                     "deductions", 0, 200_000, points=2_000)
+    assert 125_000.0 not in standard["values"]
+    assert standard["markers"] == [{"value": 125_000.0, "label": "Back within the 0% band"}]
+    assert round(standard["marginal_rate"][0], 3) == -0.09 and standard["marginal_rate"][-1] == 0.0
+    try:
+        sweep(base, "sector")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("sweeping an unsupported field must fail")
@@ -1,276 +1,327 @@
 # utils/tax_calculator.py
 """
 Tax calculation utility for UAE Corporate Tax Calculator.
-Fully compliant with 2024 FTA/MoF rules.
+Fully compliant with 2024 FTA/MoF rules; thresholds and rates are taken from the record's
+tax period (see utils.rules).
 """
 from datetime import date, timedelta
+from functools import lru_cache
 
-def calculate_tax(inputs: dict) -> dict:
+from utils import instrumentation, notes as note
+from utils.deadlines import registration_deadline
+from utils.notes import Notes, render_notes
+from utils.records import TaxInput, TaxResult, EntityType, EXEMPT_SECTORS, reading_dicts
+from utils.rules import RULES_BY_PERIOD
+
+# Bound once: a member lookup on the Enum class goes through EnumType.__getattr__ on Python 3.11
+_NON_RESIDENT = EntityType.NON_RESIDENT
+
+def calculate_tax(inputs: dict, as_of: date = None) -> dict:
     """
     Calculate the taxable income and tax payable based on user inputs and UAE Corporate Tax law (2024).
     Args:
-        inputs (dict): User input data.
+        inputs (dict): User input data; "tax_period" selects the rule set (blank for the default period).
+        as_of (date): Date the registration deadline notes are evaluated at (defaults to today).
     Returns:
         dict: Taxable income, tax payable, and compliance notes.
     """
+    return _calculate_tax_from_dict(inputs, as_of)
+
+def calculate_tax_record(record: TaxInput, as_of: date = None) -> TaxResult:
+    """
+    Typed form of calculate_tax() for high-volume use.
+    Args:
+        record (TaxInput): Entity inputs (see TaxInput.from_dict for the dict adapter).
+        as_of (date): Date the registration deadline notes are evaluated at (defaults to today).
+    Returns:
+        TaxResult: Taxable income, tax payable, and compliance notes.
+    """
     # --- Extract inputs ---
-    revenue = inputs.get("revenue", 0.0)
-    deductions = inputs.get("deductions", 0.0)
-    exempt_income = inputs.get("exempt_income", 0.0)
-    qualifying_income = inputs.get("qualifying_income", 0.0)
-    non_qualifying_income = inputs.get("non_qualifying_income", 0.0)
-    free_zone = inputs.get("free_zone", "No")
-    qualifying_fz = inputs.get("qualifying_fz", "No")
-    in_tax_group = inputs.get("in_tax_group", "No")
-    has_related_party_tx = inputs.get("has_related_party_tx", "No")
-    has_audited_accounts = inputs.get("has_audited_accounts", "No")
-    prior_year_tax_losses = inputs.get("prior_year_tax_losses", 0.0)
-    participation_exempt_income = inputs.get("participation_exempt_income", 0.0)
-    fines = inputs.get("fines", 0.0)
-    bribes = inputs.get("bribes", 0.0)
-    non_approved_donations = inputs.get("non_approved_donations", 0.0)
-    other_non_deductibles = inputs.get("other_non_deductibles", 0.0)
-    eligible_for_group_relief = inputs.get("eligible_for_group_relief", "No")
-    docs_uploaded = inputs.get("docs_uploaded", False)
-    license_issue_date = inputs.get("license_issue_date", None)
-    # New fields
-    entity_type = inputs.get("entity_type", "")
-    residency_status = inputs.get("residency_status", "Yes")
-    pe_status = inputs.get("pe_status", "No")
-    sector = inputs.get("sector", "General Business")
-    foreign_tax_paid = inputs.get("foreign_tax_paid", 0.0)
-    zakat_paid = inputs.get("zakat_paid", 0.0)
-    entertainment_expenses = inputs.get("entertainment_expenses", 0.0)
-    related_party_loan_interest = inputs.get("related_party_loan_interest", 0.0)
-    transitional_period = inputs.get("transitional_period", "No")
-    sector_details = inputs.get("sector_details", "")
-    advanced_exemptions = inputs.get("advanced_exemptions", "")
-    is_mne_group = inputs.get("is_mne_group", "No")
-    global_revenue = inputs.get("global_revenue", 0.0)
-    globe_income = inputs.get("globe_income", 0.0)
-    covered_taxes = inputs.get("covered_taxes", 0.0)
-    gaar_warning = inputs.get("gaar_warning", True)
+    revenue = record.revenue
+    deductions = record.deductions
+    exempt_income = record.exempt_income
+    non_qualifying_income = record.non_qualifying_income
+    prior_year_tax_losses = record.prior_year_tax_losses
+    entity_type = record.entity_type
+    foreign_tax_paid = record.foreign_tax_paid
+    zakat_paid = record.zakat_paid
+    entertainment_expenses = record.entertainment_expenses
+    related_party_loan_interest = record.related_party_loan_interest
+    advanced_exemptions = record.advanced_exemptions
+    non_resident = entity_type is _NON_RESIDENT
+    # Thresholds and rates of the record's tax period (see utils.rules)
+    rules = RULES_BY_PERIOD[record.tax_period]
+    # Instrumentation is off unless a probe is active; each `if probe:` below is then a local test
+    probe = instrumentation.active
+    if probe:
+        started = lap = probe.clock()
 
     notes = []
 
     # --- Advanced/edge-case exemptions (must be first) ---
     if advanced_exemptions and advanced_exemptions.strip():
-        notes.append(f"Advanced/edge-case exemption claimed: {advanced_exemptions} [Check FTA law/circulars]")
-        return {"taxable_income": 0.0, "tax_payable": 0.0, "notes": notes}
+        notes.append((note.ADVANCED_EXEMPTION, advanced_exemptions))
+        if probe:
+            probe.finish("advanced_exemption", started)
+        return TaxResult(0.0, 0.0, Notes(notes, rules))
 
     # --- Transitional period note ---
-    if transitional_period == "Yes":
-        notes.append("Transitional period: Special rules may apply for the first tax period. See FTA guidance.")
+    if record.transitional_period:
+        notes.append(note.TRANSITIONAL_PERIOD)
 
     # --- Anti-avoidance/GAAR warning ---
-    if not gaar_warning:
-        notes.append("Warning: You have not confirmed compliance with GAAR/anti-avoidance rules. Artificial arrangements may be challenged by the FTA. [Article 50]")
+    if not record.gaar_warning:
+        notes.append(note.GAAR_NOT_CONFIRMED)
 
     # --- Deductions: Interest cap (30% of EBITDA) ---
     ebitda = revenue - exempt_income
-    max_interest_deduction = 0.3 * ebitda
+    max_interest_deduction = rules.interest_ebitda_share * ebitda
     if deductions > max_interest_deduction:
         deductions = max_interest_deduction
-        deduction_note = "Interest deduction capped at 30% of EBITDA. [Article 30]"
+        interest_capped = True
     else:
-        deduction_note = ""
+        interest_capped = False
+    if probe:
+        lap = probe.lap("interest_cap", lap)
+        if interest_capped:
+            probe.event("interest_capped")
 
     # --- Entertainment expense cap (50% deductible) ---
     entertainment_cap = 0.5 * entertainment_expenses
     deductions -= (entertainment_expenses - entertainment_cap)
     if entertainment_expenses > 0:
-        notes.append(f"Entertainment expenses: Only 50% deductible. [Article 33]")
+        notes.append(note.ENTERTAINMENT_CAP)
+    if probe:
+        lap = probe.lap("entertainment_cap", lap)
 
     # --- Related party loan interest cap (placeholder logic) ---
     # For demonstration, cap at 30% of EBITDA (could be more complex in law)
-    max_related_party_interest = 0.3 * ebitda
+    max_related_party_interest = rules.interest_ebitda_share * ebitda
     if related_party_loan_interest > max_related_party_interest:
         deductions -= (related_party_loan_interest - max_related_party_interest)
-        notes.append("Interest on related party loans capped at 30% of EBITDA. [Article 30, 31]")
+        notes.append(note.RELATED_PARTY_INTEREST_CAP)
 
     # --- Disallow advanced non-deductibles ---
-    total_non_deductibles = fines + bribes + non_approved_donations + other_non_deductibles
+    total_non_deductibles = record.fines + record.bribes + record.non_approved_donations + record.other_non_deductibles
     deductions -= total_non_deductibles
     if deductions < 0:
         deductions = 0
-    non_deductible_note = "Non-deductible expenses (fines, bribes, non-approved donations, etc.) have been disallowed. [Article 33]"
 
     # --- Participation exemption ---
-    exempt_income += participation_exempt_income
-    participation_note = "Participation exemption applied: Dividends/capital gains from qualifying shareholdings are exempt. [Article 23]"
+    exempt_income += record.participation_exempt_income
 
     # --- Base taxable income ---
     base_income = revenue - deductions - exempt_income
     base_income = max(base_income, 0)
+    if probe:
+        lap = probe.lap("non_deductibles", lap)
 
     # --- Sector-specific rules ---
-    if sector in ["Extractive Business", "Non-Extractive Natural Resource Business"]:
+    if record.sector in EXEMPT_SECTORS:
         if foreign_tax_paid > 0:
-            notes.append(f"Foreign tax credit claimed: AED {foreign_tax_paid:,.2f} (subject to FTA rules). [Article 47]")
+            notes.append((note.FOREIGN_TAX_CREDIT, foreign_tax_paid))
         if zakat_paid > 0:
-            notes.append(f"Zakat offset claimed: AED {zakat_paid:,.2f} (subject to FTA rules). [Article 46]")
-        notes.append(f"Exempt sector: {sector}. Ensure FTA approval and registration. [Article 4]")
-        return {"taxable_income": 0.0, "tax_payable": 0.0, "notes": notes}
+            notes.append((note.ZAKAT_OFFSET, zakat_paid))
+        # _value_ is the member's plain attribute; .value is a Python-level property on 3.11
+        notes.append((note.EXEMPT_SECTOR, record.sector._value_))
+        if probe:
+            probe.lap("exempt_sector", lap)
+            probe.finish("exempt_sector", started)
+        return TaxResult(0.0, 0.0, Notes(notes, rules))
+    if probe:
+        lap = probe.lap("exempt_sector", lap)
 
     # --- Small Business Relief ---
-    if revenue <= 3_000_000 and entity_type != "Non-Resident":
+    if revenue <= rules.small_business_revenue and not non_resident:
         if foreign_tax_paid > 0:
-            notes.append(f"Foreign tax credit claimed: AED {foreign_tax_paid:,.2f} (subject to FTA rules). [Article 47]")
+            notes.append((note.FOREIGN_TAX_CREDIT, foreign_tax_paid))
         if zakat_paid > 0:
-            notes.append(f"Zakat offset claimed: AED {zakat_paid:,.2f} (subject to FTA rules). [Article 46]")
-        notes.append("Eligible for Small Business Relief (Revenue ≤ AED 3M). No corporate tax due. [Article 21]")
-        return {
-            "taxable_income": 0.0,
-            "tax_payable": 0.0,
-            "notes": notes + [deduction_note, non_deductible_note, participation_note]
-        }
+            notes.append((note.ZAKAT_OFFSET, zakat_paid))
+        notes.append(note.SMALL_BUSINESS_RELIEF)
+        if interest_capped:
+            notes.append(note.INTEREST_CAP)
+        notes += (note.NON_DEDUCTIBLES, note.PARTICIPATION_EXEMPTION)
+        if probe:
+            probe.lap("sbr", lap)
+            probe.finish("small_business_relief", started)
+        return TaxResult(0.0, 0.0, Notes(notes, rules))
+    if probe:
+        lap = probe.lap("sbr", lap)
 
     # --- Non-resident/PE logic ---
-    if entity_type == "Non-Resident":
-        if pe_status == "Yes":
-            notes.append("Non-resident with UAE PE: Taxable on UAE-sourced income. [Article 11]")
+    if non_resident:
+        if record.pe_status:
+            notes.append(note.NON_RESIDENT_PE)
             # Continue with calculation, but always keep this note in the notes list
+            if probe:
+                probe.event("non_resident_pe")
         else:
             if foreign_tax_paid > 0:
-                notes.append(f"Foreign tax credit claimed: AED {foreign_tax_paid:,.2f} (subject to FTA rules). [Article 47]")
+                notes.append((note.FOREIGN_TAX_CREDIT, foreign_tax_paid))
             if zakat_paid > 0:
-                notes.append(f"Zakat offset claimed: AED {zakat_paid:,.2f} (subject to FTA rules). [Article 46]")
-            notes.append("Non-resident without UAE PE: Not subject to UAE Corporate Tax (except on certain UAE-sourced income). [Article 11]")
-            return {"taxable_income": 0.0, "tax_payable": 0.0, "notes": notes}
+                notes.append((note.ZAKAT_OFFSET, zakat_paid))
+            notes.append(note.NON_RESIDENT_NO_PE)
+            if probe:
+                probe.lap("non_resident", lap)
+                probe.finish("non_resident_no_pe", started)
+            return TaxResult(0.0, 0.0, Notes(notes, rules))
+    if probe:
+        lap = probe.lap("non_resident", lap)
 
     # --- Free Zone Logic ---
-    if free_zone == "Yes" and qualifying_fz == "Yes":
-        deminimis_limit = min(0.05 * revenue, 5_000_000)
+    if record.free_zone and record.qualifying_fz:
+        deminimis_limit = min(rules.qfzp_deminimis_share * revenue, rules.qfzp_deminimis_cap)
         if non_qualifying_income >= deminimis_limit:
             taxable_income = base_income
-            notes.append("QFZP status lost: Non-qualifying income exceeds de-minimis threshold. [Article 18]")
+            notes.append(note.QFZP_STATUS_LOST)
+            branch = "qfzp_status_lost"
         else:
             taxable_income = max(non_qualifying_income, 0)
-            notes.append("Qualifying Free Zone Person: 0% on qualifying income, 9% on non-qualifying income. [Article 18]")
+            notes.append(note.QFZP)
+            branch = "qfzp"
+        if probe:
+            lap = probe.lap("free_zone", lap)
         # Apply tax loss carry-forward (up to 75% of taxable income)
-        max_loss_offset = 0.75 * taxable_income
+        max_loss_offset = rules.loss_offset_share * taxable_income
         loss_offset = min(prior_year_tax_losses, max_loss_offset)
         taxable_income -= loss_offset
-        notes.append(f"Tax loss carry-forward applied: AED {loss_offset:,.2f} (max 75% of taxable income). Remaining losses: AED {max(prior_year_tax_losses - loss_offset, 0):,.2f} [Article 37]")
-        tax_payable = 0 if taxable_income <= 375_000 else 0.09 * (taxable_income - 375_000)
+        notes.append((note.LOSS_CARRY_FORWARD, loss_offset, max(prior_year_tax_losses - loss_offset, 0)))
+        tax_payable = 0 if taxable_income <= rules.zero_rate_band else rules.standard_rate * (taxable_income - rules.zero_rate_band)
+        if probe:
+            lap = probe.lap("loss_offset", lap)
         # 15% DMTT for large MNEs
-        if revenue >= 3_000_000_000:
-            dmtt = max(0.15 * taxable_income - tax_payable, 0)
-            notes.append(f"DMTT (15%) for large multinational groups: AED {dmtt:,.2f} (if applicable). [Article 54]")
+        if revenue >= rules.dmtt_revenue:
+            dmtt = max(rules.dmtt_rate * taxable_income - tax_payable, 0)
+            notes.append((note.DMTT, dmtt))
             tax_payable += dmtt
+            if probe:
+                probe.event("dmtt")
+        if probe:
+            lap = probe.lap("dmtt", lap)
         # Group relief
-        if eligible_for_group_relief == "Yes":
-            notes.append("Group relief: Offset of group losses/profits may apply (ensure FTA rules are met). [Article 40]")
+        if record.eligible_for_group_relief:
+            notes.append(note.GROUP_RELIEF)
         # Registration deadline warning
-        notes += registration_deadline_notes(license_issue_date, entity_type=entity_type)
+        deadline_entries = _registration_deadline_entries(record.license_issue_date, entity_type, as_of)
+        notes += deadline_entries
+        if probe:
+            lap = probe.lap("deadline_notes", lap)
+            if deadline_entries and deadline_entries[0][0] == note.REGISTRATION_OVERDUE:
+                probe.event("registration_overdue")
         # Documentation
-        if not docs_uploaded:
-            notes.append("Warning: Required compliance documentation not confirmed/uploaded. [Article 55]")
-        if has_audited_accounts == "No":
-            notes.append("QFZPs must have audited accounts to maintain 0% rate. [Article 18]")
-        if has_related_party_tx == "Yes":
-            notes.append("Transfer pricing rules apply. Ensure documentation is in place. [Article 34]")
+        if not record.docs_uploaded:
+            notes.append(note.DOCS_NOT_UPLOADED)
+        if not record.has_audited_accounts:
+            notes.append(note.QFZP_AUDIT)
+        if record.has_related_party_tx:
+            notes.append(note.TRANSFER_PRICING)
         # Foreign tax credit and zakat offset
         if foreign_tax_paid > 0:
-            notes.append(f"Foreign tax credit claimed: AED {foreign_tax_paid:,.2f} (subject to FTA rules). [Article 47]")
+            notes.append((note.FOREIGN_TAX_CREDIT, foreign_tax_paid))
             tax_payable = max(tax_payable - foreign_tax_paid, 0)
         if zakat_paid > 0:
-            notes.append(f"Zakat offset claimed: AED {zakat_paid:,.2f} (subject to FTA rules). [Article 46]")
+            notes.append((note.ZAKAT_OFFSET, zakat_paid))
             tax_payable = max(tax_payable - zakat_paid, 0)
         # Always include non-resident PE note if applicable
-        if entity_type == "Non-Resident" and pe_status == "Yes":
-            notes.append("Non-resident with UAE PE: Taxable on UAE-sourced income. [Article 11]")
-        return {
-            "taxable_income": round(taxable_income, 2),
-            "tax_payable": round(tax_payable, 2),
-            "notes": notes + [deduction_note, non_deductible_note, participation_note]
-        }
+        if non_resident and record.pe_status:
+            notes.append(note.NON_RESIDENT_PE)
+        if interest_capped:
+            notes.append(note.INTEREST_CAP)
+        notes += (note.NON_DEDUCTIBLES, note.PARTICIPATION_EXEMPTION)
+        if probe:
+            probe.lap("offsets", lap)
+            probe.finish(branch, started)
+        return TaxResult(round(taxable_income, 2), round(tax_payable, 2), Notes(notes, rules))
 
     # --- Regular Entity Logic ---
     taxable_income = base_income
     # Apply participation exemption (already included in exempt_income)
     # Apply tax loss carry-forward (up to 75% of taxable income)
-    max_loss_offset = 0.75 * taxable_income
+    max_loss_offset = rules.loss_offset_share * taxable_income
     loss_offset = min(prior_year_tax_losses, max_loss_offset)
     taxable_income -= loss_offset
-    # Group relief
-    group_relief_note = ""
-    if eligible_for_group_relief == "Yes":
-        group_relief_note = "Group relief: Offset of group losses/profits may apply (ensure FTA rules are met). [Article 40]"
     # Calculate tax
-    tax_payable = 0 if taxable_income <= 375_000 else 0.09 * (taxable_income - 375_000)
-    notes += [
-        "Standard UAE Corporate Tax: 0% up to AED 375,000, 9% above. [Article 3, 36]",
-        deduction_note,
-        non_deductible_note,
-        participation_note,
-        f"Tax loss carry-forward applied: AED {loss_offset:,.2f} (max 75% of taxable income). Remaining losses: AED {max(prior_year_tax_losses - loss_offset, 0):,.2f} [Article 37]",
-        group_relief_note
-    ]
-    if revenue >= 3_000_000_000:
-        dmtt = max(0.15 * taxable_income - tax_payable, 0)
-        notes.append(f"DMTT (15%) for large multinational groups: AED {dmtt:,.2f} (if applicable). [Article 54]")
+    tax_payable = 0 if taxable_income <= rules.zero_rate_band else rules.standard_rate * (taxable_income - rules.zero_rate_band)
+    if probe:
+        lap = probe.lap("loss_offset", lap)
+    notes.append(note.STANDARD_RATE)
+    if interest_capped:
+        notes.append(note.INTEREST_CAP)
+    notes += (
+        note.NON_DEDUCTIBLES,
+        note.PARTICIPATION_EXEMPTION,
+        (note.LOSS_CARRY_FORWARD, loss_offset, max(prior_year_tax_losses - loss_offset, 0)),
+    )
+    # Group relief
+    if record.eligible_for_group_relief:
+        notes.append(note.GROUP_RELIEF)
+    if revenue >= rules.dmtt_revenue:
+        dmtt = max(rules.dmtt_rate * taxable_income - tax_payable, 0)
+        notes.append((note.DMTT, dmtt))
         tax_payable += dmtt
-    if in_tax_group == "Yes":
-        notes.append("Tax group relief may apply. Ensure all group rules are met. [Article 42]")
-    if has_related_party_tx == "Yes":
-        notes.append("Transfer pricing rules apply. Ensure documentation is in place. [Article 34]")
-    if not docs_uploaded:
-        notes.append("Warning: Required compliance documentation not confirmed/uploaded. [Article 55]")
+        if probe:
+            probe.event("dmtt")
+    if probe:
+        lap = probe.lap("dmtt", lap)
+    if record.in_tax_group:
+        notes.append(note.TAX_GROUP)
+    if record.has_related_party_tx:
+        notes.append(note.TRANSFER_PRICING)
+    if not record.docs_uploaded:
+        notes.append(note.DOCS_NOT_UPLOADED)
     # Registration deadline warning
-    notes += registration_deadline_notes(license_issue_date, entity_type=entity_type)
+    deadline_entries = _registration_deadline_entries(record.license_issue_date, entity_type, as_of)
+    notes += deadline_entries
+    if probe:
+        lap = probe.lap("deadline_notes", lap)
+        if deadline_entries and deadline_entries[0][0] == note.REGISTRATION_OVERDUE:
+            probe.event("registration_overdue")
     # Foreign tax credit and zakat offset
     if foreign_tax_paid > 0:
-        notes.append(f"Foreign tax credit claimed: AED {foreign_tax_paid:,.2f} (subject to FTA rules). [Article 47]")
+        notes.append((note.FOREIGN_TAX_CREDIT, foreign_tax_paid))
         tax_payable = max(tax_payable - foreign_tax_paid, 0)
     if zakat_paid > 0:
-        notes.append(f"Zakat offset claimed: AED {zakat_paid:,.2f} (subject to FTA rules). [Article 46]")
+        notes.append((note.ZAKAT_OFFSET, zakat_paid))
         tax_payable = max(tax_payable - zakat_paid, 0)
     # Always include non-resident PE note if applicable
-    if entity_type == "Non-Resident" and pe_status == "Yes":
-        notes.append("Non-resident with UAE PE: Taxable on UAE-sourced income. [Article 11]")
-    return {
-        "taxable_income": round(taxable_income, 2),
-        "tax_payable": round(tax_payable, 2),
-        "notes": notes
-    }
-
-def registration_deadline_notes(license_issue_date, entity_type=""):
+    if non_resident and record.pe_status:
+        notes.append(note.NON_RESIDENT_PE)
+    if probe:
+        probe.lap("offsets", lap)
+        probe.finish("standard_rate", started)
+    return TaxResult(round(taxable_income, 2), round(tax_payable, 2), Notes(notes, rules))
+
+def _result_dict(taxable_income, tax_payable, notes):
+    return {"taxable_income": taxable_income, "tax_payable": tax_payable, "notes": notes}
+
+# calculate_tax_record() reading the input dict and returning the result dict directly: the same
+# code, without building a TaxInput, a TaxResult or a lazy Notes first
+_calculate_tax_from_dict = reading_dicts(calculate_tax_record, TaxResult=_result_dict, Notes=render_notes)
+
+def registration_deadline_notes(license_issue_date, entity_type="", as_of=None):
     """
-    Returns a list of registration deadline warnings based on license issue date and entity type.
+    Returns a list of registration deadline warnings based on license issue date and entity type,
+    as seen on the as_of date (defaults to today).
     """
-    notes = []
+    return Notes(list(_registration_deadline_entries(license_issue_date, entity_type, as_of)))
+
+def _registration_deadline_entries(license_issue_date, entity_type, as_of):
     if not license_issue_date:
-        return notes
-    today = date.today()
-    # Example: Resident juridical person, license issued in January/February: deadline is May 31
-    # (This is a simplified version; for full compliance, use FTA's full table)
-    if entity_type == "Legal Entity":
-        if license_issue_date.month in [1, 2]:
-            deadline = date(today.year, 5, 31)
-        elif license_issue_date.month in [3, 4]:
-            deadline = date(today.year, 6, 30)
-        elif license_issue_date.month == 5:
-            deadline = date(today.year, 7, 31)
-        elif license_issue_date.month == 6:
-            deadline = date(today.year, 8, 31)
-        elif license_issue_date.month == 7:
-            deadline = date(today.year, 9, 30)
-        elif license_issue_date.month in [8, 9]:
-            deadline = date(today.year, 10, 31)
-        elif license_issue_date.month in [10, 11]:
-            deadline = date(today.year, 11, 30)
-        elif license_issue_date.month == 12:
-            deadline = date(today.year, 12, 31)
-        else:
-            deadline = None
-        if deadline:
-            if today > deadline:
-                notes.append(f"Registration deadline was {deadline.strftime('%d %b %Y')}. Penalties may apply for late registration.")
-            else:
-                notes.append(f"Registration deadline: {deadline.strftime('%d %b %Y')}. Register before this date to avoid penalties.")
-    # Add more logic for other entity types as needed
-    return notes
+        return ()
+    return _deadline_entries(license_issue_date, entity_type, as_of or date.today())
+
+@lru_cache(maxsize=4096)
+def _deadline_entries(license_issue_date, entity_type, today):
+    # Few distinct (issue date, entity type, day) triples recur across records: memoized, as a tuple.
+    # The calculator passes its EntityType; registration_deadline_notes() the form's string
+    if isinstance(entity_type, EntityType):
+        entity_type = entity_type.value
+    deadline = registration_deadline(license_issue_date, entity_type, as_of=today)
+    if deadline is None:
+        return ()
+    if today > deadline:
+        return ((note.REGISTRATION_OVERDUE, deadline),)
+    return ((note.REGISTRATION_DUE, deadline),)
 
 # Automated test cases for pytest
 